@@ -111,22 +111,26 @@ def build(infile, arrays, weighting, point_merge):
     return ctg
 
 
-def main():
-    args = cli()
-    ds = build(args.input, args.arrays, args.weighting, args.point_merge)
-
+def save(ds, output, arrays):
+    """Write *arrays* of *ds* to *output*; the writer follows the extension."""
     # If output is CSV, force point association and include coordinates if supported
     kw = {}
-    if args.output.lower().endswith((".csv", ".tsv")):
+    if output.lower().endswith((".csv", ".tsv")):
         kw["FieldAssociation"] = "Point Data"  # CSVWriter supports this :contentReference[oaicite:2]{index=2}
         # Some builds use DataSetCSVWriter under the hood; AddMetaData adds coords when available
         kw["AddMetaData"] = 1
 
-    SaveData(args.output, proxy=ds,
+    SaveData(output, proxy=ds,
              ChooseArraysToWrite=1,
-             PointDataArrays=args.arrays,
+             PointDataArrays=arrays,
              **kw)
 
+
+def main():
+    args = cli()
+    ds = build(args.input, args.arrays, args.weighting, args.point_merge)
+    save(ds, args.output, args.arrays)
+
     print(f"[write] output={args.output} arrays={args.arrays}")
 
 
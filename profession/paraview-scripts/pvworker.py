@@ -0,0 +1,170 @@
+#!/usr/bin/env pvpython
+"""
+Long-lived pvpython worker: keeps readers + CleanToGrid pipelines loaded and
+writes selected arrays on request, so repeated extractions from the same VTU
+pay the ParaView start-up and read cost once.
+
+Example:
+    pvpython --mesa pvworker.py --socket /tmp/pv.sock --idle 600
+
+Protocol: one JSON object per connection over a Unix socket, one JSON reply.
+    {"op": "extract", "input": "tavgs.vtu", "output": "tavgs-ctg.csv",
+     "arrays": ["Avg-P", "Std-P"], "weighting": "average_by_number",
+     "point_merge": true}
+    {"op": "ping"}  |  {"op": "shutdown"}
+
+Pipelines are keyed on (input, weighting, point-merge) and rebuilt when the
+input's size or mtime changes.  The worker exits after --idle seconds
+without a request.  Normally started on demand by `pvclient.py`.
+"""
+import os, sys, json, time, socket, argparse, traceback
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from paraview.simple import Delete
+from pvtocsv import build, save
+
+
+def cli():
+    p = argparse.ArgumentParser(description="Persistent CleanToGrid worker")
+    p.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    p.add_argument("--idle", type=float, default=600.0,
+                   help="exit after this many seconds without a request")
+    p.add_argument("--max-pipelines", type=int, default=4,
+                   help="loaded datasets kept before the least recently used is dropped")
+    return p.parse_args()
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class Pipelines:
+    """LRU of loaded reader → CleanToGrid pipelines."""
+
+    def __init__(self, max_items):
+        self.max_items = max(int(max_items), 1)
+        self.items = OrderedDict()     # key -> dict(ctg, arrays, stamp)
+
+    def _drop(self, key):
+        ent = self.items.pop(key)
+        src = ent["ctg"].Input
+        Delete(ent["ctg"])
+        Delete(src)
+
+    def get(self, infile, arrays, weighting, point_merge):
+        """Return (ctg proxy, reused?) with at least *arrays* loaded."""
+        key = (os.path.realpath(infile), weighting, bool(point_merge))
+        stamp = _stamp(infile)
+        ent = self.items.get(key)
+
+        if ent is not None and ent["stamp"] != stamp:
+            print(f"[worker] {infile} changed on disk; reloading", flush=True)
+            self._drop(key)
+            ent = None
+
+        if ent is None:
+            ctg = build(infile, list(arrays), weighting, point_merge)
+            ent = self.items[key] = dict(ctg=ctg, arrays=set(arrays), stamp=stamp)
+            while len(self.items) > self.max_items:
+                self._drop(next(iter(self.items)))
+            return ctg, False
+
+        self.items.move_to_end(key)
+        missing = set(arrays) - ent["arrays"]
+        if missing and ent["arrays"]:
+            # widen the reader's selection instead of re-reading from scratch
+            rdr = ent["ctg"].Input
+            ent["arrays"] |= missing
+            if hasattr(rdr, "PointArrayStatus"):
+                rdr.PointArrayStatus = sorted(ent["arrays"])
+            ent["ctg"].UpdatePipeline()
+        return ent["ctg"], True
+
+
+def handle(req, pipes):
+    op = req.get("op", "extract")
+    if op == "ping":
+        return dict(ok=True, pid=os.getpid(), loaded=len(pipes.items))
+    if op != "extract":
+        return dict(ok=False, error=f"unknown op '{op}'")
+
+    t0 = time.time()
+    out = req["output"]
+    arrays = list(req.get("arrays") or [])
+    ctg, reused = pipes.get(req["input"], arrays,
+                            req.get("weighting", "average_by_number"),
+                            req.get("point_merge", False))
+
+    # write next to the target, then move into place
+    head, tail = os.path.split(out)
+    root, ext = os.path.splitext(tail)
+    tmp = os.path.join(head, f".{root}.{os.getpid()}.part{ext}")
+    os.makedirs(head or ".", exist_ok=True)
+    save(ctg, tmp, arrays)
+    os.replace(tmp, out)
+
+    dt = time.time() - t0
+    print(f"[worker] wrote {out} arrays={arrays} reused={reused} ({dt:.1f}s)", flush=True)
+    return dict(ok=True, output=out, reused=reused, seconds=dt)
+
+
+def _recv_line(conn):
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def serve(path, idle, max_pipelines):
+    if os.path.exists(path):
+        os.unlink(path)
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen(16)
+    srv.settimeout(idle)
+    pipes = Pipelines(max_pipelines)
+    print(f"[worker] pid={os.getpid()} listening on {path} (idle={idle:g}s)", flush=True)
+
+    try:
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except socket.timeout:
+                print("[worker] idle timeout; exiting", flush=True)
+                break
+
+            with conn:
+                conn.settimeout(None)
+                try:
+                    req = json.loads(_recv_line(conn) or b"{}")
+                    if req.get("op") == "shutdown":
+                        conn.sendall(b'{"ok": true}\n')
+                        break
+                    rep = handle(req, pipes)
+                except Exception as e:
+                    traceback.print_exc()
+                    rep = dict(ok=False, error=f"{type(e).__name__}: {e}")
+                try:
+                    conn.sendall((json.dumps(rep) + "\n").encode())
+                except OSError:
+                    pass                    # client gave up; keep serving
+    finally:
+        srv.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    args = cli()
+    serve(args.socket, args.idle, args.max_pipelines)
+
+
+if __name__ == "__main__":
+    main()
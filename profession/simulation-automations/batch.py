@@ -0,0 +1,437 @@
+# ───────────────────────── batch.py ─────────────────────────
+"""
+Batch driver (`--all` / `--sections GLOB`, dependency-aware process pool)
+and `--watch` mode – imported by the main script.
+
+The drivers take the section runner as *run* (the main script passes its
+`_run_section`), so this module never imports the script itself.
+"""
+
+from __future__ import annotations
+import argparse
+import configparser
+import fnmatch
+import glob as _glob
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Sequence
+
+from executors import make_executor
+from plotting import drain_renders
+from podfamily import _pod_mode_count, _pod_paths
+from samplecache import file_identity, sampler_key
+from sampling import (_ensure_points, _is_adaptive, _key_stamp, _mesh_path, _sample_paths,
+                      _sampler_cache, _sampler_cmd, _skip_value, _src_path, configure_locator,
+                      merge_points, split_sampled)
+from sectionio import _ENV0_CACHE, _bold, _family_base, _get_any, _green, base_env, first_key
+from spectra import sidecar_dir as probe_sidecar
+from spectrafamily import _spectra_paths
+from stagetrace import TRACE, stage
+
+
+def list_sections(cfg: configparser.ConfigParser, patterns: str | None = None) -> list[str]:
+    """
+    Runnable `postprocess-<family>-<name>` sections in INI order.  Family bases,
+    `[postprocess-geometry]`, `[postprocess-mesh]` and `[postprocess-sampler]`
+    are never selected.
+    """
+    globs = [g.strip() for g in (patterns or "postprocess-*").split(',') if g.strip()]
+    names = []
+    for name in cfg.sections():
+        parts = name.split('-', 2)
+        if len(parts) != 3 or parts[0] != "postprocess" or parts[2] == "base":
+            continue
+        if any(fnmatch.fnmatchcase(name, g) for g in globs):
+            names.append(name)
+    return names
+
+
+def _section_io(cfg, sec_name, args) -> dict[str, list[Path]]:
+    """
+    Files a section reads (*inputs*), writes-if-missing and may share with other
+    sections (*shared*), and always (re)writes (*outputs*).
+    """
+    sect = cfg[sec_name]
+    family, base = _family_base(cfg, sec_name)
+    inputs = [Path(args.ini)]
+
+    if family == "paraview":
+        input_vtu = _get_any(sect, base, "input-vtu", "input_vtu", "src-file", "src", default="")
+        ctg_csv = Path(_get_any(sect, base, "ctg-csv", "ctg_csv",
+                                default=f"{Path(input_vtu).stem}-ctg.csv"))
+        out_csv = Path(_get_any(sect, base, "sampled-file", "out-csv", "out_csv",
+                                default=f"{sec_name}.csv"))
+        out_fig = Path(_get_any(sect, base, "file", "output", default=f"{sec_name}.png"))
+        if input_vtu:
+            inputs.append(Path(input_vtu))
+        outputs = [out_csv] if getattr(args, "no_plot", False) else [out_csv, out_fig]
+        return {"inputs": inputs, "shared": [ctg_csv], "outputs": outputs}
+
+    if family == "spectra":
+        paths = _spectra_paths(sect, base, sec_name)
+        inputs += [paths["probe"]] if paths["probe"] else []
+        outputs = [paths[k] for k in ("csv", "peaks", "coh-csv") if paths[k]]
+        if not getattr(args, "no_plot", False):
+            outputs += [paths[k] for k in ("file", "coh-file") if paths[k]]
+        shared = [probe_sidecar(paths["probe"])] if paths["probe"] else []
+        return {"inputs": inputs, "shared": shared, "outputs": outputs}
+
+    if family == "pod":
+        paths = _pod_paths(sect, base, sec_name, args)
+        src_glob = _get_any(sect, base, "src-glob", default="")
+        mesh = sect.get("mesh", cfg.get("postprocess-mesh", "mesh-native", fallback=""))
+        inputs += [Path(p) for p in _glob.glob(src_glob)] if src_glob else []
+        inputs += [Path(mesh)] if mesh else []
+        outputs = [paths["energy"]]
+        if not getattr(args, "no_plot", False):
+            # fewer snapshots (or rank) than `modes` → only the written figures
+            written = _pod_mode_count(paths["energy"])
+            outputs += [p for row in paths["modes"][:written] for p in row]
+        return {"inputs": inputs, "shared": [paths["pts"], paths["matrix"]], "outputs": outputs}
+
+    pts_path, csv_out = _sample_paths(sect, base, args)
+    src = sect.get("src-file", base.get("src-file", sect.get("src", base.get("src", ""))))
+    mesh = sect.get("mesh", cfg.get("postprocess-mesh", "mesh-native", fallback=""))
+    src_glob = sect.get("src-glob", base.get("src-glob", ""))
+    if src_glob:                      # snapshots replace the single src-file
+        src = ""
+        inputs += [Path(p) for p in _glob.glob(src_glob)]
+    inputs += [Path(p) for p in (src, mesh) if p]
+
+    outfile = Path(first_key(sect, "file", "output", default=f"{sec_name}.png"))
+    outputs = [] if getattr(args, "no_plot", False) else [outfile]
+    if not sect.get("zexpr", base.get("zexpr", "")):
+        outputs.append(Path(sect.get("csv-file", base.get("csv-file", outfile.with_suffix(".csv")))))
+    return {"inputs": inputs, "shared": [pts_path, csv_out], "outputs": outputs}
+
+
+def _is_up_to_date(io: dict[str, list[Path]]) -> bool:
+    """True when every output exists and is newer than every existing input."""
+    try:
+        oldest_out = min(p.stat().st_mtime for p in io["outputs"])
+    except (FileNotFoundError, ValueError):
+        return False
+    newest_in = max((p.stat().st_mtime for p in io["inputs"] + io["shared"] if p.exists()),
+                    default=0.0)
+    return oldest_out >= newest_in
+
+
+def build_section_graph(cfg, names: Sequence[str], args) -> dict[str, set[str]]:
+    """
+    Map each section to the sections it must wait for.  Sections inherit
+    `pts-file`/`sampled-file`/`ctg-csv` from `postprocess-<family>-base`, so two
+    sections resolving to the same file share it: the first one (INI order)
+    produces it, the rest depend on that producer.
+    """
+    producer: dict[Path, str] = {}
+    deps: dict[str, set[str]] = {n: set() for n in names}
+    for n in names:
+        for p in _section_io(cfg, n, args)["shared"]:
+            key = p.resolve()
+            if key in producer:
+                deps[n].add(producer[key])
+            else:
+                producer[key] = n
+    return deps
+
+
+def prefetch_samples(cfg, names: Sequence[str], args) -> None:
+    """
+    Fan the sampler calls of all *names* out through the executor (Slurm job
+    steps inside an allocation, local subprocesses otherwise) before the
+    plotting pool starts.  Sections then find their sampled CSV in place;
+    anything that failed here is simply retried by its own section.
+
+    Jobs reading the same (mesh, src, skip) with different points files are
+    coalesced: their points are merged into one de-duplicated set, sampled
+    in one pass and split back per job (`--no-coalesce` turns this off).
+    """
+    if args.reuse is not None:
+        return
+    cache = _sampler_cache(args)
+    groups: dict[str, list] = {}             # job key → [(csv_out, stamp key)]
+    jobs: dict[str, tuple] = {}              # job key → (mesh, src, pts, skip, tmp, desc)
+
+    for n in names:
+        sect = cfg[n]
+        family, base = _family_base(cfg, n)
+        if (family in ("paraview", "spectra", "pod") or sect.get("src-glob", base.get("src-glob", ""))
+                or _is_adaptive(sect, base)):
+            continue                          # these sample on their own
+        pts_path, csv_out = _sample_paths(sect, base, args)
+        try:
+            if not _ensure_points(sect, base, pts_path, base_env(cfg)):
+                continue
+            src, mesh, skip = _src_path(sect, base), _mesh_path(cfg, sect), _skip_value(sect, args)
+        except (Exception, SystemExit):
+            continue                          # the section reports it properly
+
+        if cache is None:
+            if csv_out.exists():
+                continue
+            key, desc = str(csv_out.resolve()), None
+        else:
+            key, desc = sampler_key(mesh=mesh, soln=src, pts=pts_path, skip=skip)
+            stamp = _key_stamp(csv_out)
+            if csv_out.exists() and stamp.exists() and stamp.read_text().strip() == key:
+                continue
+            if cache.lookup(key) is not None:
+                cache.materialize(key, csv_out)
+                stamp.write_text(key + "\n")
+                continue
+
+        groups.setdefault(key, []).append(csv_out)
+        if key not in jobs:
+            tmp = (cache.temp_path(key) if cache is not None
+                   else csv_out.with_name(f".{csv_out.name}.{os.getpid()}.part"))
+            tmp.parent.mkdir(parents=True, exist_ok=True)
+            jobs[key] = (mesh, src, pts_path, skip, tmp, desc)
+
+    if not jobs:
+        return
+
+    # one sampler pass per (mesh, src, skip) unless told otherwise
+    passes: dict[tuple, list[str]] = {}
+    for key, (mesh, src, pts, skip, tmp, desc) in jobs.items():
+        ident = (file_identity(mesh), file_identity(src), skip)
+        passes.setdefault(key if args.no_coalesce else ident, []).append(key)
+
+    tasks, merged = [], []
+    for keys in passes.values():
+        mesh, src, pts, skip, tmp, _ = jobs[keys[0]]
+        if len(keys) == 1:
+            tasks.append((_sampler_cmd(mesh=mesh, src=src, pts=pts, skip=skip), tmp))
+            merged.append(None)
+            continue
+        work = tmp.with_name(f".coalesced-{os.getpid()}-{len(tasks)}")
+        work.mkdir(parents=True, exist_ok=True)
+        inverse = merge_points([jobs[k][2] for k in keys], work / "pts.csv")
+        tasks.append((_sampler_cmd(mesh=mesh, src=src, pts=work / "pts.csv", skip=skip),
+                      work / "out.csv"))
+        merged.append((work, inverse))
+
+    ex = make_executor(args)
+    failed = set(ex.run_all(tasks, label="sampler step", keep_going=True))
+
+    done: set[str] = set()
+    for i, keys in enumerate(passes.values()):
+        if merged[i] is not None:
+            work, inverse = merged[i]
+            if i not in failed:
+                try:
+                    split_sampled(work / "out.csv", inverse, [jobs[k][4] for k in keys])
+                except ValueError as e:
+                    print(f"[pyfr_plot] (coalesce) {e} – {', '.join(keys)} not sampled")
+                    failed.add(i)
+            shutil.rmtree(work, ignore_errors=True)
+        if i not in failed:
+            done.update(keys)
+
+    for key in jobs:
+        *_, tmp, desc = jobs[key]
+        if key not in done:
+            tmp.unlink(missing_ok=True)
+            continue
+        if cache is None:
+            os.replace(tmp, groups[key][0])
+            continue
+        cache.store(key, tmp, desc)
+        for csv_out in groups[key]:
+            cache.materialize(key, csv_out)
+            _key_stamp(csv_out).write_text(key + "\n")
+
+
+_POOL_CFG: configparser.ConfigParser | None = None
+_POOL_ARGS: argparse.Namespace | None = None
+_POOL_RUN: Callable | None = None
+
+
+def _pool_init(ini: str, args: argparse.Namespace, run: Callable):
+    global _POOL_CFG, _POOL_ARGS, _POOL_RUN
+    _POOL_CFG = configparser.ConfigParser()
+    _POOL_CFG.optionxform = str
+    _POOL_CFG.read(ini)
+    # pool workers already overlap sections with each other: render inline
+    _POOL_ARGS = argparse.Namespace(**{**vars(args), "sync_render": True})
+    _POOL_RUN = run
+    configure_locator(_POOL_CFG, args)
+    TRACE.events.clear()             # forked: the parent's events are not ours
+    if getattr(args, "trace", None):
+        TRACE.enable("worker")
+
+
+def _pool_run(sec_name: str) -> list[dict]:
+    """Run one section in a pool worker; returns its trace events."""
+    try:
+        with stage("section", sec_name):
+            _POOL_RUN(_POOL_CFG, sec_name, _POOL_ARGS, subcall=False)
+    except SystemExit as e:          # sys.exit() inside a worker → normal error
+        if e.code not in (None, 0):
+            raise RuntimeError(str(e.code)) from None
+    return TRACE.take()
+
+
+def run_sections(cfg, names: Sequence[str], args, run: Callable) -> int:
+    """
+    Run *names* through *run* (`run(cfg, sec_name, args, subcall=False)`)
+    honouring dependencies; returns the number of failures.
+    """
+    deps = build_section_graph(cfg, names, args)
+
+    todo = []
+    for n in names:
+        if not args.force and _is_up_to_date(_section_io(cfg, n, args)):
+            print(f"[pyfr_plot] (batch) up to date, skipping: {n}")
+        else:
+            todo.append(n)
+    skipped = set(names) - set(todo)
+    deps = {n: deps[n] - skipped for n in todo}
+
+    with stage("prefetch"):
+        prefetch_samples(cfg, todo, args)
+
+    jobs = max(1, min(args.jobs or 1, len(todo) or 1))
+    print(_bold(f"[pyfr_plot] (batch) {len(todo)}/{len(names)} sections, {jobs} worker(s)"))
+
+    failed: dict[str, str] = {}
+    done: set[str] = set()
+
+    def _ready(pending):
+        return [n for n in pending if deps[n] <= done]
+
+    def _block_dependents(name):
+        for n in todo:
+            if name in deps[n] and n not in failed:
+                failed[n] = f"dependency {name} failed"
+                _block_dependents(n)
+
+    pending = list(todo)
+    if jobs == 1:
+        for n in pending:
+            if n in failed:
+                continue
+            try:
+                with stage("section", n):
+                    run(cfg, n, args, subcall=False)
+                done.add(n)
+            except (Exception, SystemExit) as e:
+                failed[n] = str(e)
+                _block_dependents(n)
+        for n, why in drain_renders():
+            done.discard(n)
+            failed[n] = why
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_pool_init,
+                                 initargs=(args.ini, args, run)) as pool:
+            running = {}
+            while pending or running:
+                for n in _ready(pending):
+                    pending.remove(n)
+                    running[pool.submit(_pool_run, n)] = n
+                if not running:
+                    break                    # everything left is blocked
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    n = running.pop(fut)
+                    try:
+                        TRACE.extend(fut.result())
+                        done.add(n)
+                    except Exception as e:
+                        failed[n] = str(e)
+                        _block_dependents(n)
+                pending = [n for n in pending if n not in failed]
+
+    for n, why in failed.items():
+        print(f"[pyfr_plot] (batch) FAILED {n}: {why}", file=sys.stderr)
+    print(_green(f"[pyfr_plot] (batch) done: {len(done)} ran, {len(skipped)} up to date, "
+                 f"{len(failed)} failed"))
+    return len(failed)
+
+
+# ----------------------------------------------------------------------------
+# Watch mode: poll section inputs, debounce, re-run only affected sections
+# ----------------------------------------------------------------------------
+def _file_stamp(p: Path) -> tuple[int, int] | None:
+    try:
+        st = p.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _watched_inputs(cfg, names: Sequence[str], args) -> dict[Path, set[str]]:
+    """Input file → sections reading it (globs such as src-glob re-expanded)."""
+    out: dict[Path, set[str]] = {}
+    for n in names:
+        for p in _section_io(cfg, n, args)["inputs"]:
+            out.setdefault(Path(p), set()).add(n)
+    return out
+
+
+def watch_sections(args, run: Callable) -> None:
+    """
+    Run the selected sections, then poll their inputs (INI, src-file, mesh,
+    src-glob matches, input-vtu) every `--poll` seconds.  A new or changed
+    file is only acted on once its size and mtime have been stable for
+    `--settle` seconds, so snapshots still being written by PyFR are never
+    sampled.  Only the sections reading a settled file re-run; an INI change
+    reloads the config and re-runs every selected section.  Ctrl-C stops.
+    """
+    ini = Path(args.ini)
+
+    def load():
+        cfg = configparser.ConfigParser()
+        cfg.optionxform = str
+        cfg.read(ini)
+        configure_locator(cfg, args)
+        _ENV0_CACHE.clear()
+        names = list_sections(cfg, args.sections) if (args.all or args.sections) else [args.section]
+        return cfg, names
+
+    cfg, names = load()
+    run_sections(cfg, names, args, run)
+    rerun_args = argparse.Namespace(**{**vars(args), "force": True})
+
+    watched = _watched_inputs(cfg, names, args)
+    seen = {p: _file_stamp(p) for p in watched}
+    pending: dict[Path, tuple[tuple[int, int] | None, float]] = {}   # path → (stamp, since)
+    print(_bold(f"[pyfr_plot] (watch) {len(names)} section(s), {len(seen)} input(s); "
+                f"poll {args.poll:g}s, settle {args.settle:g}s – Ctrl-C to stop"))
+
+    try:
+        while True:
+            time.sleep(args.poll)
+            watched = _watched_inputs(cfg, names, args)
+            now = time.monotonic()
+            for p in watched:
+                st = _file_stamp(p)
+                if st == seen.get(p):
+                    pending.pop(p, None)
+                elif p not in pending or pending[p][0] != st:
+                    pending[p] = (st, now)            # (re)start the settle clock
+
+            ready = [p for p, (st, t0) in pending.items() if now - t0 >= args.settle]
+            if not ready:
+                continue
+            for p in ready:
+                seen[p] = pending.pop(p)[0]
+            ready = [p for p in ready if seen[p] is not None]   # deletions: just forget
+            if not ready:
+                continue
+
+            if ini in ready:
+                cfg, names = load()
+                affected = list(names)
+            else:
+                hit = set().union(*(watched[p] for p in ready))
+                affected = [n for n in names if n in hit]
+            print(_bold(f"[pyfr_plot] (watch) {len(ready)} input(s) settled "
+                        f"({', '.join(p.name for p in ready[:3])}{' …' if len(ready) > 3 else ''}) "
+                        f"→ {len(affected)} section(s)"))
+            run_sections(cfg, affected, rerun_args, run)
+    except KeyboardInterrupt:
+        print("\n[pyfr_plot] (watch) stopped")
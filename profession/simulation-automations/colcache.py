@@ -0,0 +1,159 @@
+# ───────────────────────── colcache.py ─────────────────────────
+"""Memory-mapped column sidecars for sampled CSVs – imported by the main script."""
+
+from __future__ import annotations
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+SCHEMA = "schema.json"
+VERSION = 2
+CHUNK_ROWS = 1 << 20            # CSV rows parsed per block while building
+
+
+def sidecar_dir(csv_path: Path) -> Path:
+    """`sampled.csv` → `sampled.csv.cols/`."""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + ".cols")
+
+
+def _source_stamp(path: Path) -> dict:
+    st = Path(path).stat()
+    # inode too: a sampler-cache hit replaces the CSV with a fresh copy
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino}
+
+
+class ColumnTable(Mapping):
+    """
+    Read-only name → array mapping over a sidecar.  Columns are memory-mapped
+    (raw float64) on first access only, so a section whose expressions use
+    three of twenty columns never touches the other seventeen.  Names are
+    exposed with `-` replaced by `_` (the expression spelling); `derived`
+    entries are computed on first access.
+    """
+
+    def __init__(self, root: Path, schema: dict):
+        self.root = Path(root)
+        self.nrows = int(schema["nrows"])
+        self.source_columns = [c["name"] for c in schema["columns"]]
+        self._files = {c["name"].replace("-", "_"): c["file"] for c in schema["columns"]}
+        self._loaded: dict[str, np.ndarray] = {}
+        self._derived: dict[str, Callable[["ColumnTable"], object]] = {}
+
+    def derive(self, name: str, fn: Callable[["ColumnTable"], object]):
+        self._derived[name] = fn
+
+    def __getitem__(self, key: str):
+        if key not in self._loaded:
+            if key in self._files:
+                self._loaded[key] = (np.memmap(self.root / self._files[key], dtype="<f8",
+                                               mode="r", shape=(self.nrows,))
+                                     if self.nrows else np.empty(0))
+            elif key in self._derived:
+                self._loaded[key] = self._derived[key](self)
+            else:
+                raise KeyError(key)
+        return self._loaded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._files
+        yield from (k for k in self._derived if k not in self._files)
+
+    def __len__(self) -> int:
+        return len(set(self._files) | set(self._derived))
+
+    @property
+    def loaded(self) -> list[str]:
+        return sorted(self._loaded)
+
+
+def _read_schema(root: Path) -> dict | None:
+    try:
+        return json.loads((root / SCHEMA).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _build(csv_path: Path, root: Path, stamp: dict, frames: Iterable) -> dict | None:
+    """
+    Append each DataFrame block of *frames* to one raw little-endian float64
+    file per column, so peak memory is one parsed block however long the CSV.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    tag = f"{stamp['mtime_ns']:x}"
+    pid = os.getpid()
+    names: list[str] = []
+    parts: list[Path] = []
+    handles: list = []
+    nrows, ok = 0, False
+    from pandas.api.types import is_bool_dtype, is_numeric_dtype
+    try:
+        for df in frames:
+            # pandas extension dtypes (StringDtype, Int64, ...) are not NumPy dtypes
+            if not all(is_numeric_dtype(dt) and not is_bool_dtype(dt) for dt in df.dtypes):
+                return None                     # text columns: keep the CSV path
+            if not handles:
+                names = [str(c) for c in df.columns]
+                parts = [root / f".{tag}-{i:03d}.bin.{pid}.part" for i in range(len(names))]
+                handles = [p.open("wb") for p in parts]
+            for fh, c in zip(handles, df.columns):
+                fh.write(np.ascontiguousarray(df[c].to_numpy(dtype="<f8", na_value=np.nan)).tobytes())
+            nrows += len(df)
+        ok = bool(handles)                      # an empty CSV is not worth caching
+    finally:
+        for fh in handles:
+            fh.close()
+        if not ok:
+            for p in parts:
+                p.unlink(missing_ok=True)
+    if not ok:
+        return None
+
+    cols = []
+    for i, (name, part) in enumerate(zip(names, parts)):
+        fname = f"{tag}-{i:03d}.bin"
+        os.replace(part, root / fname)
+        cols.append({"name": name, "file": fname, "dtype": "float64"})
+
+    schema = {"version": VERSION, "source": str(csv_path), **stamp,
+              "nrows": nrows, "columns": cols}
+    tmp = root / f".{SCHEMA}.{pid}.part"
+    tmp.write_text(json.dumps(schema, indent=1))
+    os.replace(tmp, root / SCHEMA)              # schema last: readers see whole sets
+
+    keep = {c["file"] for c in cols} | {SCHEMA}
+    for p in [*root.glob("*.bin"), *root.glob("*.npy")]:
+        if p.name not in keep:
+            p.unlink(missing_ok=True)
+    return schema
+
+
+def load_columns(csv_path: Path, parse: Callable[[Path], "object"], *,
+                 chunks: Callable[[Path, int], Iterable] | None = None,
+                 chunk_rows: int = CHUNK_ROWS) -> ColumnTable | None:
+    """
+    Column table for *csv_path*, parsing it with *parse* (→ DataFrame) and
+    writing the sidecar only when the sidecar is missing or the CSV's
+    size/mtime/inode changed.  None when the CSV has non-numeric columns.
+    With *chunks* (path, rows → DataFrame blocks) the CSV is parsed
+    *chunk_rows* rows at a time instead of whole.
+    """
+    csv_path = Path(csv_path)
+    root = sidecar_dir(csv_path)
+    stamp = _source_stamp(csv_path)
+    schema = _read_schema(root)
+    fresh = (schema is not None and schema.get("version") == VERSION
+             and all(schema.get(k) == v for k, v in stamp.items()))
+    if not fresh:
+        frames = chunks(csv_path, chunk_rows) if chunks else [parse(csv_path)]
+        schema = _build(csv_path, root, stamp, frames)
+        if schema is None:
+            return None
+        print(f"[colcache] indexed {csv_path.name}: {schema['nrows']} rows × "
+              f"{len(schema['columns'])} columns → {root.name}/")
+    return ColumnTable(root, schema)
+
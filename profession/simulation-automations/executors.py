@@ -0,0 +1,167 @@
+# ───────────────────────── executors.py ─────────────────────────
+"""Sampler executors: local subprocesses or Slurm job steps – imported by the main script."""
+
+from __future__ import annotations
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Sequence
+
+
+def _pass_slurm_pmi_fd_to_child() -> tuple[int, ...]:
+    """
+    Under Slurm+PMI2, MPICH uses PMI_FD to talk to the PMI server.
+    That FD is close-on-exec by default, so subprocesses lose it unless
+    we explicitly pass it through exec() via pass_fds.
+    """
+    pmi = os.environ.get("PMI_FD", "")
+    if not pmi:
+        return ()
+
+    try:
+        fd = int(pmi)
+    except ValueError:
+        print("[pyfr_plot] (mpi) PMI_FD is not an int; not passing to child", flush=True)
+        return ()
+
+    try:
+        os.set_inheritable(fd, True)
+    except OSError as e:
+        print(f"[pyfr_plot] (mpi) could not set PMI_FD inheritable: {e}", flush=True)
+        return ()
+
+    print("[pyfr_plot] (mpi) passing PMI_FD to child so MPICH can initialise", flush=True)
+    return (fd,)
+
+
+class LocalExecutor:
+    """Run sampler commands as child processes, at most *slots* at a time."""
+
+    kind = "local"
+
+    def __init__(self, slots: int = 1):
+        self.slots = max(1, int(slots))
+
+    def command(self, cmd: list[str]) -> list[str]:
+        return list(cmd)
+
+    def _popen(self, cmd, fh, *, solo: bool):
+        if solo:
+            # one child: it may inherit the Slurm PMI_FD (see below)
+            return subprocess.Popen(self.command(cmd), stdout=fh,
+                                    pass_fds=_pass_slurm_pmi_fd_to_child())
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PMI_")}
+        return subprocess.Popen(self.command(cmd), stdout=fh, env=env)
+
+    def run_one(self, cmd: list[str], out: Path):
+        print("[pyfr_plot] Running:", " ".join(self.command(cmd)), flush=True)
+        with out.open("w") as fh:
+            p = self._popen(cmd, fh, solo=True)
+            if p.wait() != 0:
+                raise subprocess.CalledProcessError(p.returncode, cmd)
+
+    def run_all(self, tasks: Sequence[tuple[list[str], Path]], *, label: str = "step",
+                keep_going: bool = False) -> list[int]:
+        """
+        Run every *(cmd, stdout_path)* with at most `slots` concurrently.  The
+        first failure kills whatever is still running and is re-raised, unless
+        *keep_going*, in which case the 0-based indices of failed tasks are
+        returned once everything has finished.
+        """
+        if len(tasks) == 1 and not keep_going:
+            self.run_one(*tasks[0])
+            return []
+        failed: list[int] = []
+        pending = list(enumerate(tasks, 1))
+        running: list[tuple[int, list[str], subprocess.Popen, object, float]] = []
+        ntot = len(tasks)
+        print(f"[pyfr_plot] ({self.kind}) {ntot} {label}s, ≤{self.slots} concurrent", flush=True)
+        try:
+            while pending or running:
+                while pending and len(running) < self.slots:
+                    i, (cmd, out) = pending.pop(0)
+                    fh = Path(out).open("w")
+                    running.append((i, cmd, self._popen(cmd, fh, solo=False), fh, time.time()))
+                time.sleep(0.05)
+                for item in list(running):
+                    i, cmd, p, fh, t0 = item
+                    if p.poll() is None:
+                        continue
+                    running.remove(item)
+                    fh.close()
+                    if p.returncode != 0:
+                        if not keep_going:
+                            raise subprocess.CalledProcessError(p.returncode, self.command(cmd))
+                        failed.append(i - 1)
+                        print(f"[pyfr_plot] ({self.kind}) {label} {i}/{ntot} FAILED "
+                              f"(rc={p.returncode})", file=sys.stderr, flush=True)
+                        continue
+                    print(f"[pyfr_plot] ({self.kind}) {label} {i}/{ntot} done "
+                          f"in {time.time() - t0:.1f} s", flush=True)
+        except BaseException:
+            for _, _, p, fh, _ in running:
+                if p.poll() is None:
+                    p.kill()
+                    p.wait()
+                fh.close()
+            raise
+        return failed
+
+
+class SlurmExecutor(LocalExecutor):
+    """
+    Launch each sampler call as its own `srun` job step inside the current
+    allocation.  `--exact` confines a step to the resources it asks for, so
+    `slots` steps of `ntasks` × `cpus` share the allocation side by side.
+    Steps get their own PMI from srun, so PMI_FD is never forwarded.
+    """
+
+    kind = "slurm"
+
+    def __init__(self, srun: str, *, ntasks: int = 1, cpus: int = 1, slots: int | None = None):
+        self.srun, self.ntasks, self.cpus = srun, max(1, ntasks), max(1, cpus)
+        total = int(os.environ.get("SLURM_NTASKS") or os.environ.get("SLURM_NPROCS") or
+                    os.environ.get("SLURM_JOB_NUM_NODES") or 1)
+        super().__init__(slots or max(1, total // self.ntasks))
+
+    def command(self, cmd: list[str]) -> list[str]:
+        return [self.srun, "--exact", "--nodes=1", f"--ntasks={self.ntasks}",
+                f"--cpus-per-task={self.cpus}", "--kill-on-bad-exit=1", *cmd]
+
+    def _popen(self, cmd, fh, *, solo: bool):
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PMI_")}
+        return subprocess.Popen(self.command(cmd), stdout=fh, env=env)
+
+
+_EXECUTORS: dict[int, LocalExecutor] = {}
+
+
+def make_executor(args) -> LocalExecutor:
+    """
+    `--executor auto` picks Slurm job steps inside an allocation (SLURM_JOB_ID
+    set and srun found), local subprocesses otherwise.  `--srun` (or
+    $PYFR_PLOT_SRUN) may point at a stand-in script for testing.
+    """
+    key = id(args)
+    if key in _EXECUTORS:
+        return _EXECUTORS[key]
+
+    kind = getattr(args, "executor", "auto") or "auto"
+    srun = getattr(args, "srun", None) or os.environ.get("PYFR_PLOT_SRUN", "srun")
+    slots = getattr(args, "max_steps", None)
+    if kind == "auto":
+        kind = "slurm" if (os.environ.get("SLURM_JOB_ID") and shutil.which(srun)) else "local"
+
+    if kind == "slurm":
+        if not shutil.which(srun):
+            sys.exit(f"[pyfr_plot] --executor slurm but '{srun}' not found")
+        cpus = getattr(args, "step_cpus", None) or int(os.environ.get("SLURM_CPUS_PER_TASK", 1))
+        ex = SlurmExecutor(srun, ntasks=getattr(args, "step_ntasks", 1) or 1,
+                           cpus=cpus, slots=slots)
+    else:
+        ex = LocalExecutor(slots or 1)
+    _EXECUTORS[key] = ex
+    return ex
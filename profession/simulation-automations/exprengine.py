@@ -0,0 +1,278 @@
+# ───────────────────────── exprengine.py ─────────────────────────
+"""
+Compiled `xexpr`/`yexpr`/`zexpr`/`stdexpr` evaluation – imported by the main script.
+
+All expressions of a section are parsed once into one program: names are
+checked against the sampled columns + constants, common sub-expressions are
+shared across x/y/z/std (`a+b` and `b+a` are the same node), scalar-only
+parts are folded once, and the rest runs over row blocks so temporaries stay
+at block size instead of full-column size.
+"""
+
+from __future__ import annotations
+import ast
+import operator
+from typing import Iterable, Mapping
+
+import numpy as np
+
+CHUNK_ROWS = 1 << 16
+
+FUNCS = {
+    "sqrt": np.sqrt, "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "log": np.log, "exp": np.exp, "abs": np.abs,
+}
+CONSTS = {"pi": np.pi}
+
+# non-ufunc NumPy callables that are still element-wise (safe to chunk)
+_ELEMENTWISE = {np.where, np.clip, np.nan_to_num}
+
+_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Pow: operator.pow,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+    # comparisons (`y > 0`, `np.where(y > 0, u, 0)`)
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+_UNOPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+_COMMUTATIVE = {ast.Add, ast.Mult, ast.BitAnd, ast.BitOr, ast.BitXor, ast.Eq, ast.NotEq}
+
+
+def _apply(payload, vals: list):
+    """Call `payload = (fn, keyword names)`: the last len(names) values are keywords."""
+    fn, kw = payload
+    pos = vals[:len(vals) - len(kw)]
+    return fn(*pos, **dict(zip(kw, vals[len(pos):])))
+
+
+def _pack(*items):
+    return tuple(items)
+
+
+class ExprError(ValueError):
+    """Raised for unknown names or syntax outside the supported subset."""
+
+
+class ExprProgram:
+    """
+    Straight-line program for a group of named expressions.
+
+    >>> prog = ExprProgram({"y": "sqrt(a*b)/U", "s": "a*b - 1"}, names=["a", "b", "U"])
+    >>> out = prog.evaluate({"a": a, "b": b, "U": 2.0})
+    """
+
+    def __init__(self, exprs: Mapping[str, str], names: Iterable[str]):
+        self.sources = {k: v for k, v in exprs.items() if v}
+        self._known = set(names)
+        self.ops: list[tuple] = []            # (kind, payload, args)
+        self._memo: dict[tuple, int] = {}
+        self.outputs: dict[str, int] = {}
+        self.names: set[str] = set()          # variables actually referenced
+        self.chunkable = True
+
+        for key, src in self.sources.items():
+            try:
+                tree = ast.parse(src.strip(), mode="eval")
+            except SyntaxError as e:
+                raise ExprError(f"cannot parse {key}expr '{src}': {e.msg}") from None
+            self._src = src
+            self.outputs[key] = self._emit(tree.body)
+
+        self._last_use = self._liveness()
+
+    # ---------- compilation ----------------------------------------------
+    def _push(self, kind, payload, args=()) -> int:
+        # constants are told apart by type too: True, 1 and 1.0 hash alike
+        sig = (kind, (type(payload), payload) if kind == "const" else payload, tuple(args))
+        if sig not in self._memo:
+            self._memo[sig] = len(self.ops)
+            self.ops.append((kind, payload, tuple(args)))
+        return self._memo[sig]
+
+    def _emit(self, node) -> int:
+        if isinstance(node, ast.Constant) and (node.value is None
+                                               or isinstance(node.value, (bool, int, float))):
+            return self._push("const", node.value)
+
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                and node.value.id == "np" and "np" not in self._known):
+            val = getattr(np, node.attr, None)      # np.pi, np.e, np.inf, np.nan
+            if isinstance(val, float):
+                return self._push("const", val)
+
+        if isinstance(node, ast.Name):
+            if node.id in self._known:
+                self.names.add(node.id)
+                return self._push("var", node.id)
+            if node.id in CONSTS:
+                return self._push("const", CONSTS[node.id])
+            raise ExprError(f"unknown name '{node.id}' in '{self._src}'. "
+                            f"Available: {', '.join(sorted(self._known))}")
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            a, b = self._emit(node.left), self._emit(node.right)
+            if type(node.op) in _COMMUTATIVE:
+                a, b = sorted((a, b))
+            return self._push("bin", type(node.op), (a, b))
+
+        if isinstance(node, ast.Compare):
+            # `a < b < c` → (a < b) & (b < c), as NumPy arrays need
+            terms = [self._emit(node.left)] + [self._emit(c) for c in node.comparators]
+            out = None
+            for op, a, b in zip(node.ops, terms, terms[1:]):
+                if type(op) not in _BINOPS:
+                    break
+                if type(op) in _COMMUTATIVE:
+                    a, b = sorted((a, b))
+                cmp = self._push("bin", type(op), (a, b))
+                out = cmp if out is None else self._push("bin", ast.BitAnd, tuple(sorted((out, cmp))))
+            else:
+                return out
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNOPS:
+            return self._push("unary", type(node.op), (self._emit(node.operand),))
+
+        if isinstance(node, ast.Subscript):
+            # `u[0]`, `u[1:-1]` pick rows, so the program needs whole columns
+            self.chunkable = False
+            return self._push("item", None, (self._emit(node.value), self._emit_index(node.slice)))
+
+        if isinstance(node, ast.Call) and all(k.arg for k in node.keywords):
+            args = tuple(self._emit(a) for a in node.args)
+            kw = tuple(k.arg for k in node.keywords)
+            args += tuple(self._emit(k.value) for k in node.keywords)
+            fn = self._resolve_func(node.func)
+            if fn is not None:
+                if not (isinstance(fn, np.ufunc) or fn in _ELEMENTWISE):
+                    self.chunkable = False        # e.g. np.mean needs whole columns
+                return self._push("call", (fn, kw), args)
+            if isinstance(node.func, ast.Attribute):
+                # method on a value, e.g. avg_u.min() – needs the whole column
+                self.chunkable = False
+                obj = self._emit(node.func.value)
+                return self._push("method", (node.func.attr, kw), (obj, *args))
+
+        raise ExprError(f"unsupported syntax '{ast.unparse(node)}' in '{self._src}'")
+
+    def _emit_index(self, node) -> int:
+        if isinstance(node, ast.Slice):
+            parts = (node.lower, node.upper, node.step)
+            return self._push("call", (slice, ()), tuple(
+                self._push("const", None) if p is None else self._emit(p) for p in parts))
+        if isinstance(node, ast.Tuple):
+            return self._push("call", (_pack, ()), tuple(self._emit_index(e) for e in node.elts))
+        return self._emit(node)
+
+    def _resolve_func(self, func):
+        if isinstance(func, ast.Name) and func.id in FUNCS and func.id not in self._known:
+            return FUNCS[func.id]
+        if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+                and func.value.id == "np" and not func.attr.startswith("_")):
+            fn = getattr(np, func.attr, None)
+            if callable(fn):
+                return fn
+            raise ExprError(f"np.{func.attr} is not a NumPy function")
+        return None
+
+    def _liveness(self) -> list[int]:
+        last = list(range(len(self.ops)))
+        for i, (_, _, args) in enumerate(self.ops):
+            for a in args:
+                last[a] = i
+        for i in self.outputs.values():
+            last[i] = len(self.ops)               # outputs live to the end
+        return last
+
+    # ---------- evaluation -----------------------------------------------
+    def _run(self, env, vals: dict[int, object], lo: int | None, hi: int | None,
+             todo: Iterable[int], *, free: bool = True):
+        for i in todo:
+            kind, payload, args = self.ops[i]
+            if kind == "const":
+                v = payload
+            elif kind == "var":
+                v = env[payload]
+                if lo is not None and isinstance(v, np.ndarray) and v.ndim:
+                    v = v[lo:hi]
+            elif kind == "bin":
+                v = _BINOPS[payload](vals[args[0]], vals[args[1]])
+            elif kind == "unary":
+                v = _UNOPS[payload](vals[args[0]])
+            elif kind == "call":
+                v = _apply(payload, [vals[a] for a in args])
+            elif kind == "item":
+                v = vals[args[0]][vals[args[1]]]
+            else:                                  # method
+                name, kw = payload
+                v = _apply((getattr(vals[args[0]], name), kw), [vals[a] for a in args[1:]])
+            vals[i] = v
+            if free:                               # drop block temporaries early
+                for a in args:
+                    if self._last_use[a] == i:
+                        vals.pop(a, None)
+
+    def _scalar_ops(self, env) -> set[int]:
+        """Ops that depend only on constants / scalar env entries."""
+        scalar: set[int] = set()
+        for i, (kind, payload, args) in enumerate(self.ops):
+            if kind == "const":
+                scalar.add(i)
+            elif kind == "var":
+                if np.ndim(env[payload]) == 0:
+                    scalar.add(i)
+            elif kind != "method" and all(a in scalar for a in args):
+                scalar.add(i)
+        return scalar
+
+    def nrows(self, env) -> int | None:
+        for n in self.names:
+            v = env[n]
+            if isinstance(v, np.ndarray) and v.ndim:
+                return len(v)
+        return None
+
+    def evaluate(self, env: Mapping[str, object], *, chunk: int = CHUNK_ROWS
+                 ) -> dict[str, np.ndarray | float]:
+        """
+        Evaluate every expression; array outputs are float64 of full length
+        (or, for subscripts such as `u[1:-1]`, whatever length they select).
+        """
+        missing = self.names - set(env)
+        if missing:
+            raise ExprError(f"missing values for {', '.join(sorted(missing))}")
+
+        scalar = self._scalar_ops(env)
+        vals: dict[int, object] = {}
+        self._run(env, vals, None, None, sorted(scalar), free=False)
+        fixed = dict(vals)                         # folded once, reused per block
+
+        n = self.nrows(env)
+        out: dict[str, np.ndarray | float] = {}
+        vector = [i for i in range(len(self.ops)) if i not in scalar]
+        if n is None:
+            return {k: float(fixed[i]) for k, i in self.outputs.items()}
+
+        step = chunk if self.chunkable else n
+        if step >= n:
+            # one block: results that are not per-row (`u[1:-1]`) are kept as they are
+            vals = dict(fixed)
+            self._run(env, vals, 0, n, vector)
+            for k, i in self.outputs.items():
+                v = np.asarray(vals[i], dtype=float)
+                out[k] = v if v.ndim and v.shape != (n,) else np.broadcast_to(v, (n,)).copy()
+            return out
+        for k in self.outputs:
+            out[k] = np.empty(n, dtype=float)
+        for lo in range(0, n, max(step, 1)):
+            hi = min(lo + step, n)
+            vals = dict(fixed)
+            self._run(env, vals, lo, hi, vector)
+            for k, i in self.outputs.items():
+                out[k][lo:hi] = vals[i]
+        return out
+
+    def evaluate_block(self, env: Mapping[str, object]) -> dict[str, np.ndarray | float]:
+        """Evaluate on whatever rows *env* holds (used for streamed blocks)."""
+        return self.evaluate(env, chunk=max(self.nrows(env) or 1, 1))
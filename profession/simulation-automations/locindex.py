@@ -0,0 +1,102 @@
+# ───────────────────────── locindex.py ─────────────────────────
+"""
+Cached point location for repeated sampling (experimental, opt-in) – imported by the main script.
+
+`pyfr sampler sample` locates every point in the mesh (element + reference
+coordinates) and then interpolates.  The location depends only on the mesh
+and the points, so a sampler that can split the two phases only needs to
+locate once per (mesh, points) pair.  Stock PyFR cannot do this: there are
+no locate / interpolate subcommands.  This module does not locate anything
+itself; it caches and reuses the index written by external commands that
+the INI names, and is used only with `--locate-index`:
+
+    [postprocess-sampler]
+    locate = /path/to/locate-tool {mesh} {pts} {index}
+    interp = /path/to/interp-tool {index} {mesh} {src} {skip}
+
+`locate` runs once per (mesh, points) pair and must write `{index}`;
+`interp` replaces the sampler call for every snapshot and prints the same
+CSV to stdout.  Indices live under `<cache>/locate/<key[:2]>/<key><suffix>`,
+keyed on the mesh identity (path, size, mtime), the points digest and the
+locate template.  When `locate` or `interp` fails, the plain sampler is used.
+"""
+
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+from pathlib import Path
+
+from samplecache import content_digest, file_identity
+
+FIELDS = ("mesh", "src", "pts", "skip", "index")
+
+
+def _fill(template: str, **vals) -> list[str]:
+    """Split *template* like a shell would, then substitute `{mesh}` etc. per token."""
+    return [tok.format(**{k: str(v) for k, v in vals.items()}) for tok in shlex.split(template)]
+
+
+class LocationIndex:
+    def __init__(self, root: Path, locate: str, interp: str, *, suffix: str = ".idx"):
+        for name, tpl in (("locate", locate), ("interp", interp)):
+            try:
+                _fill(tpl, **{k: "" for k in FIELDS})
+            except (KeyError, IndexError, ValueError) as e:
+                raise ValueError(f"[postprocess-sampler] {name}: bad template ({e})") from None
+        self.root = Path(root)
+        self.locate, self.interp = locate, interp
+        self.suffix = suffix
+        self.failed: set[str] = set()            # keys whose locate step failed this run
+
+    def key(self, mesh: Path, pts: Path) -> str:
+        desc = {"mesh": file_identity(mesh), "pts": content_digest(pts),
+                "locate": self.locate}
+        return hashlib.sha256(json.dumps(desc, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    def ensure(self, mesh: Path, pts: Path) -> Path | None:
+        """Index for (*mesh*, *pts*), locating once if needed; None if unavailable."""
+        key = self.key(mesh, pts)
+        idx = self.path(key)
+        if idx.exists():
+            return idx
+        if key in self.failed:
+            return None
+
+        idx.parent.mkdir(parents=True, exist_ok=True)
+        with open(idx.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)     # one locator per pair across workers
+            if idx.exists():
+                return idx
+            tmp = idx.with_name(f".{idx.stem}.{os.getpid()}.part{self.suffix}")
+            cmd = _fill(self.locate, mesh=mesh, pts=pts, index=tmp, src="", skip="")
+            print("[locindex] locating:", " ".join(cmd), flush=True)
+            log = idx.with_suffix(".log")
+            try:
+                with log.open("w") as fh:
+                    subprocess.run(cmd, stdout=fh, stderr=subprocess.STDOUT, check=True)
+                if not tmp.exists():
+                    raise FileNotFoundError(f"locate did not write {tmp}")
+                os.replace(tmp, idx)
+            except (OSError, subprocess.CalledProcessError) as e:
+                tmp.unlink(missing_ok=True)
+                self.failed.add(key)
+                print(f"[locindex] (warn) locate failed ({e}); see {log}. "
+                      f"Falling back to the plain sampler.", flush=True)
+                return None
+            (idx.parent / f"{key}.json").write_text(json.dumps(
+                {"mesh": file_identity(mesh), "pts": str(Path(pts).resolve())}, indent=1))
+        return idx
+
+    def command(self, *, mesh: Path, src: Path, pts: Path, skip: int) -> list[str] | None:
+        """The interpolation-only sampler command, or None to sample from scratch."""
+        idx = self.ensure(mesh, pts)
+        if idx is None:
+            return None
+        return _fill(self.interp, mesh=mesh, src=src, pts=pts, skip=skip, index=idx)
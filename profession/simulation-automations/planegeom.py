@@ -0,0 +1,138 @@
+# ───────────────────────── planegeom.py ─────────────────────────
+"""
+Reusable plane geometry (plotted grid + LOD blocks) – imported by the main script.
+
+A plane section's x2d / y2d depend only on the points file, the coordinate
+expressions, the reduction and the pixel budget – not on the quantity.  The
+first section over a points file stores the reduced grid and its LOD block
+edges; every later quantity on the same plane evaluates only `zexpr` and
+folds it onto the stored blocks.  Entries are kept per process and on disk
+as `<pts>.geom/<key[:16]>.npz`.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+VERSION = 1
+
+
+def block_edges(n: int, target: int) -> np.ndarray:
+    """Start indices of ≤ *target* near-equal blocks covering range(n)."""
+    if target <= 0 or n <= target:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n, target + 1)[:-1].astype(np.intp))
+
+
+class PlaneGeometry:
+    """
+    LOD grid of one structured plane: block-mean coordinates `x`, `y` over
+    blocks starting at rows *r* / columns *c* of the *full* (rows, cols) grid.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, r: np.ndarray, c: np.ndarray,
+                 full: tuple[int, int]):
+        self.x, self.y = x, y
+        self.r, self.c = np.asarray(r, dtype=np.intp), np.asarray(c, dtype=np.intp)
+        self.full = (int(full[0]), int(full[1]))
+
+    @property
+    def identity(self) -> bool:
+        return len(self.r) == self.full[0] and len(self.c) == self.full[1]
+
+    def _reduce(self, ufunc, a):
+        return ufunc.reduceat(ufunc.reduceat(a, self.r, axis=0), self.c, axis=1)
+
+    @classmethod
+    def build(cls, x2d, y2d, shape: tuple[int, int]) -> "PlaneGeometry":
+        """Blocks for at most *shape* = (rows, cols) cells of the x2d / y2d grid."""
+        full = x2d.shape
+        g = cls(x2d, y2d, block_edges(full[0], shape[0]), block_edges(full[1], shape[1]), full)
+        if not g.identity:
+            size = g.size()
+            g.x = g._reduce(np.add, np.asarray(x2d, dtype=float)) / size
+            g.y = g._reduce(np.add, np.asarray(y2d, dtype=float)) / size
+        return g
+
+    def size(self) -> np.ndarray:
+        return np.outer(np.diff(self.r, append=self.full[0]), np.diff(self.c, append=self.full[1]))
+
+    def field(self, z2d: np.ndarray) -> np.ndarray:
+        """
+        Fold a full-resolution field onto the blocks.  Per block it keeps
+        whichever of min / max lies farther from the block mean: a block is
+        at most one output pixel, so this is positionally exact to the pixel
+        while thin peaks and troughs (shear layers, vortex cores) survive,
+        which plain averaging would smear out.
+        """
+        if z2d.shape != self.full:
+            raise ValueError(f"field shape {z2d.shape} does not match the plane {self.full}")
+        if self.identity:
+            return z2d
+        finite = np.isfinite(z2d)
+        if finite.all():
+            cnt, zsum = self.size(), self._reduce(np.add, z2d)
+        else:
+            cnt = self._reduce(np.add, finite.astype(float))
+            zsum = self._reduce(np.add, np.where(finite, z2d, 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = zsum / cnt
+            zmin = self._reduce(np.fmin, z2d)
+            zmax = self._reduce(np.fmax, z2d)
+        z = np.where(zmax - mean >= mean - zmin, zmax, zmin)
+        z[cnt == 0] = np.nan
+        return z
+
+    # ---------- persistence ------------------------------------------------
+    def save(self, path: Path, key: str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.part.npz")
+        np.savez(tmp, version=VERSION, key=key, x=self.x, y=self.y,
+                 r=self.r, c=self.c, full=np.asarray(self.full))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, key: str) -> "PlaneGeometry | None":
+        try:
+            with np.load(path) as f:
+                if int(f["version"]) != VERSION or str(f["key"]) != key:
+                    return None
+                return cls(f["x"], f["y"], f["r"], f["c"], tuple(f["full"]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def geometry_key(**desc) -> str:
+    return hashlib.sha256(json.dumps(desc, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cache_path(pts: Path, key: str) -> Path:
+    """`plane_pts.csv` → `plane_pts.csv.geom/<key[:16]>.npz`."""
+    pts = Path(pts)
+    return pts.with_name(pts.name + ".geom") / f"{key[:16]}.npz"
+
+
+_GEOMS: dict[str, PlaneGeometry] = {}
+
+
+def lookup(pts: Path, key: str) -> PlaneGeometry | None:
+    """Stored geometry for *key*: this process first, then `<pts>.geom/`."""
+    if key not in _GEOMS:
+        g = PlaneGeometry.load(cache_path(pts, key), key)
+        if g is None:
+            return None
+        _GEOMS[key] = g
+    return _GEOMS[key]
+
+
+def store(pts: Path, key: str, geom: PlaneGeometry):
+    _GEOMS[key] = geom
+    try:
+        geom.save(cache_path(pts, key), key)
+    except OSError as e:                          # read-only case dir: memory only
+        print(f"[planegeom] (warn) cannot store plane geometry ({e})")
@@ -0,0 +1,376 @@
+# ───────────────────────── plotting.py ─────────────────────────
+"""Line / plane figures and the background Agg renderer – imported by the main script."""
+
+from __future__ import annotations
+import ast
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from planegeom import PlaneGeometry
+from sectionio import _plt
+from stagetrace import TRACE, stage
+
+
+REF_STYLES = [dict(color="red"       , marker="o"),  
+              dict(color="green"     , marker="s"),   
+              dict(color="tab:blue"  , marker="^"),  
+              dict(color="tab:orange", marker="D"),
+              dict(color="purple"    , marker="v"),
+]
+
+
+_BAND_HANDLER = None
+def _band_line_handler():
+    """Legend handler: draw a shaded band with a line on top (stacked)."""
+    global _BAND_HANDLER
+    if _BAND_HANDLER is not None:
+        return _BAND_HANDLER()
+
+    import matplotlib as mpl
+    from matplotlib.legend_handler import HandlerBase
+    from matplotlib.patches import Rectangle
+
+    class HandlerBandLine(HandlerBase):
+        def create_artists(self, legend, orig_handle,
+                           xdescent, ydescent, width, height, fontsize, trans):
+            line_color, band_rgba = orig_handle  # tuple passed as the "handle"
+            # band rectangle (60% of box height, vertically centered)
+            band = Rectangle((xdescent, ydescent + 0.0*height),
+                             width, 1*height,
+                             transform=trans,
+                             facecolor=band_rgba, edgecolor='none')
+            # line across middle
+            ymid = ydescent + 0.5*height
+            line = mpl.lines.Line2D([xdescent, xdescent + width],
+                                    [ymid, ymid],
+                                    transform=trans,
+                                    color=line_color, linewidth=2.5)
+            return [band, line]
+
+    _BAND_HANDLER = HandlerBandLine
+    return _BAND_HANDLER()
+
+
+_SUPS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+def _sup(n: int) -> str:
+    return "".join(_SUPS[ord(d) - 48] for d in str(n))
+
+
+def _set_limits_with_padding(ax, xs, ys, pad_x=0.02, pad_y=0.06, *,
+                             xscale="linear", yscale="linear"):
+    """
+    Autoscale to all data with a little padding so markers aren't cut.
+    Log axes pad in decades and ignore non-positive values.
+    """
+    import numpy as _np
+
+    def lims(v, pad, scale):
+        v = _np.asarray(v, dtype=float)
+        if scale == "log":
+            v = _np.log10(v[v > 0]) if (v > 0).any() else _np.zeros(1)
+        lo, hi = _np.nanmin(v), _np.nanmax(v)
+        r = hi - lo or 1.0
+        lo, hi = lo - pad * r, hi + pad * r
+        return (10.0 ** lo, 10.0 ** hi) if scale == "log" else (lo, hi)
+
+    ax.set_xscale(xscale); ax.set_yscale(yscale)
+    ax.set_xlim(*lims(xs, pad_x, xscale))
+    ax.set_ylim(*lims(ys, pad_y, yscale))
+
+
+# ---------- line plot --------------------------------------------------------
+def plot_line(x, y, std, refs, outfile, xlabel, ylabel, title="",
+              show_legend=True, show_ref_notes=True, *, pyfr_label="PyFR",
+              xscale="linear", yscale="linear"):
+    plt = _plt()
+    from matplotlib import colors as mcolors
+    plt.figure(figsize=(10, 5.2))
+    ax = plt.gca()
+
+    # --- PyFR band then line (line above the band) ---
+    py_line_obj = None
+    std_obj = None
+    base_col = "tab:blue"
+    band_rgba = mcolors.to_rgba(base_col, alpha=0.22)
+    std_obj = None
+    if std is not None:
+        std_obj = plt.fill_between(x, y - std, y + std,
+                                facecolor=band_rgba, linewidth=0, zorder=1)
+    py_line_obj = plt.plot(x, y, color=base_col, lw=3, zorder=2,
+                        solid_capstyle="round")[0]
+
+    # --- collect limits (so markers aren’t clipped) ---
+    all_x, all_y = [x], [y]
+    if std is not None:
+        all_y += [y - std, y + std]
+
+    ref_handles, ref_labels, notes = [], [], []
+    for i, ref in enumerate(refs):
+        rx, ry = ref.iloc[:, 0].values, ref.iloc[:, 1].values
+        all_x.append(rx); all_y.append(ry)
+        base_lbl = ref.attrs.get("label", ref.iloc[:, 0].name or "ref")
+        note = ref.attrs.get("refnote", "")
+        sup = ""
+        if note:
+            notes.append(note); sup = _sup(len(notes))
+        style = REF_STYLES[i % len(REF_STYLES)]
+        h = plt.scatter(rx, ry, s=5, facecolors="none",
+                        edgecolors=style["color"], marker=style["marker"],
+                        linewidths=1.0, clip_on=False, zorder=3)
+        ref_handles.append(h); ref_labels.append(f"{base_lbl}{sup}")
+
+    import numpy as _np
+    _set_limits_with_padding(ax, _np.concatenate(all_x), _np.concatenate(all_y),
+                             pad_x=0.02, pad_y=0.08, xscale=xscale, yscale=yscale)
+
+    plt.xlabel(xlabel); plt.ylabel(ylabel)
+    if title: plt.title(title)
+
+    # --- footnotes (unchanged) ---
+    if show_ref_notes and notes:
+        y0, dy = 0.012, 0.018
+        bottom = y0 + dy*len(notes) + 0.018
+        plt.tight_layout(rect=[0.0, bottom, 1.0, 1.0])
+        fig = plt.gcf()
+        for i, txt in enumerate(notes):
+            fig.text(0.5, y0 + dy*i, f"{_sup(i+1)} {txt}",
+                     ha="center", va="bottom", fontsize=8)
+    else:
+        plt.tight_layout(rect=[0.0, 0.04, 1.0, 1.0])
+
+    # --- legend: single entry for (band + line) so they appear stacked ---
+    if show_legend:
+        handles, labels = [], []
+        if std is not None:
+            pyfr_handle = (py_line_obj.get_color(), band_rgba)
+            handles.append(pyfr_handle)
+            labels.append(f"{pyfr_label} (μ±σ)")
+        else:
+            handles.append(py_line_obj)
+            labels.append(pyfr_label)
+
+        # append ref handles/labels you already collected as (scatter, label)
+        handles += ref_handles
+        labels  += ref_labels
+
+        ncols = 2 if len(refs) >= 3 else 1
+        plt.legend(handles, labels, frameon=False, ncol=ncols,
+                handler_map={tuple: _band_line_handler()})
+
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    with stage("savefig", Path(outfile).stem):
+        plt.savefig(outfile, dpi=300, bbox_inches="tight")
+    plt.close()
+    print(f"[pyfr_plot] Saved → {outfile}")
+
+
+# ---------- plane plot with level of detail ----------------------------------
+PLANE_DPI = 300
+
+
+PLANE_FIGSIZE = (10, 8)
+
+
+def _parse_pixels(spec) -> tuple[int, int] | None:
+    """`plot-resolution`: 'auto' (None → from the figure), 'full' ((0, 0)), or 'WxH'."""
+    spec = str(spec or "auto").strip().lower()
+    if spec == "auto":
+        return None
+    if spec in ("full", "none", "0"):
+        return (0, 0)
+    w, h = (int(float(t)) for t in spec.replace("×", "x").split("x"))
+    return (w, h)
+
+
+def _parse_levels(txt: str):
+    """`levels = lo, hi, n` → linspace; a longer list is taken as explicit levels."""
+    if not str(txt or "").strip():
+        return None
+    vals = [float(v) for v in ast.literal_eval(f"[{str(txt).strip().strip('[]')}]")]
+    if len(vals) == 3 and vals[2] == int(vals[2]) and vals[2] > 1:
+        return np.linspace(vals[0], vals[1], int(vals[2]))
+    return np.asarray(vals)
+
+
+def _plane_lod_shape(x2d, y2d, pixels) -> tuple[int, int]:
+    """
+    (rows, cols) cell budget: the equal-aspect axes box in output pixels
+    (default subplot area of PLANE_FIGSIZE at PLANE_DPI, or *pixels*),
+    mapped onto whichever array axis carries x.
+    """
+    if pixels is None:
+        import matplotlib as mpl                  # rcParams only, no pyplot
+        rc = mpl.rcParams
+        w = PLANE_FIGSIZE[0] * (rc["figure.subplot.right"] - rc["figure.subplot.left"]) * PLANE_DPI
+        h = PLANE_FIGSIZE[1] * (rc["figure.subplot.top"] - rc["figure.subplot.bottom"]) * PLANE_DPI
+        xr = float(np.nanmax(x2d) - np.nanmin(x2d))
+        yr = float(np.nanmax(y2d) - np.nanmin(y2d))
+        if xr > 0 and yr > 0:                     # set_aspect("equal") shrinks one side
+            w, h = min(w, h * xr / yr), min(h, w * yr / xr)
+        w, h = max(int(w), 1), max(int(h), 1)
+    else:
+        w, h = pixels
+    if x2d.ndim != 2 or min(x2d.shape) < 2:
+        return (h, w)
+    # x along array columns → cols get the width, else the rows do
+    along_cols = np.nanmean(np.abs(np.diff(x2d, axis=1))) >= np.nanmean(np.abs(np.diff(x2d, axis=0)))
+    return (h, w) if along_cols else (w, h)
+
+
+def plane_geometry(x2d, y2d, pixels=None) -> PlaneGeometry:
+    """LOD blocks of the x2d / y2d grid for *pixels* ((0, 0) = one block per cell)."""
+    shape = (0, 0) if pixels == (0, 0) else _plane_lod_shape(x2d, y2d, pixels)
+    return PlaneGeometry.build(x2d, y2d, shape)
+
+
+def plane_lod(x2d, y2d, z2d, pixels=None, *, geom: PlaneGeometry | None = None):
+    """
+    Reduce a plane to its pixel budget (idempotent; (0, 0) = keep all).
+    With *geom* the stored grid and blocks are used and x2d / y2d ignored.
+    """
+    if geom is None:
+        if pixels == (0, 0):
+            return x2d, y2d, z2d
+        geom = plane_geometry(x2d, y2d, pixels)
+    n0 = z2d.size
+    x2d, y2d, z2d = geom.x, geom.y, geom.field(z2d)
+    if z2d.size < n0:
+        print(f"[pyfr_plot] plane LOD: {n0} → {z2d.size} cells "
+              f"({z2d.shape[0]}×{z2d.shape[1]})")
+    return x2d, y2d, z2d
+
+
+def plot_plane(x2d, y2d, z2d, 
+               outfile, 
+               xlabel, ylabel, zlabel, title="", *,
+               levels=None, cmap="turbo", pixels=None):
+    """
+    Filled contour of a structured plane.  The field is first reduced to the
+    output's pixel budget (*pixels*: None = figure size × savefig dpi,
+    (0, 0) = full resolution) and the filled contours are rasterized, so
+    PDF/SVG output keeps vector axes and text but a bounded image.
+    """
+    plt = _plt()
+    x2d, y2d, z2d = plane_lod(x2d, y2d, z2d, pixels)
+    plt.figure(figsize=PLANE_FIGSIZE)
+
+    # —— Posa-style rainbow palette & fixed 0–1 range ——
+    if levels is None:
+        levels = np.linspace(0.0, 1.0, 21)           # 0-1 by 0.05
+    levels = np.asarray(levels, dtype=float)
+    cf = plt.contourf(x2d, y2d, z2d,
+                      levels=levels,
+                      cmap=cmap,                 # default turbo: vivid rainbow (Matplotlib ≥3.4)
+                      extend="both")
+    # filled patches as one image; axes, labels and colorbar stay vector
+    if hasattr(cf, "set_rasterized"):                 # Matplotlib ≥ 3.8
+        cf.set_rasterized(True)
+    else:
+        for coll in cf.collections:
+            coll.set_rasterized(True)
+
+    cb = plt.colorbar(cf,
+                      orientation="horizontal",
+                      pad=0.08,
+                      aspect=40)
+    cb.set_ticks(np.linspace(levels[0], levels[-1], 6))   # 0,0.2,…,1 by default
+    cb.set_label(zlabel)
+
+    cb.set_label(zlabel)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    if title:
+        plt.title(title)
+    
+    plt.gca().set_aspect("equal")
+    plt.tight_layout()
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    with stage("savefig", Path(outfile).stem):
+        plt.savefig(outfile, dpi=PLANE_DPI)
+    plt.close()
+    print(f"[pyfr_plot] Saved → {outfile}")
+
+
+# ----------------------------------------------------------------------------
+# Background rendering: figures encode in one Agg process while the next
+# section samples / loads / evaluates
+# ----------------------------------------------------------------------------
+RENDER_INFLIGHT = 2
+
+
+def _render_init():
+    TRACE.events.clear()             # forked: the parent's events are not ours
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def _render_call(trace: bool, tag: str, fn, a, kw) -> list[dict]:
+    """Renderer-side entry: draw one figure, hand back its trace events."""
+    if trace:
+        TRACE.enable("render")
+    with stage("plot", tag):
+        fn(*a, **kw)
+    return TRACE.take()
+
+
+class Renderer:
+    """
+    Runs plot functions (plot_line / plot_plane + their arguments) in one
+    background process.  At most *inflight* figures are queued: `submit`
+    waits for the oldest beyond that, so a slow renderer throttles the data
+    side instead of piling up arrays.  Failures are collected per tag and
+    returned by `drain`, which the drivers turn into a failed run.
+    """
+
+    def __init__(self, inflight: int = RENDER_INFLIGHT):
+        self.inflight = max(1, int(inflight))
+        self.pool: ProcessPoolExecutor | None = None
+        self.queue: deque = deque()                 # (tag, future)
+        self.errors: list[tuple[str, str]] = []
+
+    def _reap(self):
+        tag, fut = self.queue.popleft()
+        try:
+            TRACE.extend(fut.result())
+        except Exception as e:
+            self.errors.append((tag, f"render failed: {type(e).__name__}: {e}"))
+
+    def submit(self, tag: str, fn, *a, **kw):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=1, initializer=_render_init)
+        while len(self.queue) >= self.inflight:
+            self._reap()
+        self.queue.append((tag, self.pool.submit(_render_call, TRACE.enabled, tag, fn, a, kw)))
+
+    def drain(self) -> list[tuple[str, str]]:
+        """Wait for every queued figure; return and clear the failures."""
+        while self.queue:
+            self._reap()
+        errs, self.errors = self.errors, []
+        return errs
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+_RENDERER: Renderer | None = None
+
+
+def render(args, tag: str, fn, *a, **kw):
+    """Call plot function *fn* in the background renderer (or inline)."""
+    global _RENDERER
+    if getattr(args, "sync_render", False):
+        with stage("plot", tag):
+            return fn(*a, **kw)
+    if _RENDERER is None:
+        _RENDERER = Renderer(getattr(args, "render_inflight", RENDER_INFLIGHT))
+    _RENDERER.submit(tag, fn, *a, **kw)
+
+
+def drain_renders() -> list[tuple[str, str]]:
+    return _RENDERER.drain() if _RENDERER is not None else []
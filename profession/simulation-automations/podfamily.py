@@ -0,0 +1,192 @@
+# ───────────────────────── podfamily.py ─────────────────────────
+"""
+pod family: snapshot POD of a sampled plane by streaming randomized SVD –
+imported by the main script.
+"""
+
+from __future__ import annotations
+import ast
+import glob as _glob
+import re
+import sys
+from collections import ChainMap
+from pathlib import Path
+
+import numpy as np
+
+from executors import make_executor
+from plotting import _parse_levels, _parse_pixels, plane_geometry, plane_lod, plot_plane, render
+from podsvd import SnapshotMatrix, randomized_svd
+from samplecache import content_digest, file_identity
+from sampling import (_ensure_points, _mesh_path, _sample_paths, _sampler_cmd, _skip_value,
+                      infer_nx_ny_nz, run_sampler)
+from sectionio import _as_bool, _clean_ascii, _get_any, _pd, eval_exprs, get_label, read_csv_any
+from snapstats import COORD_COLS
+from stagetrace import stage
+
+
+POD_BLOCK_BYTES = 256 << 20     # snapshot rows per SVD pass (no --max-memory)
+
+
+def _split_exprs(txt: str) -> list[str]:
+    """`u, sqrt(u**2 + v**2)` → ['u', 'sqrt(u**2 + v**2)'] (top-level commas only)."""
+    txt = _clean_ascii(txt).strip()
+    if not txt:
+        return []
+    return [ast.unparse(e) for e in ast.parse(f"({txt},)", mode="eval").body.elts]
+
+
+def _pod_paths(sect, base, sec_name, args) -> dict[str, Path | list[Path]]:
+    """Files a pod section reads and writes (shared with the batch driver)."""
+    pts_path, csv_out = _sample_paths(sect, base, args)
+    fig = Path(_get_any(sect, base, "file", "output", default=f"{sec_name}.png"))
+    comps = _split_exprs(_get_any(sect, base, "quantity", default=""))
+    slug = lambda e: "" if len(comps) < 2 else "_" + re.sub(r"\W+", "_", e).strip("_")
+    nmodes = int(_get_any(sect, base, "modes", default=6))
+    return {
+        "pts": pts_path,
+        "matrix": Path(_get_any(sect, base, "snapshot-dir",
+                                default=csv_out.with_suffix(".snapshots"))),
+        "energy": Path(_get_any(sect, base, "energy-file",
+                                default=fig.with_name(f"{fig.stem}_energy.csv"))),
+        "modes": [[fig.with_name(f"{fig.stem}_mode{i + 1:02d}{slug(c)}{fig.suffix}")
+                   for c in comps] for i in range(nmodes)],
+    }
+
+
+def _pod_mode_count(energy: Path) -> int | None:
+    """Modes in the last run's energy CSV (one row each), None before the first run."""
+    try:
+        with Path(energy).open() as fh:
+            return max(0, sum(1 for line in fh if line.strip()) - 1)
+    except OSError:
+        return None
+
+
+def _sample_pod_snapshots(mat: SnapshotMatrix, todo: list[Path], comps: list[str], env0, *,
+                          mesh: Path, pts: Path, skip: int, args):
+    """Sample each of *todo* and append its evaluated quantities as one row."""
+    executor = make_executor(args)
+    step = executor.slots if args.sampler_workers <= 1 else 1
+    for lo in range(0, len(todo), step):
+        batch = todo[lo:lo + step]
+        tmps = [mat.root / f".snap{k}.csv" for k in range(len(batch))]
+        if len(batch) == 1:
+            run_sampler(tmps[0], mesh=mesh, src=batch[0], pts=pts, skip=skip,
+                        workers=args.sampler_workers, executor=executor)
+        else:
+            executor.run_all([(_sampler_cmd(mesh=mesh, src=sn, pts=pts, skip=skip), t)
+                              for sn, t in zip(batch, tmps)], label="snapshot")
+
+        for snap, tmp in zip(batch, tmps):
+            df = read_csv_any(tmp)
+            env = ChainMap({c.replace("-", "_"): df[c].to_numpy() for c in df.columns}, env0)
+            try:
+                vals = eval_exprs({f"q{i}": e for i, e in enumerate(comps)}, env)
+            except Exception as e:
+                sys.exit(f"[pyfr_plot] Expression error → {e}")
+            if not mat.names:
+                mat.set_coords(df[[c for c in COORD_COLS if c in df.columns]].to_numpy())
+            mat.append(str(snap.resolve()),
+                       np.concatenate([np.broadcast_to(vals[f"q{i}"], len(df))
+                                       for i in range(len(comps))]))
+            del df
+            tmp.unlink(missing_ok=True)
+            print(f"[pyfr_plot] (pod) added {snap.name}  rows={len(mat.names)}", flush=True)
+        mat.save()
+
+
+def _run_pod_family(cfg, sec_name, sect, base, env0, args, *, subcall: bool):
+    """
+    Snapshot POD of `quantity` (one or more comma-separated expressions) on a
+    sampled plane over the `src-glob` snapshots.  Rows accumulate in an
+    on-disk snapshot matrix; the leading `modes` come from a randomized SVD
+    that streams it.  Writes the energy spectrum as CSV and one plane plot
+    per mode and quantity (symmetric levels, `cmap` default RdBu_r).
+    """
+    opt = lambda key, default="": _get_any(sect, base, key, default=default)
+    paths = _pod_paths(sect, base, sec_name, args)
+    comps = _split_exprs(opt("quantity"))
+    snaps = [Path(p) for p in sorted(_glob.glob(opt("src-glob")))] if opt("src-glob") else []
+    if not comps:
+        sys.exit("[pyfr_plot] pod family requires quantity (e.g. `u, v`).")
+    if len(snaps) < 2:
+        sys.exit(f"[pyfr_plot] pod: src-glob matched {len(snaps)} snapshot(s); need at least two")
+
+    with stage("points", sec_name):
+        if not _ensure_points(sect, base, paths["pts"], env0):
+            sys.exit("[pyfr_plot] Need 'lims' + 'spacings' (from this "
+                     "section *or* the base) to create the points file.")
+    mesh, skip = _mesh_path(cfg, sect), _skip_value(sect, args)
+
+    meta = {"pts": content_digest(paths["pts"]), "mesh": file_identity(mesh),
+            "skip": int(skip), "quantity": comps}
+    mat = SnapshotMatrix.open(paths["matrix"], meta)
+    have = set(mat.names)
+    todo = [sn for sn in snaps if str(sn.resolve()) not in have]
+    with stage("sample", sec_name):
+        _sample_pod_snapshots(mat, todo, comps, env0, mesh=mesh, pts=paths["pts"],
+                              skip=skip, args=args)
+    sel = mat.select([str(sn.resolve()) for sn in snaps])
+    npts = mat.n // len(comps)
+
+    k = len(paths["modes"])
+    block = max(1, (args.max_memory or POD_BLOCK_BYTES) // (8 * mat.n))
+    with stage("svd", sec_name):
+        pod = randomized_svd(mat.rows(), sel, k,
+                             oversample=int(opt("oversample", 10)),
+                             power_iter=int(opt("power-iter", 2)), block=block,
+                             center=_as_bool(opt("subtract-mean", "1")))
+    k = len(pod["sigma"])
+    energy = pod["sigma"] ** 2
+    frac = energy / pod["energy"] if pod["energy"] > 0 else np.zeros(k)
+    print(f"[pyfr_plot] (pod) {len(sel)} snapshots × {mat.n} values: {k} modes hold "
+          f"{frac.sum():.1%} of the fluctuation energy (mode 1: {frac[0]:.1%})")
+
+    with stage("write_csv", sec_name):
+        paths["energy"].parent.mkdir(parents=True, exist_ok=True)
+        _pd().DataFrame({"mode": np.arange(1, k + 1), "sigma": pod["sigma"],
+                         "energy": energy, "fraction": frac,
+                         "cumulative": np.cumsum(frac)}).to_csv(paths["energy"], index=False)
+    print(f"[pyfr_plot] (pod) energy spectrum → {paths['energy']}")
+    if opt("modes-file"):
+        np.savez(opt("modes-file"), snapshots=np.array([sn.name for sn in snaps]), **pod)
+
+    if args.no_plot:
+        return
+
+    # --- mode shapes on the plane (grid + LOD blocks shared by every mode)
+    shape = infer_nx_ny_nz(npts, opt("spacings"))
+    plane = [i for i in range(3) if shape[i] > 1]
+    if len(plane) != 2:
+        sys.exit(f"[pyfr_plot] pod: spacings {list(shape)} is not a plane")
+    flat = [i for i in range(3) if i not in plane][0]
+    coords = mat.coords()
+    env = ChainMap({c: coords[:, i] for i, c in enumerate(COORD_COLS)}, env0)
+    xexpr, yexpr = _clean_ascii(opt("xexpr")), _clean_ascii(opt("yexpr"))
+    try:
+        vals = eval_exprs({"x": xexpr, "y": yexpr}, env)
+    except Exception as e:
+        sys.exit(f"[pyfr_plot] Expression error → {e}")
+    x2d, y2d = (np.squeeze(vals[a].reshape(shape), axis=flat) for a in ("x", "y"))
+    pixels = _parse_pixels(opt("plot-resolution", "auto"))
+    with stage("lod", sec_name):
+        geom = plane_geometry(x2d, y2d, pixels)
+
+    xlb = get_label(cfg, sect, base, "xlabel", fallback=xexpr)
+    ylb = get_label(cfg, sect, base, "ylabel", fallback=yexpr)
+    title = get_label(cfg, sect, base, "title", fallback=sec_name)
+    levels = _parse_levels(opt("levels"))
+    nlev = int(opt("levels-count", 21))
+    for i in range(k):
+        for c, comp in enumerate(comps):
+            z2d = np.squeeze(pod["modes"][c * npts:(c + 1) * npts, i].reshape(shape), axis=flat)
+            with stage("lod", sec_name):
+                xl, yl, zl = plane_lod(None, None, z2d, pixels, geom=geom)
+            vmax = float(np.nanmax(np.abs(zl))) or 1.0
+            render(args, sec_name, plot_plane,
+                   xl, yl, zl, paths["modes"][i][c], xlabel=xlb, ylabel=ylb,
+                   zlabel=get_label(cfg, sect, base, "zlabel", fallback=comp),
+                   title=f"{title}: mode {i + 1} ({frac[i]:.1%})",
+                   levels=levels if levels is not None else np.linspace(-vmax, vmax, nlev),
+                   cmap=opt("cmap", "RdBu_r"), pixels=pixels)
@@ -0,0 +1,145 @@
+# ───────────────────────── podsvd.py ─────────────────────────
+"""
+On-disk snapshot matrix and streaming randomized SVD for POD – imported by the main script.
+
+Each sampled snapshot becomes one row (all points, all quantities) appended
+to `<dir>/rows.f8` (coordinates in `coords.npy`); `index.json` names the
+rows and records what they were sampled from, so a later run only adds new
+snapshots.  `randomized_svd` reads the rows a block at a time: besides one
+block, memory is a few (points × (modes + oversampling)) arrays,
+independent of the snapshot count.
+"""
+
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+VERSION = 1
+
+
+class SnapshotMatrix:
+    def __init__(self, root: Path, meta: dict):
+        self.root = Path(root)
+        self.meta = dict(meta)
+        self.names: list[str] = []
+        self.n = 0                                   # row length
+
+    @property
+    def rows_path(self) -> Path:
+        return self.root / "rows.f8"
+
+    @classmethod
+    def open(cls, root: Path, meta: dict) -> "SnapshotMatrix":
+        """Existing matrix for *meta*, else an empty one (stale rows are dropped)."""
+        mat = cls(root, meta)
+        mat.root.mkdir(parents=True, exist_ok=True)
+        try:
+            idx = json.loads((mat.root / "index.json").read_text())
+        except (FileNotFoundError, ValueError):
+            idx = None
+        if idx and idx.get("version") == VERSION and idx.get("meta") == mat.meta:
+            mat.names, mat.n = list(idx["names"]), int(idx["n"])
+        # rows appended after the last index write belong to nobody
+        size = 8 * mat.n * len(mat.names)
+        if not mat.rows_path.exists() or mat.rows_path.stat().st_size != size:
+            with mat.rows_path.open("ab") as fh:
+                fh.truncate(size)
+        return mat
+
+    def append(self, name: str, row: np.ndarray):
+        row = np.ascontiguousarray(row, dtype="<f8").ravel()
+        if self.names and len(row) != self.n:
+            raise ValueError(f"{name}: {len(row)} values per snapshot, expected {self.n}")
+        self.n = len(row)
+        with self.rows_path.open("ab") as fh:
+            fh.write(row.tobytes())
+        self.names.append(name)
+
+    def save(self):
+        tmp = self.root / f".index.json.{os.getpid()}.part"
+        tmp.write_text(json.dumps({"version": VERSION, "meta": self.meta,
+                                   "n": self.n, "names": self.names}, indent=1))
+        os.replace(tmp, self.root / "index.json")
+
+    def set_coords(self, coords: np.ndarray):
+        np.save(self.root / "coords.npy", np.asarray(coords, dtype=float))
+
+    def coords(self) -> np.ndarray:
+        """(points, 3) sample coordinates, as written with the first snapshot."""
+        return np.load(self.root / "coords.npy")
+
+    def rows(self) -> np.ndarray:
+        return np.memmap(self.rows_path, dtype="<f8", mode="r",
+                         shape=(len(self.names), self.n))
+
+    def select(self, names: Sequence[str]) -> np.ndarray:
+        pos = {s: i for i, s in enumerate(self.names)}
+        return np.array([pos[s] for s in names], dtype=np.intp)
+
+
+def randomized_svd(rows: np.ndarray, sel: np.ndarray, k: int, *, oversample: int = 10,
+                   power_iter: int = 2, block: int = 64, center: bool = True,
+                   seed: int = 0) -> dict[str, np.ndarray | float]:
+    """
+    Leading *k* spatial modes of the snapshots `rows[sel]` (one per row) by a
+    randomized range finder (Halko, Martinsson & Tropp 2011) with
+    *power_iter* re-orthonormalized power iterations.  Every pass streams
+    *block* rows; the result holds
+
+    * `modes`   – (n, k) orthonormal spatial modes
+    * `sigma`   – (k,) singular values
+    * `coeffs`  – (k, m) temporal coefficients (σ·Vᵀ)
+    * `mean`    – (n,) subtracted mean (zeros when not *center*)
+    * `energy`  – total fluctuation energy Σ‖x − mean‖², for fractions
+    """
+    m, n = len(sel), rows.shape[1]
+    l = int(min(k + oversample, m, n))
+    blocks = [sel[b:b + block] for b in range(0, m, block)]
+
+    mean = np.zeros(n)
+    if center:
+        for idx in blocks:
+            mean += np.asarray(rows[idx]).sum(axis=0)
+        mean /= m
+
+    def snap(idx):
+        return np.asarray(rows[idx], dtype=float) - mean
+
+    rng = np.random.default_rng(seed)
+    omega = rng.standard_normal((m, l))
+    Y = np.zeros((n, l))
+    energy, b0 = 0.0, 0
+    for idx in blocks:                            # Y = Xᵀ Ω
+        X = snap(idx)
+        energy += float(np.einsum("ij,ij->", X, X))
+        Y += X.T @ omega[b0:b0 + len(idx)]
+        b0 += len(idx)
+    Q = np.linalg.qr(Y)[0]
+
+    def project(Q):                               # Z = X Q  (m × l)
+        return np.concatenate([snap(idx) @ Q for idx in blocks])
+
+    for _ in range(power_iter):                   # Q ← orth(Xᵀ X Q)
+        Z = np.linalg.qr(project(Q))[0]
+        Y[:] = 0.0
+        b0 = 0
+        for idx in blocks:
+            Y += snap(idx).T @ Z[b0:b0 + len(idx)]
+            b0 += len(idx)
+        Q = np.linalg.qr(Y)[0]
+    del Y
+
+    B = project(Q).T                              # Qᵀ Xᵀ  (l × m)
+    Ub, s, Vt = np.linalg.svd(B, full_matrices=False)
+    k = min(k, len(s))
+    modes = Q @ Ub[:, :k]
+    # fix the sign: the largest-magnitude entry of each mode is positive
+    flip = np.sign(modes[np.abs(modes).argmax(axis=0), np.arange(k)])
+    flip[flip == 0] = 1.0
+    return {"modes": modes * flip, "sigma": s[:k],
+            "coeffs": (s[:k, None] * Vt[:k]) * flip[:, None],
+            "mean": mean, "energy": energy}
@@ -11,6 +11,8 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import pvclient
+
 
 # -------------------------- small utilities --------------------------
 def _detect_point_cols(cols):
@@ -88,13 +90,26 @@ def eval_constants(cfg: configparser.ConfigParser) -> dict[str, float]:
 def run_clean_to_grid(*, pvpython: str, ctg_script: str,
                       input_vtu: Path, output_csv: Path,
                       arrays: list[str], weighting: str, point_merge: bool,
-                      force: bool):
+                      force: bool, use_worker: bool = True):
     output_csv.parent.mkdir(parents=True, exist_ok=True)
 
     if output_csv.exists() and not force:
         print(f"[pv] reuse: {output_csv}")
         return
 
+    if use_worker:
+        # persistent pvpython next to the ctg script; keeps the VTU loaded
+        try:
+            rep = pvclient.clean_to_grid(
+                pvpython=pvpython, worker=Path(ctg_script).with_name("pvworker.py"),
+                input_vtu=input_vtu, output=output_csv, arrays=arrays,
+                weighting=weighting, point_merge=point_merge)
+            print(f"[pv] worker wrote: {output_csv} "
+                  f"({'reused dataset' if rep.get('reused') else 'loaded'}, {rep['seconds']:.1f}s)")
+            return
+        except pvclient.WorkerError as e:
+            print(f"[pv] (warn) worker unavailable ({e}); running one-shot")
+
     cmd = [pvpython, "--mesa", ctg_script,
            "-i", str(input_vtu),
            "-o", str(output_csv),
@@ -237,6 +252,8 @@ def main():
     ap.add_argument("ini", help="INI file containing postprocess-paraview-* sections")
     ap.add_argument("section", help="Section to run, e.g. postprocess-paraview-Cp")
     ap.add_argument("--force", action="store_true", help="Re-run pvpython even if CSV exists")
+    ap.add_argument("--no-worker", action="store_true",
+                    help="Run a fresh pvpython instead of the persistent worker")
     args = ap.parse_args()
 
     cfg = configparser.ConfigParser()
@@ -297,7 +314,7 @@ def main():
         pvpython=pvpython, ctg_script=ctg_script,
         input_vtu=input_vtu, output_csv=ctg_csv,
         arrays=arrays, weighting=weighting, point_merge=point_merge,
-        force=args.force
+        force=args.force, use_worker=not args.no_worker
     )
 
     # 2) plot Cp with refs
@@ -0,0 +1,115 @@
+# ───────────────────────── pvclient.py ─────────────────────────
+"""Client for the persistent pvpython CleanToGrid worker – imported by the main script."""
+
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+START_TIMEOUT = 300.0          # ParaView start-up on a loaded node can be slow
+DEFAULT_IDLE = 600.0
+
+
+class WorkerError(RuntimeError):
+    """The worker could not be reached or reported a failed request."""
+
+
+def socket_path(pvpython: str | Path, worker: str | Path) -> Path:
+    """
+    `$PYFR_PLOT_PV_SOCKET`, else one socket per (user, pvpython, worker script)
+    under `$XDG_RUNTIME_DIR` or the temp dir, so every section run by the same
+    user with the same ParaView shares one worker.
+    """
+    if os.environ.get("PYFR_PLOT_PV_SOCKET"):
+        return Path(os.environ["PYFR_PLOT_PV_SOCKET"])
+    tag = hashlib.sha1(f"{pvpython}\0{Path(worker).resolve()}".encode()).hexdigest()[:12]
+    root = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(root) / f"pyfr_plot-pv-{os.getuid()}-{tag}.sock"
+
+
+def _request(sock: Path, req: dict, timeout: float | None = None) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(sock))
+        s.sendall((json.dumps(req) + "\n").encode())
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    if not buf:
+        raise WorkerError(f"worker on {sock} closed the connection without a reply")
+    return json.loads(buf)
+
+
+def _alive(sock: Path) -> bool:
+    try:
+        return bool(_request(sock, {"op": "ping"}, timeout=5.0).get("ok"))
+    except (OSError, ValueError):
+        return False
+
+
+def ensure_worker(*, pvpython: str | Path, worker: str | Path, mesa: bool = True,
+                  idle: float = DEFAULT_IDLE, sock: Path | None = None) -> Path:
+    """Return the socket of a running worker, starting one if needed."""
+    sock = sock or socket_path(pvpython, worker)
+    if _alive(sock):
+        return sock
+
+    # one starter at a time: pool workers racing here must not spawn several
+    sock.parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{sock}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if _alive(sock):
+            return sock
+
+        cmd = [str(pvpython), *(["--mesa"] if mesa else []), str(worker),
+               "--socket", str(sock), "--idle", f"{idle:g}"]
+        log = open(f"{sock}.log", "ab")
+        print("[pv] starting worker:", " ".join(cmd))
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+        log.close()
+
+        t0 = time.monotonic()
+        while not _alive(sock):
+            if proc.poll() is not None:
+                raise WorkerError(f"worker exited with status {proc.returncode}; "
+                                  f"see {sock}.log")
+            if time.monotonic() - t0 > START_TIMEOUT:
+                proc.kill()
+                raise WorkerError(f"worker did not come up within {START_TIMEOUT:g}s")
+            time.sleep(0.2)
+    return sock
+
+
+def clean_to_grid(*, pvpython: str | Path, worker: str | Path,
+                  input_vtu: Path, output: Path, arrays: list[str],
+                  weighting: str, point_merge: bool, mesa: bool = True,
+                  idle: float = DEFAULT_IDLE) -> dict:
+    """Have the worker write *arrays* of CleanToGrid(*input_vtu*) to *output*."""
+    sock = ensure_worker(pvpython=pvpython, worker=worker, mesa=mesa, idle=idle)
+    req = dict(op="extract", input=str(Path(input_vtu).resolve()),
+               output=str(Path(output).resolve()), arrays=list(arrays),
+               weighting=str(weighting), point_merge=bool(point_merge))
+    try:
+        rep = _request(sock, req)
+    except (OSError, ValueError) as e:
+        raise WorkerError(f"request to {sock} failed: {e}") from None
+    if not rep.get("ok"):
+        raise WorkerError(rep.get("error", "unknown worker error"))
+    return rep
+
+
+def shutdown(sock: Path) -> bool:
+    try:
+        return bool(_request(sock, {"op": "shutdown"}, timeout=5.0).get("ok"))
+    except (OSError, ValueError):
+        return False
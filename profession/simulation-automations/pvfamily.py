@@ -0,0 +1,321 @@
+# ───────────────────────── pvfamily.py ─────────────────────────
+"""
+paraview family: upper / lower surface envelopes of a CleanToGrid CSV,
+evaluated and plotted like a sampleline – imported by the main script.
+"""
+
+from __future__ import annotations
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import pvclient
+from plotting import REF_STYLES, plot_line, render
+from sectionio import (_as_bool, _clean_ascii, _get_any, _pd, _plt, _split_tokens, eval_exprs,
+                       get_label, load_reference_csvs_with_notes, load_reference_query)
+from stagetrace import stage
+
+
+def _detect_point_cols(cols):
+    cands = [("Points:0", "Points:1", "Points:2"),
+             ("Points_0", "Points_1", "Points_2")]
+    for a, b, c in cands:
+        if a in cols and b in cols and c in cols:
+            return a, b, c
+    raise KeyError("Could not find coordinate columns (expected Points:0/1/2).")
+
+
+def _align_to_chord_xy(xy, *, x_end_frac=1e-3):
+    """
+    Robust chord frame:
+      - LE = mean of points with x within x_end_frac * chord of xmin
+      - TE = mean of points with x within x_end_frac * chord of xmax
+    This avoids picking a single upper-surface point as LE/TE.
+    """
+    xy = np.asarray(xy, dtype=float)
+
+    xmin = float(xy[:, 0].min())
+    xmax = float(xy[:, 0].max())
+    xr = xmax - xmin
+    if xr <= 0.0:
+        raise RuntimeError("Degenerate x-range; cannot define chord.")
+
+    tol = x_end_frac * xr
+
+    le_pts = xy[np.abs(xy[:, 0] - xmin) <= tol]
+    te_pts = xy[np.abs(xy[:, 0] - xmax) <= tol]
+
+    # Fallbacks if tolerance too tight
+    le = le_pts.mean(axis=0) if len(le_pts) else xy[np.argmin(xy[:, 0])]
+    te = te_pts.mean(axis=0) if len(te_pts) else xy[np.argmax(xy[:, 0])]
+
+    chord = te - le
+    c = float(np.linalg.norm(chord))
+    if c == 0.0:
+        raise RuntimeError("Chord length is zero (degenerate geometry).")
+
+    t = chord / c
+    n = np.array([-t[1], t[0]])
+
+    rel = xy - le
+    xprime = rel @ t
+    yprime = rel @ n
+
+    return le, te, c, xprime / c, yprime
+
+
+def _surface_envelope(x_over_c, y_signed, mu, sig=None, *, nbins=600, eps=0.0):
+    """
+    Build upper/lower envelopes by x/c bins.
+
+    One lexsort on (bin, y) and a segment reduction, so the cost is
+    O(N log N) independent of *nbins*.
+
+    Critical fix:
+      - upper candidates: y_signed > +eps
+      - lower candidates: y_signed < -eps
+    If a bin has no candidates for a side, we skip that bin for that side.
+    Also: write x as BIN CENTER (prevents repeated-x vertical segments).
+    """
+    x = np.clip(np.asarray(x_over_c, dtype=float), 0.0, 1.0)
+    y = np.asarray(y_signed, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    sig = np.asarray(sig, dtype=float) if sig is not None else None
+
+    bins = np.linspace(0.0, 1.0, nbins + 1)
+    ib = np.digitize(x, bins) - 1
+    valid = (ib >= 0) & (ib < nbins)
+
+    x, y, mu, ib = x[valid], y[valid], mu[valid], ib[valid]
+    if sig is not None:
+        sig = sig[valid]
+
+    xc = 0.5 * (bins[:-1] + bins[1:])         # BIN CENTERS
+    idx = np.arange(len(x))
+
+    def _pick(cand, take_max):
+        """Per occupied bin, index of the extreme-y candidate (first on ties)."""
+        i = idx[cand]
+        if not i.size:
+            return i
+        # sort by (bin, y, index); for max-y we want the *first* index among
+        # equal y to end a segment, hence the reversed index key.
+        order = np.lexsort(((-i if take_max else i), y[i], ib[i]))
+        i = i[order]
+        b = ib[i]
+        if take_max:
+            edge = np.flatnonzero(np.r_[b[1:] != b[:-1], True])     # segment ends
+        else:
+            edge = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])     # segment starts
+        return i[edge]
+
+    iu = _pick(y > +eps, take_max=True)       # upper: only y > +eps
+    il = _pick(y < -eps, take_max=False)      # lower: only y < -eps
+
+    xu, muu = xc[ib[iu]], mu[iu]
+    xl, mul = xc[ib[il]], mu[il]
+    sigu = sig[iu] if sig is not None else []
+    sigl = sig[il] if sig is not None else []
+
+    out = {
+        "upper": (np.asarray(xu), np.asarray(muu)),
+        "lower": (np.asarray(xl), np.asarray(mul)),
+    }
+    if sig is not None:
+        out["upper_sig"] = np.asarray(sigu) if len(sigu) else None
+        out["lower_sig"] = np.asarray(sigl) if len(sigl) else None
+
+    print(f"[paraview-envelope] nbins={nbins} upper_pts={len(xu)} lower_pts={len(xl)}")
+    return out
+
+
+def plot_upper_lower(xu, yu, su, xl, yl, sl, refs, outfile, xlabel, ylabel, *,
+                     title="", shade_std=False):
+    plt = _plt()
+    plt.figure(figsize=(10, 5.2))
+    ax = plt.gca()
+
+    # upper/lower lines
+    lu = plt.plot(xu, yu, lw=3, label="upper")[0]
+    ll = plt.plot(xl, yl, lw=3, label="lower")[0]
+
+    # optional ±σ shading
+    if shade_std and su is not None:
+        plt.fill_between(xu, yu - su, yu + su, color=lu.get_color(), alpha=0.18, linewidth=0)
+    if shade_std and sl is not None:
+        plt.fill_between(xl, yl - sl, yl + sl, color=ll.get_color(), alpha=0.18, linewidth=0)
+
+    # references (keep your “filled small markers” style)
+    for i, ref in enumerate(refs):
+        rx, ry = ref.iloc[:, 0].values, ref.iloc[:, 1].values
+        style = REF_STYLES[i % len(REF_STYLES)]
+        plt.scatter(rx, ry, s=8, marker=style["marker"], label=ref.attrs.get("label", ref.columns[1]),
+                    linewidths=1.0)
+
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    if title:
+        plt.title(title)
+
+    plt.grid(True, which="both")
+    plt.legend(frameon=False, ncol=2 if len(refs) >= 3 else 1)
+    plt.tight_layout()
+
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    with stage("savefig", Path(outfile).stem):
+        plt.savefig(outfile, dpi=300, bbox_inches="tight")
+    plt.close()
+    print(f"[pyfr_plot] Saved → {outfile}")
+
+
+def _run_paraview_family(cfg, sec_name, sect, base, env0, args, *, subcall: bool):
+    # --- config
+    pvpython = Path(_get_any(sect, base, "pvpython", default="pvpython"))
+    pvtocsv  = Path(_get_any(sect, base, "pvtocsv", default="pvtocsv.py"))
+    input_vtu = Path(_get_any(sect, base, "input-vtu", "input_vtu", "src-file", "src", default=""))
+    if not str(input_vtu):
+        sys.exit("[pyfr_plot] paraview family requires input-vtu (or src-file).")
+
+    arrays = _split_tokens(_get_any(sect, base, "arrays", default=""))
+    mu_col = _get_any(sect, base, "mu-col", "mu_col", default=(arrays[0] if arrays else "Avg-P"))
+    sig_col = _get_any(sect, base, "sig-col", "sig_col", default=(arrays[1] if len(arrays) > 1 else ""))
+
+    weighting = _get_any(sect, base, "weighting", default="average_by_number")
+    point_merge = _as_bool(_get_any(sect, base, "point-merge", "point_merge", default=False))
+
+    nbins = int(_get_any(sect, base, "nbins", default=600))
+    shade_std = _as_bool(_get_any(sect, base, "shade-std", "shade_std", default=False))
+
+    ctg_csv = Path(_get_any(sect, base, "ctg-csv", "ctg_csv",
+                            default=f"{input_vtu.stem}-ctg.csv"))
+
+    out_csv = Path(_get_any(sect, base, "sampled-file", "out-csv", "out_csv",
+                            default=f"{sec_name}.csv"))
+    out_fig = Path(_get_any(sect, base, "file", "output",
+                            default=f"{sec_name}.png"))
+
+    xexpr = _clean_ascii(_get_any(sect, base, "xexpr", default="x_over_c"))
+    yexpr = _clean_ascii(_get_any(sect, base, "yexpr", default="mu"))
+    stdexpr = _clean_ascii(_get_any(sect, base, "stdexpr", default="")) or None
+
+    no_plot = getattr(args, "no_plot", False)
+    with stage("refs", sec_name):
+        refs = [] if no_plot else (
+            load_reference_csvs_with_notes(_get_any(sect, base, "reference", default=""))
+            + load_reference_query(_get_any(sect, base, "reference-query", default="")))
+
+    # --- run ParaView only if needed: persistent worker, else one-shot pvpython
+    use_worker = (_as_bool(_get_any(sect, base, "pv-worker", "pv_worker", default=True))
+                  and not getattr(args, "no_pv_worker", False))
+    if not ctg_csv.exists() and use_worker:
+        pvworker = Path(_get_any(sect, base, "pvworker", default=pvtocsv.with_name("pvworker.py")))
+        try:
+            with stage("pvpython", sec_name, mode="worker"):
+                rep = pvclient.clean_to_grid(
+                    pvpython=pvpython, worker=pvworker, input_vtu=input_vtu,
+                    output=ctg_csv, arrays=arrays, weighting=weighting,
+                    point_merge=point_merge,
+                    idle=float(_get_any(sect, base, "pv-idle", default=pvclient.DEFAULT_IDLE)))
+            print(f"[pyfr_plot] (paraview) worker wrote {ctg_csv} "
+                  f"({'reused dataset' if rep.get('reused') else 'loaded'}, {rep['seconds']:.1f}s)")
+        except pvclient.WorkerError as e:
+            print(f"[pyfr_plot] (warn) pvpython worker unavailable ({e}); running one-shot.")
+
+    if not ctg_csv.exists():
+        cmd = [str(pvpython), "--mesa", str(pvtocsv),
+               "-i", str(input_vtu),
+               "-o", str(ctg_csv),
+               "--weighting", str(weighting)]
+        if point_merge:
+            cmd.append("--point-merge")
+        if arrays:
+            cmd += ["--arrays", *arrays]
+
+        print("[pyfr_plot] (paraview) run:", " ".join(cmd))
+        with stage("pvpython", sec_name, mode="one-shot"):
+            subprocess.run(cmd, check=True)
+
+    # --- load CTG CSV
+    with stage("load", sec_name):
+        df = _pd().read_csv(ctg_csv)
+    px, py, pz = _detect_point_cols(df.columns)
+
+    if mu_col not in df.columns:
+        sys.exit(f"[pyfr_plot] mu-col '{mu_col}' not in {ctg_csv}")
+    if sig_col and sig_col not in df.columns:
+        print(f"[pyfr_plot] (warn) sig-col '{sig_col}' not found; std disabled.")
+        sig_col = ""
+
+    xy = df[[px, py]].to_numpy()
+
+    le, te, c, x_over_c, y_signed = _align_to_chord_xy(xy)
+
+
+    print(f"[pyfr_plot] (paraview) chord: c={c:.10f} LE=({le[0]:.7f},{le[1]:.7f}) TE=({te[0]:.7f},{te[1]:.7f})")
+
+    mu = df[mu_col].to_numpy()
+    sig = df[sig_col].to_numpy() if sig_col else None
+
+    env_common = dict(env0)
+    # Evaluate expressions separately on envelope points
+    env_upper = dict(env_common)
+    env_lower = dict(env_common)
+
+    with stage("envelope", sec_name):
+        env = _surface_envelope(x_over_c, y_signed, mu, sig, nbins=nbins)
+
+    # pick which side this section is responsible for
+    side = str(_get_any(sect, base, "side", default="upper")).strip().lower()
+    if side not in {"upper", "lower"}:
+        sys.exit("[pyfr_plot] paraview: side must be 'upper' or 'lower'")
+
+    if side == "upper":
+        xs, mus = env["upper"]
+        sigs = env.get("upper_sig", None)
+    else:
+        xs, mus = env["lower"]
+        sigs = env.get("lower_sig", None)
+
+    # build evaluation env for this side only
+    env_side = dict(env0)
+    env_side.update({
+        "x_over_c": xs,
+        "mu": mus,
+        "sig": (sigs if sigs is not None else np.zeros_like(mus)),
+        "avg_p": mus,
+        "std_p": (sigs if sigs is not None else np.zeros_like(mus)),
+    })
+
+    try:
+        with stage("eval", sec_name):
+            vals = eval_exprs({"x": xexpr, "y": yexpr,
+                               "std": stdexpr if sigs is not None else ""}, env_side)
+    except Exception as e:
+        sys.exit(f"[pyfr_plot] Expression error → {e}")
+    x1, y1, s1 = vals["x"], vals["y"], vals["std"]
+
+    # write a simple LaTeX-friendly CSV: x,y[,std]
+    out = _pd().DataFrame({"x": x1, "y": y1})
+    if s1 is not None:
+        out["std"] = s1
+    with stage("write_csv", sec_name):
+        out_csv.parent.mkdir(parents=True, exist_ok=True)
+        out.to_csv(out_csv, index=False)
+    print(f"[pyfr_plot] (paraview) wrote → {out_csv}")
+
+    xlabel = get_label(cfg, sect, base, "xlabel", fallback=r"$x/c$")
+    ylabel = get_label(cfg, sect, base, "ylabel", fallback=yexpr)
+    title  = get_label(cfg, sect, base, "title", fallback=sec_name)
+
+    if no_plot:
+        return
+
+    # plot as a normal 1-line plot (same style as sampleline)
+    render(args, sec_name, plot_line,
+        x1, y1, s1, refs, out_fig,
+        xlabel=xlabel, ylabel=ylabel, title=title,
+        show_legend=True, show_ref_notes=True,
+        pyfr_label=side,
+    )
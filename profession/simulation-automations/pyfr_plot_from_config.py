@@ -1,17 +1,44 @@
 #!/usr/bin/env python3
 """
-pyfr_plot_from_config.py  ⟶  *v0.5*
+pyfr_plot_from_config.py  ⟶  *v0.29*
 ====================================================
 A *single‑file* utility that
 1. **(re)builds a points CSV** from `lims` + `spacings` (unless `--reuse-points`).
-2. **Runs `pyfr sampler sample`** automatically when the source is a `.pyfrs`.
+2. **Runs `pyfr sampler sample`** automatically when the source is a `.pyfrs`,
+   through a content-addressed cache keyed on mesh, solution, points and skip.
 3. **Evaluates user expressions** (e.g. `y/D`, `avg-u - Uin`) with constants from
    `[constants]` and geometry symbols (`STERN_X`, `D`, …).
 4. **Plots** the line (and ±σ band) alongside any reference CSVs you list.
+5. **Batches** every section (`--all` / `--sections GLOB`) in a process pool,
+   ordered by shared `pts-file`/`sampled-file`, skipping up-to-date outputs.
 
 Changelog
 ---------
-* **v0.5** – script finalised; plotting, refs, σ‑band, CLI `--reuse-points`.
+* **v0.29** – `postprocess-pod-*`: on-disk snapshot matrix, streaming randomized SVD, mode plots + energy CSV.
+* v0.28 – `postprocess-spectra-*`: sampler-plugin probes → (points × time) sidecar, batched Welch PSD, coherence, Strouhal peaks.
+* v0.27 – `csv-decimate = 1` thins the plot-aligned CSV within `csv-tol` / `csv-rtol` of y ± σ (`csv-max-points`).
+* v0.26 – plane grids and LOD blocks stored per points file (`<pts>.geom/`); later quantities evaluate only `zexpr`.
+* v0.25 – `adaptive = 1` sampleline refinement (`adaptive-quantity`, `-tol`, `-max-points`, …).
+* v0.24 – batch prefetch samples each (mesh, src, skip) once over merged points (`--no-coalesce`).
+* v0.23 – `--locate-index` (experimental): external `[postprocess-sampler]` locate/interp commands, index cached per mesh + points.
+* v0.22 – `--max-memory BYTES`: block-streamed CSV indexing, evaluation and reduction.
+* v0.21 – `reduce = x|y|z…`, `reduce-op`, `reduce-weights`: general axis reduction (replaces `zmean`).
+* v0.20 – `--trace FILE`: per-stage wall/CPU/peak-RSS Chrome trace + summary table.
+* v0.19 – `--watch` re-runs sections as their inputs settle (`--poll`, `--settle`).
+* v0.18 – pre-parsed reference catalog; `reference-query` section key.
+* v0.17 – figures render in a background Agg process (`--sync-render`).
+* v0.16 – plane level-of-detail (`plot-resolution`), rasterized fills, `levels`/`cmap`.
+* v0.15 – pandas/matplotlib imported lazily; `--no-plot`, `--import-report`.
+* v0.14 – memory-mapped `.cols/` sidecar for sampled CSVs (`--no-col-cache`).
+* v0.13 – paraview sections go through a persistent pvpython worker (`--no-pv-worker`).
+* v0.12 – `--executor auto|local|slurm`: sampler calls as Slurm job steps.
+* v0.11 – `--sampler-workers`: large points files sharded across samplers.
+* v0.10 – `src-glob`: streaming multi-snapshot mean/std/covariance.
+* v0.9 – compiled expression programs with shared sub-expressions.
+* v0.8 – streamed points generation, optional `.npy` points.
+* v0.7 – content-addressed sampler cache (`--cache-dir`, `--no-cache`).
+* v0.6 – `--all`, `--sections GLOB`, `-j`, `--force`; dependency-aware pool.
+* v0.5 – script finalised; plotting, refs, σ‑band, CLI `--reuse-points`.
 * v0.4 – points regenerated every run.
 * v0.3 – geometry variables.
 * v0.2 – automatic sampler call.
@@ -20,391 +47,178 @@ Changelog
 """
 from __future__ import annotations
 
-import argparse, ast, configparser, subprocess, sys
+import time
+_T_START = _T_MAIN = time.perf_counter()
+
+import argparse, atexit, configparser, os, sys
+import glob as _glob
+from collections import ChainMap
 from pathlib import Path
 import numpy as np
 globals().setdefault('sqrt', np.sqrt)
-import pandas as pd
 
-from matplotlib import colors as mcolors
-
-from util import infer_nx_ny_nz, spanwise_mean
+from util import axis_weights, parse_axes, parse_op, reduce_grid
+from colcache import CHUNK_ROWS as COL_CHUNK_ROWS, ColumnTable, load_columns
+from stagetrace import TRACE, stage
+from planegeom import geometry_key, lookup as lookup_geometry, store as store_geometry
+from exprengine import ExprProgram
+from samplecache import file_identity, parse_bytes
+from snapstats import COORD_COLS
+from sectionio import (_IMPORT_TIMES, _as_bool, _bold, _clean_ascii, _cyan, _decimate_csv_curve,
+                       _family_base, _green, _pd, _sort_dedupe_1d, _yellow, base_env, eval_exprs,
+                       first_key, get_label, load_reference_csvs_with_notes,
+                       load_reference_query, read_csv_any, read_csv_chunks)
+from plotting import (PLANE_DPI, PLANE_FIGSIZE, _parse_levels, _parse_pixels, drain_renders,
+                      plane_geometry, plane_lod, plot_line, plot_plane, render)
+from sampling import (_ensure_points, _is_adaptive, _is_data_line, _key_stamp, _mesh_path,
+                      _parse_lims, _parse_pairs, _parse_spacings, _sample_paths, _skip_value,
+                      _src_path, configure_locator, ensure_sampled, ensure_snapshot_stats,
+                      infer_nx_ny_nz)
+from executors import make_executor
+from pvfamily import _run_paraview_family
+from spectrafamily import _run_spectra_family
+from podfamily import _run_pod_family
+from batch import list_sections, run_sections, watch_sections
 
 from typing import Dict, Sequence
 
 REF_FILL_CMAP = "viridis"   # global default
 
-import matplotlib.pyplot as plt
-
 
-plt.rcParams.update({
-    "figure.dpi": 200,
-    "savefig.dpi": 300,
-    "axes.titlesize": 25,   # ↑
-    "axes.labelsize": 25,   # ↑ xlabel/ylabel
-    "xtick.labelsize": 20,  # ↑ xticks
-    "ytick.labelsize": 20,  # ↑ yticks
-    "legend.fontsize": 13,  # (optional) match scale
-})
+def import_report(stream=sys.stderr):
+    """Start-up + lazy-import timings; printed at exit with --import-report."""
+    mods = sorted(m for m in ("pandas", "matplotlib") if m in sys.modules)
+    print(f"[pyfr_plot] (imports) start-up {(_T_MAIN - _T_START) * 1e3:7.1f} ms"
+          f"  (module body, before main)", file=stream)
+    for name, (dt, caller) in _IMPORT_TIMES.items():
+        print(f"[pyfr_plot] (imports) {name:<10} {dt * 1e3:7.1f} ms  (first used by {caller})",
+              file=stream)
+    if not _IMPORT_TIMES:
+        print("[pyfr_plot] (imports) pandas / matplotlib never imported", file=stream)
+    elif set(mods) - set(_IMPORT_TIMES):
+        print(f"[pyfr_plot] (imports) already loaded at start-up: "
+              f"{', '.join(sorted(set(mods) - set(_IMPORT_TIMES)))}", file=stream)
 
 
-# ---------- pretty printer --------------------------------------------------
-def _cyan(s):   return f"\033[96m{s}\033[0m"
-def _green(s):  return f"\033[92m{s}\033[0m"
-def _yellow(s): return f"\033[93m{s}\033[0m"
-def _bold(s):   return f"\033[1m{s}\033[0m"
+def write_trace(path: Path, stream=sys.stderr):
+    """Write the --trace file and print the per-stage summary at exit."""
+    TRACE.write(path)
+    for line in TRACE.summary():
+        print(f"[pyfr_plot] (trace) {line}", file=stream)
+    print(f"[pyfr_plot] (trace) wrote → {path}  (open in https://ui.perfetto.dev)", file=stream)
 
-REF_STYLES = [dict(color="red"       , marker="o"),  
-              dict(color="green"     , marker="s"),   
-              dict(color="tab:blue"  , marker="^"),  
-              dict(color="tab:orange", marker="D"),
-              dict(color="purple"    , marker="v"),
-]
 
 # ----------------------------------------------------------------------------
 # Helpers
 # ----------------------------------------------------------------------------
-
-import shlex
-import glob as _glob
-
-import matplotlib as mpl
-from matplotlib.legend_handler import HandlerBase
-from matplotlib.patches import Rectangle
-
-class HandlerBandLine(HandlerBase):
-    """Legend handler: draw a shaded band with a line on top (stacked)."""
-    def create_artists(self, legend, orig_handle,
-                       xdescent, ydescent, width, height, fontsize, trans):
-        line_color, band_rgba = orig_handle  # tuple passed as the "handle"
-        # band rectangle (60% of box height, vertically centered)
-        band = Rectangle((xdescent, ydescent + 0.0*height),
-                         width, 1*height,
-                         transform=trans,
-                         facecolor=band_rgba, edgecolor='none')
-        # line across middle
-        ymid = ydescent + 0.5*height
-        line = mpl.lines.Line2D([xdescent, xdescent + width],
-                                [ymid, ymid],
-                                transform=trans,
-                                color=line_color, linewidth=2.5)
-        return [band, line]
-
-
-_SUPS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
-def _sup(n: int) -> str:
-    return "".join(_SUPS[ord(d) - 48] for d in str(n))
-
-def _parse_reference_csv(path: Path, *, forced_label: str | None = None) -> pd.DataFrame:
-    """Read a reference CSV and capture the first top comment (starting with '#')."""
-    note = ""
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            s = line.strip()
-            if not s:
-                continue
-            if s.startswith("#"):
-                note = s.lstrip("#").strip()
-                break
-            break  # header reached
-
-    df = read_csv_any(path)
-    # label priority: forced from spec > existing > filename stem
-    df.attrs["label"] = forced_label or df.attrs.get("label") or path.stem
-    if note:
-        df.attrs["refnote"] = note
-
-    return df
-
-def load_reference_csvs_with_notes(spec: str) -> list[pd.DataFrame]:
+def load_sampled_columns(path: Path, *, use_cache: bool = True,
+                         max_memory: int | None = None):
     """
-    Accepts ANY of:
-      - whitespace and/or comma separated items
-      - quoted paths with spaces
-      - glob patterns (*.csv)
-      - optional labels as  label=path  or  label:path  (DOIs are left intact)
+    Sampled CSV as a name → array mapping (`-` spelled `_`).  Through the
+    `.cols/` sidecar the columns are memory-mapped and only opened when an
+    expression touches them; the text parse happens once per CSV version,
+    block by block (smaller blocks under *max_memory*).
     """
-    if not spec or not spec.strip():
-        return []
-
-    # turn commas into whitespace and let shlex respect quotes
-    tokens = shlex.split(spec.replace(",", " "))
-
-    refs: list[pd.DataFrame] = []
-    for tok in tokens:
-        label = None
-        path_txt = tok
-
-        # Support label=path or label:path (but don't split DOIs or URLs)
-        if ("=" in tok) or (":" in tok and not tok.startswith(("http://", "https://"))):
-            # prefer '='; otherwise first ':' only
-            if "=" in tok:
-                label, path_txt = tok.split("=", 1)
-            else:
-                label, path_txt = tok.split(":", 1)
-            label = label.strip()
-            path_txt = path_txt.strip()
-
-        # Expand globs; if none match, fall back to literal
-        matches = sorted(_glob.glob(path_txt)) or [path_txt]
-        for m in matches:
-            p = Path(m)
-            if not p.exists():
-                print(f"[pyfr_plot] (warn) reference not found: {m}")
-                continue
-
-            # Skip if label like "_Hmode" or filename like "_Hmode.csv"
-            if (label and label.startswith('_')) or p.stem.startswith('_'):
-                print(f"[pyfr_plot] (note) skipping reference starting with '_': {p.name}")
-                continue
-
-            refs.append(_parse_reference_csv(p, forced_label=label))
-
-    return refs
-
-
-def _set_limits_with_padding(ax, xs, ys, pad_x=0.02, pad_y=0.06):
-    """Autoscale to all data with a little padding so markers aren't cut."""
-    import numpy as _np
-    xs = _np.asarray(xs); ys = _np.asarray(ys)
-    xmin, xmax = _np.nanmin(xs), _np.nanmax(xs)
-    ymin, ymax = _np.nanmin(ys), _np.nanmax(ys)
-    xr = xmax - xmin or 1.0
-    yr = ymax - ymin or 1.0
-    ax.set_xlim(xmin - pad_x * xr, xmax + pad_x * xr)
-    ax.set_ylim(ymin - pad_y * yr, ymax + pad_y * yr)
-
-
-def first_key(sect: configparser.SectionProxy, *names: str, default: str | None = None):
-    """Return the first existing key among *names* (case‑insensitive)."""
-    for k in names:
-        if k in sect:
-            return sect[k]
-    if default is not None:
-        return default
-    raise KeyError(f"None of the keys {', '.join(names)} found in section [{sect.name}]")
-
-
-def get_label(cfg, sect, base, key: str, fallback: str = "") -> str:
-    # 1) section
-    if key in sect:
-        return sect[key]
-    # 2) family base (may be dict or SectionProxy)
-    if base and key in base:
-        return base[key]
-    # 3) global defaults
-    if "plot-defaults" in cfg and key in cfg["plot-defaults"]:
-        return cfg["plot-defaults"][key]
-    # 4) fallback
-    return fallback
-
-
-def read_csv_any(path: Path) -> pd.DataFrame:
-    """Read CSV with either comma or whitespace separators."""
-    try:
-        return pd.read_csv(path, comment="#", skip_blank_lines=True)
-    except (pd.errors.ParserError, UnicodeDecodeError):
-        return pd.read_csv(path, delim_whitespace=True, comment="#", skip_blank_lines=True)
+    rows = max(1 << 12, max_memory // STREAM_ROW_BYTES) if max_memory else COL_CHUNK_ROWS
+    cols = (load_columns(path, read_csv_any, chunks=read_csv_chunks, chunk_rows=rows)
+            if use_cache else None)
+    if cols is None:
+        df = read_csv_any(path)
+        cols = {c.replace('-', '_'): df[c].values for c in df.columns}
+    return cols
 
-def eval_expr(expr: str, env: Dict[str, np.ndarray | float]):
-    """Evaluate *expr* in a restricted, NumPy‑friendly namespace."""
-    allowed = {**env, "np": np, "sqrt": np.sqrt, "sin": np.sin, "cos": np.cos,
-        "tan": np.tan, "log": np.log, "exp": np.exp, "pi": np.pi, }
-    return eval(expr, {"__builtins__": {}}, allowed)
 
 # ----------------------------------------------------------------------------
-# Geometry helper – injects START_X, STREAM_LEN, D, STERN_X, …
+# --max-memory: evaluate + reduce over grid blocks, never whole columns
 # ----------------------------------------------------------------------------
+STREAM_ROW_BYTES = 512          # parse cost of one CSV row, generously
+
+def reduce_outputs(vals, shape, axes, op, weights=None) -> dict[str, np.ndarray | None]:
+    """Reduce evaluated x / y / z over *axes*; σ (`std`) travels with y."""
+    out: dict[str, np.ndarray | None] = {"std": None}
+    for k in ("x", "y", "z"):
+        v = vals.get(k)
+        if v is None:
+            out[k] = None
+        elif k == "y" and vals.get("std") is not None:
+            out["y"], out["std"] = reduce_grid(v, shape, axes, op, weights=weights,
+                                               std=vals["std"])
+        else:
+            out[k] = reduce_grid(v, shape, axes, op, weights=weights)
+    return out
 
-def geometry_env(cfg: configparser.ConfigParser) -> Dict[str, float]:
-    env: Dict[str, float] = {}
-    if "postprocess-geometry" in cfg:
-        g = cfg["postprocess-geometry"]
-
-        def parse_tuple(txt: str):
-            txt = txt.strip().lstrip("([{}").rstrip(")] {}")
-            return tuple(map(float, txt.split(',')))
-
-        sx, sy, sz = parse_tuple(g.get("start", "0,0,0"))
-        env.update({"START_X": sx, "START_Y": sy, "START_Z": sz})
-
-        stream_len = float(g.get("streamwiselength", g.get("length-streamwise", 0)))
-        span_len = float(g.get("spanwiselength", g.get("length-spanwise", 0)))
-        env.update({"STREAM_LEN": stream_len, "SPAN_LEN": span_len, "D": span_len})
-        env["STERN_X"] = sx + stream_len
-
-
-        env["streamwiselength"] = stream_len
-        env["spanwiselength"]   = span_len
-    return env
-
-# ----------------------------------------------------------------------------
-# Points CSV generator
-# ----------------------------------------------------------------------------
 
-def infer_nx_ny_nz(arr_len: int, spacings: str) -> tuple[int,int]:
+def eval_reduce_streamed(exprs: Dict[str, str], env, shape: tuple[int, int, int],
+                         axes: tuple[int, ...], op: str, *, wspec: str = "",
+                         budget: int) -> dict[str, np.ndarray | None] | None:
     """
-    Work out ny,nz from array length and the user’s [nx,ny,nz] list,
-    allowing nx or nz to be 1 (line-like extraction).
+    Evaluate *exprs* and reduce them over *axes* one block of the first kept
+    grid axis at a time: each block holds whole reduction groups, so every
+    op (percentiles included) is exact, and only the reduced result is
+    allocated at full size.  Block size follows *budget* bytes.  Returns
+    None when the expressions need whole columns (e.g. `avg_u.min()`).
     """
-    nx, ny, nz = (int(ast.literal_eval(s.strip()))
-                  for s in spacings.strip("[]").split(','))
-
-    if arr_len == nx * ny * nz:
-        return nx, ny, nz
-
-
-    raise ValueError("Cannot deduce ny,nz – check spacings vs sampled size.")
-
-
-
-def make_points_csv(pts_path: Path, lims: str, spacings: str, env: Dict[str, float]):
-    """Generate Cartesian grid points and save to *pts_path*."""
-
-    def _vec(txt: str):
-        txt = txt.strip().lstrip("[(").rstrip(")] ")
-        comps = [c.strip() for c in txt.split(',')]
-        return tuple(float(eval(c, {"__builtins__": {}}, env)) for c in comps)
-
-    p0_txt, p1_txt = lims.strip("[]").split("),")
-    p0, p1 = _vec(p0_txt + ")"), _vec(p1_txt)
-
-    nx, ny, nz = (int(ast.literal_eval(s.strip())) for s in spacings.strip("[]").split(','))
-
-    def lin(a, b, n):
-        return np.linspace(a, b, n) if n > 1 else np.array([a])
-
-    xs, ys, zs = lin(p0[0], p1[0], nx), lin(p0[1], p1[1], ny), lin(p0[2], p1[2], nz)
-    pts = np.array([[x, y, z] for x in xs for y in ys for z in zs])
-    pts_path.parent.mkdir(parents=True, exist_ok=True)
-    np.savetxt(pts_path, pts, delimiter=',', header='x,y,z', comments='')
-
-# ----------------------------------------------------------------------------
-# Plot utility
-# ----------------------------------------------------------------------------
+    prog_exprs = dict(exprs)
+    if wspec and wspec.lower() != "trapz":
+        prog_exprs["w"] = wspec
+    prog = ExprProgram(prog_exprs, env)
+    if not prog.chunkable:
+        print("[pyfr_plot] (stream) expressions need whole columns; evaluating in memory")
+        return None
+    kept = [i for i in range(3) if i not in axes]
+    if not kept:
+        print("[pyfr_plot] (stream) reduction over every axis; evaluating in memory")
+        return None
+
+    lead = next((i for i in kept if shape[i] > 1), kept[0])
+    n = int(np.prod(shape))
+    slab = n // shape[lead]                       # grid values per lead index
+    row_bytes = 16 * (len(prog.names) + len(prog.outputs) + 4)   # inputs, outputs, temps ×2
+    step = int(max(1, min(shape[lead], budget // max(row_bytes * slab, 1))))
+    weights = _reduce_weights("trapz", env, shape, axes) if wspec.lower() == "trapz" else None
+
+    out_shape = tuple(1 if i in axes else m for i, m in enumerate(shape))
+    out = {k: (np.empty(out_shape) if k in prog.outputs else None) for k in ("x", "y", "z", "std")}
+    if "y" not in prog.outputs:
+        out["std"] = None                           # σ only travels with y
+    columns = [k for k in prog.names
+               if isinstance(env[k], np.ndarray) and env[k].ndim and len(env[k]) == n]
+
+    for i0 in range(0, shape[lead], step):
+        sl = tuple(slice(i0, i0 + step) if i == lead else slice(None) for i in range(3))
+        bshape = tuple(min(step, m - i0) if i == lead else m for i, m in enumerate(shape))
+        blk = ChainMap({k: np.ascontiguousarray(np.asarray(env[k]).reshape(shape)[sl]).ravel()
+                        for k in columns}, env)
+        vals = prog.evaluate_block(blk)
+        red = reduce_outputs(vals, bshape, axes, op, vals.pop("w", weights))
+        for k, v in out.items():
+            if v is not None:
+                v[sl] = red[k]
+    nblk = -(-shape[lead] // step)
+    print(f"[pyfr_plot] (stream) {n} rows in {nblk} block(s) of ≤{step * slab} rows")
+    return out
 
-from matplotlib import colors as mcolors
-
-def plot_line(x, y, std, refs, outfile, xlabel, ylabel, title="",
-              show_legend=True, show_ref_notes=True, *, pyfr_label="PyFR"):
-    plt.figure(figsize=(10, 5.2))
-    ax = plt.gca()
-
-    # --- PyFR band then line (line above the band) ---
-    py_line_obj = None
-    std_obj = None
-    base_col = "tab:blue"
-    band_rgba = mcolors.to_rgba(base_col, alpha=0.22)
-    std_obj = None
-    if std is not None:
-        std_obj = plt.fill_between(x, y - std, y + std,
-                                facecolor=band_rgba, linewidth=0, zorder=1)
-    py_line_obj = plt.plot(x, y, color=base_col, lw=3, zorder=2,
-                        solid_capstyle="round")[0]
-
-    # --- collect limits (so markers aren’t clipped) ---
-    all_x, all_y = [x], [y]
-    if std is not None:
-        all_y += [y - std, y + std]
-
-    ref_handles, ref_labels, notes = [], [], []
-    for i, ref in enumerate(refs):
-        rx, ry = ref.iloc[:, 0].values, ref.iloc[:, 1].values
-        all_x.append(rx); all_y.append(ry)
-        base_lbl = ref.attrs.get("label", ref.iloc[:, 0].name or "ref")
-        note = ref.attrs.get("refnote", "")
-        sup = ""
-        if note:
-            notes.append(note); sup = _sup(len(notes))
-        style = REF_STYLES[i % len(REF_STYLES)]
-        h = plt.scatter(rx, ry, s=5, facecolors="none",
-                        edgecolors=style["color"], marker=style["marker"],
-                        linewidths=1.0, clip_on=False, zorder=3)
-        ref_handles.append(h); ref_labels.append(f"{base_lbl}{sup}")
-
-    import numpy as _np
-    _set_limits_with_padding(ax, _np.concatenate(all_x), _np.concatenate(all_y),
-                             pad_x=0.02, pad_y=0.08)
-
-    plt.xlabel(xlabel); plt.ylabel(ylabel)
-    if title: plt.title(title)
-
-    # --- footnotes (unchanged) ---
-    if show_ref_notes and notes:
-        y0, dy = 0.012, 0.018
-        bottom = y0 + dy*len(notes) + 0.018
-        plt.tight_layout(rect=[0.0, bottom, 1.0, 1.0])
-        fig = plt.gcf()
-        for i, txt in enumerate(notes):
-            fig.text(0.5, y0 + dy*i, f"{_sup(i+1)} {txt}",
-                     ha="center", va="bottom", fontsize=8)
-    else:
-        plt.tight_layout(rect=[0.0, 0.04, 1.0, 1.0])
-
-    # --- legend: single entry for (band + line) so they appear stacked ---
-    if show_legend:
-        handles, labels = [], []
-        if std is not None:
-            pyfr_handle = (py_line_obj.get_color(), band_rgba)
-            handles.append(pyfr_handle)
-            labels.append(f"{pyfr_label} (μ±σ)")
-        else:
-            handles.append(py_line_obj)
-            labels.append(pyfr_label)
 
-        # append ref handles/labels you already collected as (scatter, label)
-        handles += ref_handles
-        labels  += ref_labels
+def plane_geometry_key(pts: Path, sampled: Path, xexpr: str, yexpr: str, env, *,
+                       shape, axes, op: str, wspec: str, pixels) -> str:
+    """
+    What the plotted grid depends on: the points file (plus the sampled CSV
+    when x / y use non-coordinate columns), the expressions and the scalars
+    they read, the reduction and the pixel budget.
+    """
+    names = ExprProgram({"x": xexpr, "y": yexpr}, env).names
+    scalars = {n: float(env[n]) for n in sorted(names) if np.ndim(env[n]) == 0}
+    data = sorted(names - set(scalars) - set(COORD_COLS))
+    budget = pixels
+    if pixels is None:
+        import matplotlib as mpl                  # rcParams only, no pyplot
+        budget = [PLANE_FIGSIZE, PLANE_DPI] + [mpl.rcParams[f"figure.subplot.{k}"]
+                                               for k in ("left", "right", "bottom", "top")]
+    return geometry_key(pts=file_identity(pts),
+                        sampled=file_identity(sampled) if data else "",
+                        x=xexpr, y=yexpr, scalars=scalars, shape=list(shape),
+                        axes=list(axes), op=op, weights=wspec, pixels=budget)
 
-        ncols = 2 if len(refs) >= 3 else 1
-        plt.legend(handles, labels, frameon=False, ncol=ncols,
-                handler_map={tuple: HandlerBandLine()})
-
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(outfile, dpi=300, bbox_inches="tight")
-    plt.close()
-    print(f"[pyfr_plot] Saved → {outfile}")
-
-
-
-def plot_plane(x2d, y2d, z2d, 
-               outfile, 
-               xlabel, ylabel, zlabel, title=""):
-    plt.figure(figsize=(10, 8))
-    # —— Posa-style rainbow palette & fixed 0–1 range ——
-    levels = np.linspace(0.0, 1.0, 21)           # 0-1 by 0.05
-    cf = plt.contourf(x2d, y2d, z2d,
-                      levels=levels,
-                      cmap="turbo",              # vivid rainbow (Matplotlib ≥3.4)
-                      extend="both")
-
-    cb = plt.colorbar(cf,
-                      orientation="horizontal",
-                      pad=0.08,
-                      aspect=40)
-    cb.set_ticks(np.linspace(0, 1, 6))           # 0,0.2,…,1
-    cb.set_label(zlabel)
-
-    cb.set_label(zlabel)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    if title:
-        plt.title(title)
-    
-    plt.gca().set_aspect("equal")
-    plt.tight_layout()
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(outfile, dpi=300)
-    plt.close()
-    print(f"[pyfr_plot] Saved → {outfile}")
-
-def _clean_ascii(expr: str) -> str:
-    # normal minus signs
-    for bad in ('\u2010', '\u2011', '\u2012', '\u2013', '\u2212'):
-        expr = expr.replace(bad, '-')
-    # remove strange line separators / zero-width spaces
-    expr = expr.replace('\u2028', '').replace('\u2029', '').replace('\u200b', '')
-    return expr.strip()
 
 # ----------------------------------------------------------------------------
 # Main driver
@@ -414,17 +228,71 @@ def _clean_ascii(expr: str) -> str:
 # Main driver – now only a tiny wrapper
 # ----------------------------------------------------------------------------
 def main(argv: Sequence[str] | None = None):
+    global _T_MAIN
+    _T_MAIN = time.perf_counter()
     ap = argparse.ArgumentParser(
         description="Sample a PyFR solution, build points on the fly, and plot.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     ap.add_argument("ini",     help="PyFR run .ini file")
-    ap.add_argument("section", help="Post-processing section to use")
+    ap.add_argument("section", nargs="?", help="Post-processing section to use")
+    ap.add_argument("--all", action="store_true",
+                    help="Run every postprocess-<family>-<name> section of the INI")
+    ap.add_argument("--sections", metavar="GLOB",
+                    help="Run sections matching GLOB (comma-separated globs allowed)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                    help="Worker processes for --all/--sections")
+    ap.add_argument("--watch", action="store_true",
+                    help="Keep running: re-run sections whose src/mesh/INI inputs change")
+    ap.add_argument("--poll", type=float, default=2.0,
+                    help="Seconds between input scans in --watch mode")
+    ap.add_argument("--settle", type=float, default=5.0,
+                    help="A changed input must stay unchanged this long before it is used")
+    ap.add_argument("--force", action="store_true",
+                    help="Re-run sections even if their outputs are up to date")
     ap.add_argument("--xexpr")
     ap.add_argument("--yexpr")
     ap.add_argument("--stdexpr")
     ap.add_argument("--skip", type=int, help="--skip value for pyfr sampler")
-
+    ap.add_argument("--cache-dir", type=Path,
+                    help="Sampler cache root (default: $PYFR_PLOT_CACHE or ~/.cache/pyfr_plot)")
+    ap.add_argument("--cache-max-bytes",
+                    help="Sampler cache budget, e.g. 50G (default: $PYFR_PLOT_CACHE_MAX or 20G)")
+    ap.add_argument("--sampler-workers", type=int, default=1,
+                    help="Shard large points files and run this many samplers concurrently")
+    ap.add_argument("--executor", choices=("auto", "local", "slurm"), default="auto",
+                    help="How sampler calls are launched (auto: srun steps inside a Slurm job)")
+    ap.add_argument("--srun", help="srun executable (default: $PYFR_PLOT_SRUN or srun)")
+    ap.add_argument("--step-ntasks", type=int, default=1,
+                    help="MPI tasks per sampler job step")
+    ap.add_argument("--step-cpus", type=int,
+                    help="CPUs per task of a job step (default: $SLURM_CPUS_PER_TASK or 1)")
+    ap.add_argument("--max-steps", type=int,
+                    help="Concurrent sampler calls (default: allocation tasks / step-ntasks, 1 locally)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Disable the sampler cache; sample only when the CSV is missing")
+    ap.add_argument("--no-coalesce", action="store_true",
+                    help="Sample each points file separately instead of one merged pass per solution")
+    ap.add_argument("--locate-index", action="store_true",
+                    help="Experimental: sample through the [postprocess-sampler] locate/interp "
+                         "commands (needs a sampler that splits location from interpolation)")
+
+    ap.add_argument("--max-memory", type=parse_bytes, metavar="BYTES",
+                    help="Stream load / evaluate / reduce in blocks within about BYTES (e.g. 4G)")
+    ap.add_argument("--no-col-cache", action="store_true",
+                    help="Parse sampled CSVs every time instead of using the .cols/ sidecar")
+    ap.add_argument("--no-pv-worker", action="store_true",
+                    help="Run a fresh pvpython per paraview section instead of the shared worker")
+    ap.add_argument("--no-plot", action="store_true",
+                    help="Data only: sample, evaluate and write CSVs; never import matplotlib")
+    ap.add_argument("--sync-render", action="store_true",
+                    help="Render figures inline instead of in the background Agg process")
+    ap.add_argument("--render-inflight", type=int, default=2,
+                    help="Figures queued for the background renderer before sections wait")
+    ap.add_argument("--import-report", action="store_true",
+                    help="Print start-up and pandas/matplotlib import times at exit")
+    ap.add_argument("--trace", metavar="FILE", type=Path,
+                    help="Write per-stage wall/CPU/RSS timings as a Chrome trace JSON")
     ap.add_argument("--no-legend", action="store_true",
                     help="Hide the legend for this plot")
     ap.add_argument("--no-ref-notes", action="store_true",
@@ -438,14 +306,40 @@ def main(argv: Sequence[str] | None = None):
                     const="",
                     help="If CSV exists, re-use it instead of re-sampling")
     args = ap.parse_args(argv)
+    if args.import_report:
+        atexit.register(import_report)
+    if args.trace:
+        TRACE.enable()
+        atexit.register(write_trace, args.trace)
 
     # --- read the .ini -------------------------------------------------
     cfg = configparser.ConfigParser()
     cfg.optionxform = str          # preserve case (Uin, Pr, …)
     cfg.read(args.ini)
+    configure_locator(cfg, args)
+
+    # --- watch mode: re-run affected sections as inputs change ----------
+    if args.watch:
+        if not (args.all or args.sections or args.section):
+            ap.error("--watch needs a section, --all or --sections GLOB")
+        watch_sections(args, _run_section)
+        return
+
+    # --- batch mode: many sections, one process pool -------------------
+    if args.all or args.sections:
+        names = list_sections(cfg, args.sections)
+        if not names:
+            sys.exit("[pyfr_plot] No postprocess sections matched.")
+        sys.exit(1 if run_sections(cfg, names, args, _run_section) else 0)
+
+    if not args.section:
+        ap.error("give a section, --all or --sections GLOB")
 
     # --- now run the requested section ---------------------------------
-    _run_section(cfg, args.section, args, subcall=False)
+    with stage("section", args.section):
+        _run_section(cfg, args.section, args, subcall=False)
+    for tag, why in drain_renders():
+        sys.exit(f"[pyfr_plot] {tag}: {why}")
 
 def build_title(cfg, sect, base, sec_name, mean_flag, *, is_plane):
     t = get_label(cfg, sect, base, "title", fallback="")
@@ -456,365 +350,138 @@ def build_title(cfg, sect, base, sec_name, mean_flag, *, is_plane):
     return t
 
 
+# ----------------------------------------------------------------------------
+# Helper: run one post-processing section (line OR plane)
+# ----------------------------------------------------------------------------
+# ----------------------------------------------------------------------------
+# Adaptive sampleline: start coarse, refine only where the profile bends
+# ----------------------------------------------------------------------------
+ADAPTIVE_MIN_DT = 1e-6          # shortest interval refined (fraction of the line)
 
-
-
-import os
-
-def _as_bool(v) -> bool:
-    if v is None:
-        return False
-    if isinstance(v, bool):
-        return v
-    return str(v).strip().lower() in {"1", "true", "yes", "y", "on"}
-
-def _split_tokens(s: str) -> list[str]:
-    return shlex.split(s.replace(",", " ")) if s else []
-
-def _get_any(sect, base, *keys, default=None):
-    for k in keys:
-        if k in sect:
-            return sect.get(k)
-        if isinstance(base, dict):
-            if k in base:
-                return base.get(k)
-        else:
-            if k in base:
-                return base.get(k)
-    return default
-
-def _detect_point_cols(cols):
-    cands = [("Points:0", "Points:1", "Points:2"),
-             ("Points_0", "Points_1", "Points_2")]
-    for a, b, c in cands:
-        if a in cols and b in cols and c in cols:
-            return a, b, c
-    raise KeyError("Could not find coordinate columns (expected Points:0/1/2).")
-
-def _align_to_chord_xy(xy, *, x_end_frac=1e-3):
+def _refine_indicator(t: np.ndarray, q: np.ndarray, tol: float) -> np.ndarray:
     """
-    Robust chord frame:
-      - LE = mean of points with x within x_end_frac * chord of xmin
-      - TE = mean of points with x within x_end_frac * chord of xmax
-    This avoids picking a single upper-surface point as LE/TE.
+    Per-interval error estimate on sorted parameters *t*: the jump of *q*
+    across the interval and the distance of each interior sample from the
+    chord of its neighbours (curvature), both relative to the range of *q*.
+    Zero where the interval is resolved (≤ *tol*) or already too short.
     """
-    xy = np.asarray(xy, dtype=float)
-
-    xmin = float(xy[:, 0].min())
-    xmax = float(xy[:, 0].max())
-    xr = xmax - xmin
-    if xr <= 0.0:
-        raise RuntimeError("Degenerate x-range; cannot define chord.")
-
-    tol = x_end_frac * xr
-
-    le_pts = xy[np.abs(xy[:, 0] - xmin) <= tol]
-    te_pts = xy[np.abs(xy[:, 0] - xmax) <= tol]
-
-    # Fallbacks if tolerance too tight
-    le = le_pts.mean(axis=0) if len(le_pts) else xy[np.argmin(xy[:, 0])]
-    te = te_pts.mean(axis=0) if len(te_pts) else xy[np.argmax(xy[:, 0])]
-
-    chord = te - le
-    c = float(np.linalg.norm(chord))
-    if c == 0.0:
-        raise RuntimeError("Chord length is zero (degenerate geometry).")
-
-    t = chord / c
-    n = np.array([-t[1], t[0]])
-
-    rel = xy - le
-    xprime = rel @ t
-    yprime = rel @ n
-
-    return le, te, c, xprime / c, yprime
-
-def _surface_envelope(x_over_c, y_signed, mu, sig=None, *, nbins=600, eps=0.0):
+    q = np.nan_to_num(np.asarray(q, dtype=float))
+    span = float(np.ptp(q)) if len(q) else 0.0
+    if len(t) < 2 or span == 0.0:
+        return np.zeros(max(len(t) - 1, 0))
+    q = q / span
+    ind = np.abs(np.diff(q))
+    if len(t) > 2:
+        w = (t[1:-1] - t[:-2]) / (t[2:] - t[:-2])
+        dev = np.abs(q[1:-1] - ((1 - w) * q[:-2] + w * q[2:]))
+        ind[:-1] = np.maximum(ind[:-1], dev)
+        ind[1:] = np.maximum(ind[1:], dev)
+    ind[np.diff(t) < 2 * ADAPTIVE_MIN_DT] = 0.0
+    return np.where(ind > tol, ind, 0.0)
+
+
+def _write_line_points(path: Path, p0, p1, t: np.ndarray):
+    pts = np.asarray(p0, float) + t[:, None] * (np.asarray(p1, float) - np.asarray(p0, float))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+    with tmp.open("w") as fh:
+        fh.write("x,y,z\n")
+        fh.write(("%.18e,%.18e,%.18e\n" * len(pts)) % tuple(pts.ravel().tolist()))
+    os.replace(tmp, path)
+
+
+def adaptive_sample(csv_out: Path, pts_path: Path, *, p0, p1, qexpr: str, env0,
+                    mesh: Path, src: Path, skip: int, args, n0: int = 17,
+                    max_points: int = 1000, tol: float = 0.01, max_iter: int = 8) -> Path:
     """
-    Build upper/lower envelopes by x/c bins.
-
-    Critical fix:
-      - upper candidates: y_signed > +eps
-      - lower candidates: y_signed < -eps
-    If a bin has no candidates for a side, we skip that bin for that side.
-    Also: write x as BIN CENTER (prevents repeated-x vertical segments).
+    Sample the line *p0* → *p1* at *n0* points, then repeatedly bisect the
+    intervals whose `_refine_indicator` on *qexpr* exceeds *tol* (largest
+    first) until nothing is flagged, *max_points* is reached or *max_iter*
+    rounds ran.  Each round sends only its new points through
+    `ensure_sampled` (so rounds are cached like any other sample); the
+    union, ordered along the line, is written to *pts_path* / *csv_out*.
     """
-    x = np.clip(np.asarray(x_over_c, dtype=float), 0.0, 1.0)
-    y = np.asarray(y_signed, dtype=float)
-    mu = np.asarray(mu, dtype=float)
-    sig = np.asarray(sig, dtype=float) if sig is not None else None
-
-    bins = np.linspace(0.0, 1.0, nbins + 1)
-    ib = np.digitize(x, bins) - 1
-    valid = (ib >= 0) & (ib < nbins)
-
-    x, y, mu, ib = x[valid], y[valid], mu[valid], ib[valid]
-    if sig is not None:
-        sig = sig[valid]
-
-    xu, muu, sigu = [], [], []
-    xl, mul, sigl = [], [], []
-
-    for b in range(nbins):
-        xc = 0.5 * (bins[b] + bins[b + 1])  # BIN CENTER
-
-        m = (ib == b)
-        if not np.any(m):
-            continue
-
-        idx = np.where(m)[0]
-
-        # --- upper: only y > +eps
-        iu_cand = idx[y[idx] > +eps]
-        if iu_cand.size:
-            iu = iu_cand[np.argmax(y[iu_cand])]
-            xu.append(xc); muu.append(mu[iu])
-            if sig is not None: sigu.append(sig[iu])
-
-        # --- lower: only y < -eps
-        il_cand = idx[y[idx] < -eps]
-        if il_cand.size:
-            il = il_cand[np.argmin(y[il_cand])]
-            xl.append(xc); mul.append(mu[il])
-            if sig is not None: sigl.append(sig[il])
-
-    out = {
-        "upper": (np.asarray(xu), np.asarray(muu)),
-        "lower": (np.asarray(xl), np.asarray(mul)),
-    }
-    if sig is not None:
-        out["upper_sig"] = np.asarray(sigu) if len(sigu) else None
-        out["lower_sig"] = np.asarray(sigl) if len(sigl) else None
-
-    print(f"[paraview-envelope] nbins={nbins} upper_pts={len(xu)} lower_pts={len(xl)}")
-    return out
-
-
-def plot_upper_lower(xu, yu, su, xl, yl, sl, refs, outfile, xlabel, ylabel, *,
-                     title="", shade_std=False):
-    plt.figure(figsize=(10, 5.2))
-    ax = plt.gca()
-
-    # upper/lower lines
-    lu = plt.plot(xu, yu, lw=3, label="upper")[0]
-    ll = plt.plot(xl, yl, lw=3, label="lower")[0]
-
-    # optional ±σ shading
-    if shade_std and su is not None:
-        plt.fill_between(xu, yu - su, yu + su, color=lu.get_color(), alpha=0.18, linewidth=0)
-    if shade_std and sl is not None:
-        plt.fill_between(xl, yl - sl, yl + sl, color=ll.get_color(), alpha=0.18, linewidth=0)
-
-    # references (keep your “filled small markers” style)
-    for i, ref in enumerate(refs):
-        rx, ry = ref.iloc[:, 0].values, ref.iloc[:, 1].values
-        style = REF_STYLES[i % len(REF_STYLES)]
-        plt.scatter(rx, ry, s=8, marker=style["marker"], label=ref.attrs.get("label", ref.columns[1]),
-                    linewidths=1.0)
-
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    if title:
-        plt.title(title)
-
-    plt.grid(True, which="both")
-    plt.legend(frameon=False, ncol=2 if len(refs) >= 3 else 1)
-    plt.tight_layout()
-
-    outfile.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(outfile, dpi=300, bbox_inches="tight")
-    plt.close()
-    print(f"[pyfr_plot] Saved → {outfile}")
-
-def _run_paraview_family(cfg, sec_name, sect, base, env0, args, *, subcall: bool):
-    # --- config
-    pvpython = Path(_get_any(sect, base, "pvpython", default="pvpython"))
-    pvtocsv  = Path(_get_any(sect, base, "pvtocsv", default="pvtocsv.py"))
-    input_vtu = Path(_get_any(sect, base, "input-vtu", "input_vtu", "src-file", "src", default=""))
-    if not str(input_vtu):
-        sys.exit("[pyfr_plot] paraview family requires input-vtu (or src-file).")
-
-    arrays = _split_tokens(_get_any(sect, base, "arrays", default=""))
-    mu_col = _get_any(sect, base, "mu-col", "mu_col", default=(arrays[0] if arrays else "Avg-P"))
-    sig_col = _get_any(sect, base, "sig-col", "sig_col", default=(arrays[1] if len(arrays) > 1 else ""))
-
-    weighting = _get_any(sect, base, "weighting", default="average_by_number")
-    point_merge = _as_bool(_get_any(sect, base, "point-merge", "point_merge", default=False))
-
-    nbins = int(_get_any(sect, base, "nbins", default=600))
-    shade_std = _as_bool(_get_any(sect, base, "shade-std", "shade_std", default=False))
-
-    ctg_csv = Path(_get_any(sect, base, "ctg-csv", "ctg_csv",
-                            default=f"{input_vtu.stem}-ctg.csv"))
-
-    out_csv = Path(_get_any(sect, base, "sampled-file", "out-csv", "out_csv",
-                            default=f"{sec_name}.csv"))
-    out_fig = Path(_get_any(sect, base, "file", "output",
-                            default=f"{sec_name}.png"))
-
-    xexpr = _clean_ascii(_get_any(sect, base, "xexpr", default="x_over_c"))
-    yexpr = _clean_ascii(_get_any(sect, base, "yexpr", default="mu"))
-    stdexpr = _clean_ascii(_get_any(sect, base, "stdexpr", default="")) or None
-
-    refs = load_reference_csvs_with_notes(_get_any(sect, base, "reference", default=""))
-
-    # --- run ParaView only if needed
-    if not ctg_csv.exists():
-        cmd = [str(pvpython), "--mesa", str(pvtocsv),
-               "-i", str(input_vtu),
-               "-o", str(ctg_csv),
-               "--weighting", str(weighting)]
-        if point_merge:
-            cmd.append("--point-merge")
-        if arrays:
-            cmd += ["--arrays", *arrays]
-
-        print("[pyfr_plot] (paraview) run:", " ".join(cmd))
-        subprocess.run(cmd, check=True)
-
-    # --- load CTG CSV
-    df = pd.read_csv(ctg_csv)
-    px, py, pz = _detect_point_cols(df.columns)
-
-    if mu_col not in df.columns:
-        sys.exit(f"[pyfr_plot] mu-col '{mu_col}' not in {ctg_csv}")
-    if sig_col and sig_col not in df.columns:
-        print(f"[pyfr_plot] (warn) sig-col '{sig_col}' not found; std disabled.")
-        sig_col = ""
-
-    xy = df[[px, py]].to_numpy()
-
-    le, te, c, x_over_c, y_signed = _align_to_chord_xy(xy)
-
-
-    print(f"[pyfr_plot] (paraview) chord: c={c:.10f} LE=({le[0]:.7f},{le[1]:.7f}) TE=({te[0]:.7f},{te[1]:.7f})")
-
-    mu = df[mu_col].to_numpy()
-    sig = df[sig_col].to_numpy() if sig_col else None
-
-    env_common = dict(env0)
-    # Evaluate expressions separately on envelope points
-    env_upper = dict(env_common)
-    env_lower = dict(env_common)
-
-    env = _surface_envelope(x_over_c, y_signed, mu, sig, nbins=nbins)
-
-    # pick which side this section is responsible for
-    side = str(_get_any(sect, base, "side", default="upper")).strip().lower()
-    if side not in {"upper", "lower"}:
-        sys.exit("[pyfr_plot] paraview: side must be 'upper' or 'lower'")
-
-    if side == "upper":
-        xs, mus = env["upper"]
-        sigs = env.get("upper_sig", None)
-    else:
-        xs, mus = env["lower"]
-        sigs = env.get("lower_sig", None)
-
-    # build evaluation env for this side only
-    env_side = dict(env0)
-    env_side.update({
-        "x_over_c": xs,
-        "mu": mus,
-        "sig": (sigs if sigs is not None else np.zeros_like(mus)),
-        "avg_p": mus,
-        "std_p": (sigs if sigs is not None else np.zeros_like(mus)),
-    })
-
-    x1 = np.asarray(eval_expr(xexpr, env_side), dtype=float)
-    y1 = np.asarray(eval_expr(yexpr, env_side), dtype=float)
-    s1 = (np.asarray(eval_expr(stdexpr, env_side), dtype=float)
-          if (stdexpr and sigs is not None) else None)
-
-    # write a simple LaTeX-friendly CSV: x,y[,std]
-    out = pd.DataFrame({"x": x1, "y": y1})
-    if s1 is not None:
-        out["std"] = s1
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(out_csv, index=False)
-    print(f"[pyfr_plot] (paraview) wrote → {out_csv}")
-
-    xlabel = get_label(cfg, sect, base, "xlabel", fallback=r"$x/c$")
-    ylabel = get_label(cfg, sect, base, "ylabel", fallback=yexpr)
-    title  = get_label(cfg, sect, base, "title", fallback=sec_name)
-
-    # plot as a normal 1-line plot (same style as sampleline)
-    plot_line(
-        x1, y1, s1, refs, out_fig,
-        xlabel=xlabel, ylabel=ylabel, title=title,
-        show_legend=True, show_ref_notes=True,
-        pyfr_label=side,
-    )
-
-
-
-
-def _sort_dedupe_1d(x, y, s=None):
-    x = np.asarray(x, dtype=float)
-    y = np.asarray(y, dtype=float)
-    if s is not None:
-        s = np.asarray(s, dtype=float)
-
-    # sort by x
-    idx = np.argsort(x, kind="mergesort")
-    x, y = x[idx], y[idx]
-    if s is not None:
-        s = s[idx]
-
-    # de-duplicate x (keep first or average; average is safer)
-    ux, inv, counts = np.unique(x, return_inverse=True, return_counts=True)
-    if len(ux) != len(x):
-        y_acc = np.zeros_like(ux, dtype=float)
-        if s is not None:
-            s_acc = np.zeros_like(ux, dtype=float)
-
-        np.add.at(y_acc, inv, y)
-        if s is not None:
-            np.add.at(s_acc, inv, s)
-
-        y = y_acc / counts
-        if s is not None:
-            s = s_acc / counts
-        x = ux
-
-    return x, y, s
-
-
-def _pass_slurm_pmi_fd_to_child() -> tuple[int, ...]:
+    work = csv_out.with_name(csv_out.name + ".adapt")
+    new = np.linspace(0.0, 1.0, max(int(n0), 2))
+    ts, qs, lines, header = np.empty(0), np.empty(0), [], None
+
+    for it in range(int(max_iter) + 1):
+        rp, rs = work / f"round-{it:02d}_pts.csv", work / f"round-{it:02d}_sampled.csv"
+        _write_line_points(rp, p0, p1, new)
+        ensure_sampled(rs, mesh=mesh, src=src, pts=rp, skip=skip, args=args)
+
+        with rs.open() as fh:
+            raw = fh.readlines()
+        data = [ln for ln in raw if _is_data_line(ln)]
+        if len(data) != len(new):
+            sys.exit(f"[pyfr_plot] (adaptive) {rs}: {len(data)} rows for {len(new)} points")
+        header = header or [ln for ln in raw[:16] if not _is_data_line(ln)]
+        df = read_csv_any(rs)
+        cols = {c.replace('-', '_'): df[c].to_numpy() for c in df.columns}
+        try:
+            q = eval_exprs({"q": qexpr}, ChainMap(cols, env0))["q"]
+        except Exception as e:
+            sys.exit(f"[pyfr_plot] adaptive-quantity error → {e}")
+
+        ts, qs = np.concatenate([ts, new]), np.concatenate([qs, np.broadcast_to(q, new.shape)])
+        lines += data
+        order = np.argsort(ts, kind="stable")
+        ts, qs, lines = ts[order], qs[order], [lines[i] for i in order]
+
+        flags = _refine_indicator(ts, qs, tol)
+        cand = np.nonzero(flags)[0]
+        room = int(max_points) - len(ts)
+        print(f"[pyfr_plot] (adaptive) round {it}: {len(ts)} points, "
+              f"{len(cand)} interval(s) above tol {tol:g}", flush=True)
+        if it == max_iter or not len(cand) or room <= 0:
+            break
+        cand = cand[np.argsort(-flags[cand], kind="stable")][:room]
+        new = np.sort(0.5 * (ts[cand] + ts[cand + 1]))
+
+    _write_line_points(pts_path, p0, p1, ts)
+    tmp = csv_out.with_name(f".{csv_out.name}.{os.getpid()}.part")
+    with tmp.open("w") as fh:
+        fh.writelines(header)
+        fh.writelines(lines)
+    os.replace(tmp, csv_out)
+    _key_stamp(csv_out).unlink(missing_ok=True)     # not a single-sampler-call output
+    dt = float(np.diff(ts).min()) if len(ts) > 1 else 1.0
+    print(f"[pyfr_plot] (adaptive) {len(ts)} points; uniform spacing at the finest "
+          f"interval would need {int(round(1 / dt)) + 1} → {csv_out}")
+    return csv_out
+
+
+def _reduction(inherit) -> tuple[tuple[int, ...], str, str]:
     """
-    Under Slurm+PMI2, MPICH uses PMI_FD to talk to the PMI server.
-    That FD is close-on-exec by default, so subprocesses lose it unless
-    we explicitly pass it through exec() via pass_fds.
+    `reduce = z` (any of x/y/z), `reduce-op = mean|rms|min|max|median|pNN`,
+    `reduce-weights = trapz | <expression>`; the old `zmean = 1` is `reduce = z`.
     """
-    pmi = os.environ.get("PMI_FD", "")
-    if not pmi:
-        return ()
-
     try:
-        fd = int(pmi)
-    except ValueError:
-        print("[pyfr_plot] (mpi) PMI_FD is not an int; not passing to child", flush=True)
-        return ()
-
+        axes = parse_axes(inherit("reduce"))
+        op = inherit("reduce-op", "mean")
+        parse_op(op)
+    except ValueError as e:
+        sys.exit(f"[pyfr_plot] {e}")
+    if not axes and _as_bool(inherit("zmean")):
+        axes = (2,)
+    return axes, op, _clean_ascii(inherit("reduce-weights")).strip()
+
+
+def _reduce_weights(wspec: str, env, shape, axes) -> np.ndarray | None:
+    if not axes or not wspec:
+        return None
+    if wspec.lower() == "trapz":
+        try:
+            coords = {i: env[c] for i, c in enumerate("xyz") if i in axes}
+        except KeyError as e:
+            sys.exit(f"[pyfr_plot] reduce-weights = trapz needs the {e} column")
+        return axis_weights(coords, shape, axes)
     try:
-        os.set_inheritable(fd, True)
-    except OSError as e:
-        print(f"[pyfr_plot] (mpi) could not set PMI_FD inheritable: {e}", flush=True)
-        return ()
-
-    print("[pyfr_plot] (mpi) passing PMI_FD to child so MPICH can initialise", flush=True)
-    return (fd,)
-
-
-
-
-
-
+        return eval_exprs({"w": wspec}, env)["w"]
+    except Exception as e:
+        sys.exit(f"[pyfr_plot] reduce-weights expression error → {e}")
 
 
-# ----------------------------------------------------------------------------
-# Helper: run one post-processing section (line OR plane)
-# ----------------------------------------------------------------------------
 def _run_section(cfg: configparser.ConfigParser,
                  sec_name: str,
                  args: argparse.Namespace,
@@ -832,74 +499,41 @@ def _run_section(cfg: configparser.ConfigParser,
     sect = cfg[sec_name]
 
     # ------------------------------------------------------------------
-    # 0. Constants, geometry helpers, env0   (UNCHANGED CODE)
+    # 0. Constants, geometry helpers, env0   (evaluated once per INI)
     # ------------------------------------------------------------------
-    const_env: Dict[str, float] = {}
-    if "constants" in cfg:
-        for k, v in cfg["constants"].items():
-            v_clean = v.split(';', 1)[0].split('#', 1)[0].strip()
-            if not v_clean:
-                continue
-            val = float(eval(v_clean, {"__builtins__": {}}, const_env))
-            const_env[k] = val
-            const_env[k.replace('-', '_')] = val
-    env0 = {**const_env, **geometry_env(cfg)}
+    env0 = base_env(cfg)
 
     # ------------------------------------------------------------------
     # 1. Work out where to find / place:   pts-file   &   sampled-file
     # ------------------------------------------------------------------
-    
-    # ─── at the top of _run_section (replace current base = … line) ───
-    family = sec_name.split('-', 2)[1]              # "sampleline", "sampleplane", …
-    base_key = f"postprocess-{family}-base"
-    base = cfg[base_key] if base_key in cfg else {}
-    
+    family, base = _family_base(cfg, sec_name)
 
     if family == "paraview":
         return _run_paraview_family(cfg, sec_name, sect, base, env0, args, subcall=subcall)
+    if family == "spectra":
+        return _run_spectra_family(cfg, sec_name, sect, base, env0, args, subcall=subcall)
+    if family == "pod":
+        return _run_pod_family(cfg, sec_name, sect, base, env0, args, subcall=subcall)
 
-
-
-
-    pts_path = Path(sect.get("pts-file", base.get("pts-file", f"{sect.get('src-file','sample')}_pts.csv")))
-
-    if args.reuse is not None:
-        csv_out = Path(args.reuse or
-                       sect.get("sampled-file", base.get("sampled-file", "")) or
-                       f"{pts_path.stem.replace('_pts','')}_sampled.csv")
-    else:
-        csv_out = Path(sect.get("sampled-file", base.get("sampled-file", "")) or
-                       f"{pts_path.stem.replace('_pts','')}_sampled.csv")
+    pts_path, csv_out = _sample_paths(sect, base, args)
+    adaptive = family == "sampleline" and _is_adaptive(sect, base)
 
     # ------------------------------------------------------------------
-    # 2. Build points file once
+    # 2. Build points file once (adaptive lines build their own)
     # ------------------------------------------------------------------
-    if not pts_path.exists():
-        # grab whatever each block provides
-        lims     = sect.get("lims",     base.get("lims",     ""))
-        spacings = sect.get("spacings", base.get("spacings", ""))
-
-        # build only if we actually have both keys
-        if lims and spacings:
-            print(f"[pyfr_plot] Building points file {pts_path.name} …")
-            make_points_csv(pts_path, lims, spacings, env0)
-        else:
-            if subcall:
-                # base pass: silently skip — derived sections will supply lims
-                return
-            sys.exit("[pyfr_plot] Need 'lims' + 'spacings' (from this "
-                     "section *or* the base) to create the points file.")
-
-    def _get_src_path(sect, base):
-        for key in ("src-file", "src"):
-            if key in sect:
-                return Path(sect[key])
-            if key in base:
-                return Path(base[key])
-        raise SystemExit("[pyfr_plot] No src-file (PyFR solution) given")
+    with stage("points", sec_name):
+        have_pts = (bool(sect.get("lims", base.get("lims", ""))) if adaptive
+                    else _ensure_points(sect, base, pts_path, env0))
+    if not have_pts:
+        if subcall:
+            # base pass: silently skip — derived sections will supply lims
+            return
+        sys.exit("[pyfr_plot] Need 'lims' + 'spacings' (from this "
+                 "section *or* the base) to create the points file.")
 
     # …
-    src_path = _get_src_path(sect, base)
+    src_glob = sect.get("src-glob", base.get("src-glob", ""))
+    src_path = Path(src_glob) if src_glob else _src_path(sect, base)
 
 
     # ------------------------------------------------------------------
@@ -922,28 +556,37 @@ def _run_section(cfg: configparser.ConfigParser,
         print("\n".join(banner))
 
     # ------------------------------------------------------------------
-    # 3. Sample .pyfrs only if sampled CSV missing
+    # 3. Sample .pyfrs unless the sampled CSV matches its inputs
     # ------------------------------------------------------------------
 
 
-    mesh_path = Path(first_key(sect, "mesh",
-                               default=cfg.get("postprocess-mesh", "mesh-native", fallback="")))
-    if not csv_out.exists():
-        skip_val = args.skip if args.skip is not None else int(sect.get("skip", 1))
-        sampler_cmd = [
-            "pyfr", "sampler", "sample",
-            f"--skip={skip_val}",
-            f"--pts={pts_path}",
-            "-s,", str(mesh_path), str(src_path)
-        ]
-        print("[pyfr_plot] Running:", " ".join(sampler_cmd), flush=True)
-
-        pass_fds = _pass_slurm_pmi_fd_to_child()
-
-        with csv_out.open("w") as fh:
-            subprocess.run(sampler_cmd, check=True, stdout=fh, pass_fds=pass_fds)
-    else:
-        print(f"[pyfr_plot] Re-using sampled CSV → {csv_out}")
+    mesh_path = _mesh_path(cfg, sect)
+    skip_val = _skip_value(sect, args)
+    with stage("sample", sec_name):
+        if adaptive:
+            if src_glob:
+                sys.exit("[pyfr_plot] adaptive sampling needs a single src-file, not src-glob")
+            ad = lambda key, default: sect.get(f"adaptive-{key}", base.get(f"adaptive-{key}", default))
+            spacings = sect.get("spacings", base.get("spacings", ""))
+            p0, p1 = _parse_lims(sect.get("lims", base.get("lims", "")), env0)
+            adaptive_sample(csv_out, pts_path, p0=p0, p1=p1, env0=env0,
+                            qexpr=_clean_ascii(ad("quantity", sect.get("yexpr", base.get("yexpr", "")))),
+                            mesh=mesh_path, src=src_path, skip=skip_val, args=args,
+                            n0=int(ad("initial", 17)), tol=float(ad("tol", 0.01)),
+                            max_points=int(ad("max-points", int(np.prod(_parse_spacings(spacings)))
+                                                            if spacings else 1000)),
+                            max_iter=int(ad("max-iter", 8)))
+        elif src_glob:
+            snaps = [Path(p) for p in sorted(_glob.glob(src_glob))]
+            checkpoint = Path(sect.get("stats-file", base.get("stats-file", "")) or
+                              csv_out.with_suffix(".stats.npz"))
+            ensure_snapshot_stats(csv_out, mesh=mesh_path, snaps=snaps, pts=pts_path,
+                                  skip=skip_val, checkpoint=checkpoint,
+                                  workers=args.sampler_workers, executor=make_executor(args),
+                                  pairs=_parse_pairs(sect.get("stats-cov", base.get("stats-cov", ""))))
+        else:
+            ensure_sampled(csv_out, mesh=mesh_path, src=src_path, pts=pts_path,
+                           skip=skip_val, args=args)
 
     # ------------------------------------------------------------------
     # 4. Replace src_path by the sampled CSV & proceed with the *old*
@@ -954,9 +597,14 @@ def _run_section(cfg: configparser.ConfigParser,
     # ------------------------------------------------------------------
     # 5.  Load CSV, evaluate expressions, make the plot  (restored)
     # ------------------------------------------------------------------
-    df = read_csv_any(src_path)
-    env = {**{c.replace('-', '_'): df[c].values for c in df.columns}, **env0}
-    env["u_min"] = float(env["avg_u"].min())
+    with stage("load", sec_name):
+        cols = load_sampled_columns(src_path, use_cache=not args.no_col_cache,
+                                    max_memory=args.max_memory)
+    if isinstance(cols, ColumnTable):
+        cols.derive("u_min", lambda t: float(np.min(t["avg_u"])))
+    elif "avg_u" in cols:
+        cols["u_min"] = float(cols["avg_u"].min())
+    env = ChainMap({}, env0, cols)
 
     # helper so we stop repeating ourselves
     inherit = lambda key, default="": sect.get(key, base.get(key, default))
@@ -968,23 +616,69 @@ def _run_section(cfg: configparser.ConfigParser,
     zexpr     = _clean_ascii(inherit("zexpr"))
     stdexpr   = _clean_ascii(inherit("stdexpr")) or None
 
-    # --- optional span-wise averaging -----------------------------------
-    want_zmean = bool(sect.get("zmean", base.get("zmean", "")))
-
 
     # nothing to plot → stop early
     if not (xexpr and yexpr) and not zexpr:
         print("[pyfr_plot] Section has no expressions – nothing to plot.")
         return
 
+    # --- optional reduction over grid axes (span-wise mean, rms, …) -----
+    nrows = cols.nrows if isinstance(cols, ColumnTable) else len(next(iter(cols.values())))
+    axes, op, wspec, shape = (), "mean", "", None
+    if zexpr or inherit("reduce") or _as_bool(inherit("zmean")):
+        shape = infer_nx_ny_nz(nrows, spacings)
+        axes, op, wspec = _reduction(inherit)
+    if zexpr:
+        # the plane: grid axes with more than one point (or the unreduced
+        # ones of a 3-D block); everything else is size 1 after reduction
+        plane = [i for i in range(3) if shape[i] > 1]
+        if len(plane) == 3:
+            plane = [i for i in range(3) if i not in axes]
+        if len(plane) != 2:
+            sys.exit(f"[pyfr_plot] spacings {list(shape)} with reduce over "
+                     f"{''.join('xyz'[i] for i in axes) or 'nothing'} is not a plane")
+    elif axes and sum(n > 1 for i, n in enumerate(shape) if i not in axes) > 1:
+        sys.exit(f"[pyfr_plot] spacings {list(shape)}: reduce over "
+                 f"{''.join('xyz'[i] for i in axes)} leaves more than one axis")
+
+    # a plane whose grid is already known only needs its field evaluated
+    geom, geom_key, pixels = None, "", None
+    if zexpr and not args.no_plot:
+        pixels = _parse_pixels(inherit("plot-resolution", "auto"))
+        try:
+            geom_key = plane_geometry_key(pts_path, src_path, xexpr, yexpr, env,
+                                          shape=shape, axes=axes, op=op, wspec=wspec,
+                                          pixels=pixels)
+        except Exception:
+            geom_key = ""                         # bad x/y: reported by the evaluation below
+        geom = lookup_geometry(pts_path, geom_key) if geom_key else None
+        if geom is not None:
+            print(f"[pyfr_plot] plane geometry reused ({geom.x.shape[0]}×{geom.x.shape[1]})")
+
+    exprs = {"x": "" if geom else xexpr, "y": "" if geom else yexpr, "z": zexpr, "std": stdexpr}
+    vals = None
     try:
-        x   = np.asarray(eval_expr(xexpr, env), dtype=float) if xexpr else None
-        y   = np.asarray(eval_expr(yexpr, env), dtype=float) if yexpr else None
-        z   = np.asarray(eval_expr(zexpr, env), dtype=float) if zexpr else None
-        std = np.asarray(eval_expr(stdexpr, env), dtype=float) if stdexpr else None
+        if args.max_memory and isinstance(cols, ColumnTable):
+            with stage("stream", sec_name):
+                vals = eval_reduce_streamed(exprs, env, shape or (nrows, 1, 1), axes, op,
+                                            wspec=wspec, budget=args.max_memory)
+        elif args.max_memory:
+            print("[pyfr_plot] (warn) --max-memory needs the .cols/ sidecar; "
+                  "evaluating in memory")
+        streamed = vals is not None
+        if not streamed:
+            with stage("eval", sec_name):
+                vals = eval_exprs(exprs, env)
     except Exception as e:
         sys.exit(f"[pyfr_plot] Expression error → {e}")
-
+    if axes and not streamed:
+        weights = _reduce_weights(wspec, env, shape, axes)
+        with stage("reduce", sec_name):
+            try:
+                vals = reduce_outputs(vals, shape, axes, op, weights)
+            except ValueError as e:
+                sys.exit(f"[pyfr_plot] reduce-weights: {e}")
+    x, y, z, std = vals["x"], vals["y"], vals["z"], vals["std"]
     outfile = Path(first_key(sect, "file", "output",
                              default=f"{sec_name}.png"))
     outfile.parent.mkdir(parents=True, exist_ok=True)
@@ -1000,29 +694,36 @@ def _run_section(cfg: configparser.ConfigParser,
 
 
     if zexpr:                                         # 2-D contour
-        nx, ny, nz = infer_nx_ny_nz(len(x), spacings)
-        x2d, y2d, z2d = (a.reshape(ny, nz) for a in (x, y, z))
-
-        if want_zmean:                               # collapse z once, reuse
-            y2d = y2d.mean(1, keepdims=True)
-            z2d = z2d.mean(1, keepdims=True)
-            x2d = x2d[:, :1]
-
-        title = build_title(cfg, sect, base, sec_name, want_zmean, is_plane=True)
-        plot_plane(x2d, y2d, z2d, outfile, xlabel=xlb, ylabel=ylb, zlabel=zlb, title=title)
+        flat = [i for i in range(3) if i not in plane][0]
+        red_shape = tuple(1 if i in axes else n for i, n in enumerate(shape))
+        z2d = np.squeeze(z.reshape(red_shape), axis=flat)
+
+        title = build_title(cfg, sect, base, sec_name, bool(axes), is_plane=True)
+        if args.no_plot:
+            print(f"[pyfr_plot] --no-plot: skipped {outfile}")
+            return
+        with stage("lod", sec_name):
+            if geom is None:
+                x2d, y2d = (np.squeeze(a.reshape(red_shape), axis=flat) for a in (x, y))
+                geom = plane_geometry(x2d, y2d, pixels)
+                if geom_key:
+                    store_geometry(pts_path, geom_key, geom)
+            x2d, y2d, z2d = plane_lod(None, None, z2d, pixels, geom=geom)   # ship the reduced field only
+        render(args, sec_name, plot_plane,
+               x2d, y2d, z2d, outfile, xlabel=xlb, ylabel=ylb, zlabel=zlb, title=title,
+               levels=_parse_levels(inherit("levels")),
+               cmap=inherit("cmap", "turbo"), pixels=pixels)
 
     else:                                             # 1-D profile
-        if want_zmean:
-            nx, ny, nz = infer_nx_ny_nz(len(x), spacings)
-            x = spanwise_mean(x, nx, ny, nz)
-            y = spanwise_mean(y, nx, ny, nz)
-            if std is not None:
-                std = std.reshape(nx if ny == 1 else ny, nz)
-                std = np.sqrt((std**2).sum(1)) / nz   # √Σσ² / nz
+        x, y = np.ravel(x), np.ravel(y)
+        std = None if std is None else np.ravel(std)
 
-        refs = load_reference_csvs_with_notes(sect.get('reference', ''))
+        with stage("refs", sec_name):
+            refs = [] if args.no_plot else (
+                load_reference_csvs_with_notes(sect.get('reference', ''))
+                + load_reference_query(inherit("reference-query")))
 
-        title = build_title(cfg, sect, base, sec_name, want_zmean, is_plane=False)
+        title = build_title(cfg, sect, base, sec_name, bool(axes), is_plane=False)
 
 
         # ------------------------------------------------------------------
@@ -1037,21 +738,33 @@ def _run_section(cfg: configparser.ConfigParser,
         )
 
         # Safety: ensure x is unique & sorted exactly as plotted
-        x1, y1, s1 = _sort_dedupe_1d(x, y, std)
-
-        df_csv = pd.DataFrame({
-            "x": x1,
-            "y": y1,
-            **({"std": s1} if s1 is not None else {})
-        })
-
-        csv_out.parent.mkdir(parents=True, exist_ok=True)
-        df_csv.to_csv(csv_out, index=False)
+        with stage("sort_dedupe", sec_name):
+            x1, y1, s1 = _sort_dedupe_1d(x, y, std)
+
+        if _as_bool(inherit("csv-decimate")):
+            with stage("decimate", sec_name):
+                x1, y1, s1 = _decimate_csv_curve(x1, y1, s1, tol=inherit("csv-tol"),
+                                                 rtol=inherit("csv-rtol", "1e-3"),
+                                                 max_points=inherit("csv-max-points"))
+
+        with stage("write_csv", sec_name):
+            df_csv = _pd().DataFrame({
+                "x": x1,
+                "y": y1,
+                **({"std": s1} if s1 is not None else {})
+            })
+
+            csv_out.parent.mkdir(parents=True, exist_ok=True)
+            df_csv.to_csv(csv_out, index=False,
+                          chunksize=(max(1 << 12, args.max_memory // STREAM_ROW_BYTES)
+                                     if args.max_memory else None))
 
         print(f"[pyfr_plot] Wrote plot-aligned CSV → {csv_out}")
 
+        if args.no_plot:
+            return
 
-        plot_line(
+        render(args, sec_name, plot_line,
             x, y, std, refs, outfile,
             xlabel=xlb, ylabel=ylb, title=title,
             show_legend=not args.no_legend,
@@ -1062,5 +775,6 @@ def _run_section(cfg: configparser.ConfigParser,
     if subcall:
         return  # silent exit when this is the preliminary base run
 
+
 if __name__ == "__main__":
     main()
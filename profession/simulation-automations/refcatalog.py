@@ -0,0 +1,219 @@
+# ───────────────────────── refcatalog.py ─────────────────────────
+"""
+Indexed, pre-parsed catalog of the `references/` tree – imported by the main script.
+
+Every reference CSV is parsed once into `<root>/.catalog/`:
+
+* `index.json`  – one entry per file: path (relative to the root), size,
+                  mtime_ns, case / plane / quantity / label, the first
+                  comment line (note), column names and the slice of …
+* `values.f8`   – … one flat float64 file holding every table row-major.
+
+Metadata comes from the path, `<case>/<plane…>/<quantity>/<label>.csv`:
+`c3900/plane_x1p54/u/Parnandeau.csv` → case `c3900`, plane `plane_x1p54`,
+quantity `u`, label `Parnandeau`.  Files directly under the case get an
+empty plane/quantity; deeper trees join the middle levels into the plane
+(`sd7003/wall/C_p/upper/Beck-k7.csv` → plane `wall/C_p`, quantity `upper`).
+
+`refresh()` stats the tree and re-parses only new or changed files.
+"""
+
+from __future__ import annotations
+import fcntl
+import fnmatch
+import json
+import os
+import shlex
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+VERSION = 1
+FIELDS = ("case", "plane", "quantity", "label", "path")
+
+
+def default_root() -> Path:
+    """`$PYFR_PLOT_REFS`, else the `references/` directory next to this module."""
+    env = os.environ.get("PYFR_PLOT_REFS")
+    return Path(env) if env else Path(__file__).resolve().parent / "references"
+
+
+def path_meta(rel: Path) -> dict[str, str]:
+    parts = rel.parts
+    mid = parts[1:-1]
+    if len(mid) >= 2:
+        plane, quantity = "/".join(mid[:-1]), mid[-1]
+    else:
+        plane, quantity = "/".join(mid), ""
+    return {"case": parts[0] if len(parts) > 1 else "", "plane": plane,
+            "quantity": quantity, "label": rel.stem, "path": rel.as_posix()}
+
+
+def first_note(path: Path) -> str:
+    """First top comment line (`# …`) before the header, else ''."""
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            return s.lstrip("#").strip() if s.startswith("#") else ""
+    return ""
+
+
+class RefCatalog:
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root or default_root()).resolve()
+        self.dir = self.root / ".catalog"
+        self.entries: dict[str, dict] = {}         # rel path → entry
+        self.values: np.ndarray = np.empty(0)
+
+    # ---------- persistence ------------------------------------------------
+    def _load(self) -> bool:
+        try:
+            idx = json.loads((self.dir / "index.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return False
+        if idx.get("version") != VERSION:
+            return False
+        self.entries = {e["path"]: e for e in idx["entries"]}
+        vpath = self.dir / "values.f8"
+        self.values = (np.memmap(vpath, dtype="<f8", mode="r")
+                       if vpath.exists() and vpath.stat().st_size else np.empty(0))
+        return True
+
+    def _save(self, entries: list[dict], blocks: list[np.ndarray]):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        pid = os.getpid()
+        tmp_v = self.dir / f".values.{pid}.part"
+        off = 0
+        with tmp_v.open("wb") as fh:
+            for e, blk in zip(entries, blocks):
+                e["offset"] = off
+                fh.write(np.ascontiguousarray(blk, dtype="<f8").tobytes())
+                off += blk.size
+        tmp_i = self.dir / f".index.{pid}.part"
+        tmp_i.write_text(json.dumps({"version": VERSION, "entries": entries}, indent=0))
+        os.replace(tmp_v, self.dir / "values.f8")
+        os.replace(tmp_i, self.dir / "index.json")
+
+    def _block(self, e: dict) -> np.ndarray:
+        n = e["nrows"] * len(e["columns"])
+        return np.asarray(self.values[e["offset"]:e["offset"] + n]).reshape(e["nrows"], -1)
+
+    # ---------- incremental rebuild ---------------------------------------
+    def refresh(self, parse: Callable[[Path], "object"]) -> "RefCatalog":
+        """Bring the catalog in line with the tree; *parse* reads one CSV → DataFrame."""
+        if not self.root.is_dir():
+            return self
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / "lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)      # one rebuilder across pool workers
+            self._load()
+
+            seen: dict[str, os.stat_result] = {}
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if not d.startswith((".", "__"))]
+                for fn in filenames:
+                    if fn.lower().endswith(".csv"):
+                        p = Path(dirpath) / fn
+                        seen[p.relative_to(self.root).as_posix()] = p.stat()
+
+            keep, changed = [], []
+            for rel, st in sorted(seen.items()):
+                e = self.entries.get(rel)
+                if e and e["size"] == st.st_size and e["mtime_ns"] == st.st_mtime_ns:
+                    keep.append(e)
+                else:
+                    changed.append((rel, st))
+            if not changed and len(keep) == len(self.entries):
+                return self
+
+            entries, blocks = [], []
+            for e in keep:
+                entries.append(e)
+                blocks.append(np.empty(0) if e.get("skip") else self._block(e))
+            for rel, st in changed:
+                p = self.root / rel
+                e = {**path_meta(Path(rel)), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                try:
+                    df = parse(p)
+                    arr = df.to_numpy(dtype=float)
+                except (ValueError, TypeError, OSError) as err:
+                    # bibliographies, malformed files: remembered, never plotted
+                    e.update(skip=f"{type(err).__name__}: {err}", columns=[], nrows=0, note="")
+                    arr = np.empty(0)
+                else:
+                    e.update(columns=[str(c) for c in df.columns], nrows=len(df),
+                             note=first_note(p))
+                entries.append(e)
+                blocks.append(arr)
+
+            order = sorted(range(len(entries)), key=lambda i: entries[i]["path"])
+            self._save([entries[i] for i in order], [blocks[i] for i in order])
+            self._load()
+            print(f"[refcat] indexed {len(changed)} changed file(s), "
+                  f"{len(self.entries)} total → {self.dir}")
+        return self
+
+    # ---------- lookup ----------------------------------------------------
+    def contains(self, path: str | Path) -> bool:
+        """True if *path* (a file or a glob) lies inside the catalogued tree."""
+        try:
+            Path(os.path.realpath(path)).relative_to(self.root)
+            return True
+        except ValueError:
+            return False
+
+    def glob(self, pattern: str) -> list[str]:
+        """Catalog paths matching a filesystem glob that lies inside the root."""
+        rel_pat = Path(os.path.realpath(pattern)).relative_to(self.root).as_posix()
+        depth = None if "**" in rel_pat else rel_pat.count("/")
+        return sorted(r for r, e in self.entries.items()
+                      if not e.get("skip") and (depth is None or r.count("/") == depth)
+                      and fnmatch.fnmatchcase(r, rel_pat))
+
+    def query(self, spec: str) -> list[str]:
+        """
+        `case=c3900 plane=plane_x1p54 quantity=u` (values may be globs);
+        several queries separated by `;` are OR-ed.
+        """
+        out: list[str] = []
+        for part in str(spec).split(";"):
+            terms = {}
+            for tok in shlex.split(part.replace(",", " ")):
+                k, _, v = tok.partition("=")
+                if k not in FIELDS:
+                    raise ValueError(f"unknown reference-query field '{k}' "
+                                     f"(use {', '.join(FIELDS)})")
+                terms[k] = v
+            if not terms:
+                continue
+            for r, e in self.entries.items():
+                if e.get("skip") or r in out:
+                    continue
+                if all(fnmatch.fnmatchcase(e[k], v) for k, v in terms.items()):
+                    out.append(r)
+        return sorted(out)
+
+    def entry(self, rel: str) -> dict | None:
+        return self.entries.get(rel)
+
+    def table(self, rel: str) -> tuple[list[str], np.ndarray]:
+        e = self.entries[rel]
+        return e["columns"], self._block(e)
+
+
+_CATALOGS: dict[Path, RefCatalog | None] = {}
+
+
+def catalog(parse: Callable[[Path], "object"], root: Path | None = None) -> RefCatalog | None:
+    """Refreshed catalog for *root*, once per process."""
+    root = Path(root or default_root()).resolve()
+    if root not in _CATALOGS:
+        try:
+            _CATALOGS[root] = RefCatalog(root).refresh(parse)
+        except OSError as e:                      # read-only tree: parse as before
+            print(f"[refcat] (warn) catalog unavailable ({e}); parsing CSVs directly")
+            _CATALOGS[root] = None
+    return _CATALOGS[root]
@@ -0,0 +1,197 @@
+# ───────────────────────── samplecache.py ─────────────────────────
+"""Content-addressed store for `pyfr sampler sample` outputs – imported by the main script."""
+
+from __future__ import annotations
+import functools
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import time
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 20 * 1024**3
+
+
+def default_cache_dir() -> Path:
+    """`$PYFR_PLOT_CACHE`, else `$XDG_CACHE_HOME/pyfr_plot`, else `~/.cache/pyfr_plot`."""
+    if os.environ.get("PYFR_PLOT_CACHE"):
+        return Path(os.environ["PYFR_PLOT_CACHE"])
+    xdg = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg) / "pyfr_plot"
+
+
+def parse_bytes(txt: str | int) -> int:
+    """Parse `500M`, `20G`, `1.5T` or a plain byte count."""
+    s = str(txt).strip().upper().rstrip("B")
+    mult = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    if s and s[-1] in mult:
+        return int(float(s[:-1]) * mult[s[-1]])
+    return int(float(s))
+
+
+# ---------- key ingredients --------------------------------------------------
+def file_identity(path: Path) -> str:
+    """
+    Cheap identity for big inputs (meshes, solutions): resolved path, size and
+    mtime.  Re-writing a `.pyfrs` in place therefore invalidates its entries.
+    """
+    p = Path(path)
+    try:
+        st = p.stat()
+    except (FileNotFoundError, OSError):
+        return f"missing:{p}"
+    return f"{p.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def content_digest(path: Path, bufsize: int = 1 << 20) -> str:
+    """SHA-256 of the file contents (points files are small enough to hash)."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(bufsize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def pyfr_version(exe: str = "pyfr") -> str:
+    """`pyfr --version` of the executable that will run the sampler."""
+    try:
+        out = subprocess.run([exe, "--version"], capture_output=True, text=True,
+                             timeout=120, check=True)
+        return (out.stdout or out.stderr).strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def sampler_key(*, mesh: Path, soln: Path, pts: Path, skip: int,
+                version: str | None = None) -> tuple[str, dict]:
+    """Return *(hex key, description)* for one sampler invocation."""
+    desc = {
+        "mesh": file_identity(mesh),
+        "soln": file_identity(soln),
+        "pts": content_digest(pts),
+        "skip": int(skip),
+        "pyfr": version if version is not None else pyfr_version(),
+    }
+    blob = json.dumps(desc, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest(), desc
+
+
+# ---------- the store --------------------------------------------------------
+_FICLONE = 0x40049409                       # linux/fs.h: share extents, copy on write
+
+
+def _clone(src: Path, dst: Path):
+    """Reflink *src* to *dst* where the filesystem allows it, else copy the bytes."""
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        try:
+            import fcntl
+            fcntl.ioctl(fo.fileno(), _FICLONE, fi.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+    shutil.copyfile(src, dst)
+
+
+class SamplerCache:
+    """
+    Flat directory of `<key[:2]>/<key>.csv` entries.  The mtime of the
+    `<key>.used` marker is an entry's last use; `evict()` drops the least
+    recently used entries until the total size fits in *max_bytes*.  Writers
+    go through a temp file + `os.replace`, so concurrent sections never see
+    half-written entries.
+
+    Entries are read-only and handed out as private copies (a reflink where
+    the filesystem supports it): scripts such as `append_sqrt.py` rewrite
+    the sampled CSV in place, which through a hard link would corrupt the
+    entry for every later case with the same key.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.csv"
+
+    def lookup(self, key: str) -> Path | None:
+        p = self.path(key)
+        if not p.exists():
+            return None
+        p.with_suffix(".used").touch()      # mark as most recently used
+        return p
+
+    def store(self, key: str, src: Path, desc: dict | None = None) -> Path:
+        """Move *src* into the cache under *key* and return the entry path."""
+        dst = self.path(key)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(src, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(src, dst)
+        if desc is not None:
+            dst.with_suffix(".json").write_text(json.dumps(desc, indent=1, sort_keys=True))
+        dst.with_suffix(".used").touch()
+        self.evict(keep=key)
+        return dst
+
+    def materialize(self, key: str, dest: Path):
+        """Place a writable copy of entry *key* at *dest* (reflink when possible)."""
+        src = self.path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        try:
+            _clone(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def entries(self) -> list[tuple[float, int, Path, int]]:
+        """(last use, size, path, link count) per entry, least recently used first."""
+        out = []
+        for p in self.root.glob("??/*.csv"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue                    # evicted by a concurrent worker
+            try:
+                used = p.with_suffix(".used").stat().st_mtime
+            except FileNotFoundError:
+                used = st.st_mtime
+            out.append((used, st.st_size, p, st.st_nlink))
+        return sorted(out)
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Drop LRU entries past the byte budget; return the bytes freed.  An
+        entry still hard-linked into a run directory (as entries were handed
+        out before they were copied) shares its blocks with that file:
+        removing it would free nothing, so it is neither counted against
+        the budget nor evicted for it.
+        """
+        ents = [(sz, p) for _, sz, p, links in self.entries() if links == 1]
+        total = sum(sz for sz, _ in ents)
+        freed = 0
+        for sz, p in ents:
+            if total <= self.max_bytes:
+                break
+            if keep and p.stem == keep:
+                continue
+            for q in (p, p.with_suffix(".json"), p.with_suffix(".used")):
+                try:
+                    q.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= sz
+            freed += sz
+        if freed:
+            print(f"[cache] evicted {freed / 1024**2:.1f} MiB "
+                  f"(now {total / 1024**2:.1f} / {self.max_bytes / 1024**2:.1f} MiB)")
+        return freed
+
+    def temp_path(self, key: str) -> Path:
+        tmp = self.root / "tmp" / f"{key}.{os.getpid()}.{time.monotonic_ns()}.csv"
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        return tmp
@@ -0,0 +1,462 @@
+# ───────────────────────── sampling.py ─────────────────────────
+"""
+Points files and the sampler stage – imported by the main script.
+
+Grid points are written block by block; `ensure_sampled` puts the
+`pyfr sampler sample` output for (mesh, src, pts, skip) in place through
+the content-addressed cache, and `ensure_snapshot_stats` folds `src-glob`
+snapshots into running moments.  `_sample_paths` … `_skip_value` resolve
+a section's inputs the same way for the section and batch drivers.
+"""
+
+from __future__ import annotations
+import ast
+import configparser
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+
+from executors import LocalExecutor, make_executor
+from locindex import LocationIndex
+from samplecache import (SamplerCache, content_digest, default_cache_dir, file_identity,
+                         parse_bytes, sampler_key)
+from sectionio import _as_bool, _pd, _split_tokens, first_key, read_csv_any
+from snapstats import COORD_COLS, RunningStats
+from stagetrace import stage
+
+
+# ---------- points files -----------------------------------------------------
+def infer_nx_ny_nz(arr_len: int, spacings: str) -> tuple[int,int]:
+    """
+    Work out ny,nz from array length and the user’s [nx,ny,nz] list,
+    allowing nx or nz to be 1 (line-like extraction).
+    """
+    nx, ny, nz = (int(ast.literal_eval(s.strip()))
+                  for s in spacings.strip("[]").split(','))
+
+    if arr_len == nx * ny * nz:
+        return nx, ny, nz
+
+
+    raise ValueError("Cannot deduce ny,nz – check spacings vs sampled size.")
+
+
+POINTS_CHUNK = 1 << 18          # points generated / written per block
+
+
+def _parse_lims(lims: str, env: Dict[str, float]):
+    """`[(x0, y0, z0), (x1, y1, z1)]` → two 3-tuples (entries may use constants)."""
+    def _vec(txt: str):
+        txt = txt.strip().lstrip("[(").rstrip(")] ")
+        comps = [c.strip() for c in txt.split(',')]
+        return tuple(float(eval(c, {"__builtins__": {}}, env)) for c in comps)
+
+    p0_txt, p1_txt = lims.strip("[]").split("),")
+    return _vec(p0_txt + ")"), _vec(p1_txt)
+
+
+def _parse_spacings(spacings: str) -> tuple[int, int, int]:
+    nx, ny, nz = (int(ast.literal_eval(s.strip())) for s in spacings.strip("[]").split(','))
+    return nx, ny, nz
+
+
+def iter_grid_points(p0, p1, shape, chunk: int = POINTS_CHUNK):
+    """
+    Yield (k, 3) blocks of the Cartesian grid between *p0* and *p1*, in the
+    same x-outer / z-inner order as the old triple comprehension.  Memory is
+    O(chunk) whatever the grid size.
+    """
+    def lin(a, b, n):
+        return np.linspace(a, b, n) if n > 1 else np.array([a], dtype=float)
+
+    axes = [lin(a, b, n) for a, b, n in zip(p0, p1, shape)]
+    npts = int(np.prod(shape))
+    for start in range(0, npts, chunk):
+        idx = np.unravel_index(np.arange(start, min(start + chunk, npts)), shape)
+        yield np.stack([ax[i] for ax, i in zip(axes, idx)], axis=1)
+
+
+def make_points_csv(pts_path: Path, lims: str, spacings: str, env: Dict[str, float],
+                    *, binary: bool = False, chunk: int = POINTS_CHUNK):
+    """
+    Generate Cartesian grid points and save to *pts_path* block by block.
+    With *binary*, also write `<pts>.npy` (float64, shape (N, 3)) alongside.
+    """
+    p0, p1 = _parse_lims(lims, env)
+    shape = _parse_spacings(spacings)
+    npts = int(np.prod(shape))
+
+    pts_path.parent.mkdir(parents=True, exist_ok=True)
+    npy = (np.lib.format.open_memmap(pts_path.with_suffix(".npy"), mode="w+",
+                                     dtype=np.float64, shape=(npts, 3))
+           if binary else None)
+
+    row = "%.18e,%.18e,%.18e\n"      # byte-identical to np.savetxt defaults
+    off = 0
+    with pts_path.open("w") as fh:
+        fh.write("x,y,z\n")
+        for blk in iter_grid_points(p0, p1, shape, chunk):
+            fh.write((row * len(blk)) % tuple(blk.ravel().tolist()))
+            if npy is not None:
+                npy[off:off + len(blk)] = blk
+            off += len(blk)
+
+    if npy is not None:
+        npy.flush()
+        del npy
+
+
+# ---------- sampler stage: content-addressed cache around `pyfr sampler sample` 
+SHARD_MIN_POINTS = 200_000      # below this a single sampler run is cheaper
+
+
+_LOCATOR: LocationIndex | None = None
+
+
+def configure_locator(cfg: configparser.ConfigParser, args) -> LocationIndex | None:
+    """
+    `--locate-index`: `[postprocess-sampler]` locate / interp templates → the
+    process-wide index.  Without the flag the plain sampler is always used.
+    """
+    global _LOCATOR
+    _LOCATOR = None
+    if not getattr(args, "locate_index", False):
+        return None
+    sect = cfg["postprocess-sampler"] if "postprocess-sampler" in cfg else {}
+    locate, interp = sect.get("locate", ""), sect.get("interp", "")
+    if not (locate and interp):
+        sys.exit("[pyfr_plot] --locate-index needs a [postprocess-sampler] section with both "
+                 "`locate` and `interp` command templates (see locindex.py)")
+    root = Path(getattr(args, "cache_dir", None) or default_cache_dir()) / "locate"
+    try:
+        _LOCATOR = LocationIndex(root, locate, interp, suffix=sect.get("index-suffix", ".idx"))
+    except ValueError as e:
+        sys.exit(f"[pyfr_plot] {e}")
+    return _LOCATOR
+
+
+def _plain_sampler_cmd(*, mesh: Path, src: Path, pts: Path, skip: int) -> list[str]:
+    return [
+        "pyfr", "sampler", "sample",
+        f"--skip={skip}",
+        f"--pts={pts}",
+        "-s,", str(mesh), str(src)
+    ]
+
+
+def _sampler_cmd(*, mesh: Path, src: Path, pts: Path, skip: int) -> list[str]:
+    """Interpolation from the location index when configured, else the full sampler."""
+    if _LOCATOR is not None:
+        with stage("locate", Path(pts).name):
+            cmd = _LOCATOR.command(mesh=mesh, src=src, pts=pts, skip=skip)
+        if cmd is not None:
+            return cmd
+    return _plain_sampler_cmd(mesh=mesh, src=src, pts=pts, skip=skip)
+
+
+def run_sampler(out: Path, *, mesh: Path, src: Path, pts: Path, skip: int,
+                workers: int = 1, executor: LocalExecutor | None = None):
+    """
+    Run `pyfr sampler sample` into *out* atomically (temp file + rename).
+    With *workers* > 1 and a large points file the points are sharded and the
+    shards sampled concurrently (see `_run_sampler_sharded`).
+    """
+    executor = executor or LocalExecutor(workers)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.part")
+    try:
+        with stage("sampler", out.name, src=str(src)):
+            npts = _count_points(pts) if workers > 1 else 0
+            if npts >= max(SHARD_MIN_POINTS, 2 * workers):
+                _run_sampler_sharded(tmp, mesh=mesh, src=src, pts=pts, skip=skip,
+                                     nshards=workers, npts=npts, executor=executor)
+            else:
+                cmd = _sampler_cmd(mesh=mesh, src=src, pts=pts, skip=skip)
+                plain = _plain_sampler_cmd(mesh=mesh, src=src, pts=pts, skip=skip)
+                try:
+                    executor.run_one(cmd, tmp)
+                except subprocess.CalledProcessError:
+                    if cmd == plain:
+                        raise
+                    print("[pyfr_plot] (warn) interpolation from the location index "
+                          "failed; sampling from scratch", flush=True)
+                    executor.run_one(plain, tmp)
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _count_points(pts: Path) -> int:
+    """Data rows in a points CSV (header and comment lines excluded)."""
+    with Path(pts).open("rb") as fh:
+        return sum(1 for line in fh if line[:1] and line[:1] in b"0123456789+-.")
+
+
+def _is_data_line(line: str) -> bool:
+    return bool(line) and line[0] in "0123456789+-."
+
+
+def _run_sampler_sharded(out: Path, *, mesh: Path, src: Path, pts: Path, skip: int,
+                         nshards: int, npts: int, executor: LocalExecutor):
+    """
+    Split *pts* into *nshards* contiguous row ranges, sample them concurrently
+    and concatenate the outputs, which restores the original point order.
+
+    The shards run as independent processes (or job steps), so PMI_*
+    variables are dropped: handing one Slurm PMI_FD to several MPICH children
+    would make them fight over the same connection.
+    """
+    work = out.with_name(f"{out.name}.shards")
+    work.mkdir(parents=True, exist_ok=True)
+    per = -(-npts // nshards)
+
+    # --- split (streamed, one pass) ---
+    shard_pts = [work / f"pts-{k:04d}.csv" for k in range(nshards)]
+    with Path(pts).open() as fin:
+        header, i = [], 0
+        fouts = [p.open("w") for p in shard_pts]
+        try:
+            for line in fin:
+                if not _is_data_line(line):
+                    if i == 0:
+                        header.append(line)        # column names, comments
+                    continue
+                if i == 0:
+                    for fh in fouts:
+                        fh.writelines(header)
+                fouts[min(i // per, nshards - 1)].write(line)
+                i += 1
+        finally:
+            for fh in fouts:
+                fh.close()
+
+    # --- sample concurrently ---
+    shard_out = [work / f"out-{k:04d}.csv" for k in range(nshards)]
+    print(f"[pyfr_plot] Sharded sampler: {npts} points → {nshards} × ≤{per}", flush=True)
+    if executor.slots < nshards and executor.kind == "local":
+        executor = LocalExecutor(nshards)
+    executor.run_all([(_sampler_cmd(mesh=mesh, src=src, pts=sp, skip=skip), so)
+                      for sp, so in zip(shard_pts, shard_out)], label="shard")
+
+    # --- merge: header once, then the data of every shard in order ---
+    with out.open("w") as fout:
+        for k, so in enumerate(shard_out):
+            with so.open() as fin:
+                for line in fin:
+                    if k == 0 or _is_data_line(line):
+                        fout.write(line)
+
+    for p in shard_pts + shard_out:
+        p.unlink(missing_ok=True)
+    work.rmdir()
+
+
+def merge_points(pts_files: Sequence[Path], out: Path) -> list[np.ndarray]:
+    """
+    Write the de-duplicated union of *pts_files* to *out*; return, per input
+    file, the row of *out* that each of its points maps to.
+    """
+    # round-trip parse: the merged points must be bit-identical to the originals
+    blocks = [_pd().read_csv(p, comment="#", float_precision="round_trip")
+              .to_numpy(dtype=float)[:, :3] for p in pts_files]
+    allpts = np.concatenate(blocks)
+    uniq, inv = np.unique(allpts, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    row = "%.18e,%.18e,%.18e\n"
+    with out.open("w") as fh:
+        fh.write("x,y,z\n")
+        for lo in range(0, len(uniq), POINTS_CHUNK):
+            blk = uniq[lo:lo + POINTS_CHUNK]
+            fh.write((row * len(blk)) % tuple(blk.ravel().tolist()))
+    print(f"[pyfr_plot] Coalesced {len(pts_files)} points files: {len(allpts)} points "
+          f"→ {len(uniq)} unique in one sampler pass", flush=True)
+    return np.split(inv, np.cumsum([len(b) for b in blocks])[:-1])
+
+
+def split_sampled(merged: Path, inverse: Sequence[np.ndarray], outs: Sequence[Path]):
+    """Write each job's sampled CSV from the merged output, lines copied verbatim."""
+    with merged.open() as fh:
+        lines = fh.readlines()
+    header = [ln for ln in lines[:16] if not _is_data_line(ln)]
+    data = [ln for ln in lines if _is_data_line(ln)]
+    expect = max((int(inv.max()) + 1 for inv in inverse if len(inv)), default=0)
+    if len(data) != expect:         # check first: no job gets a shifted CSV
+        raise ValueError(f"{merged}: {len(data)} sampled rows for {expect} merged points")
+    for inv, out in zip(inverse, outs):
+        with out.open("w") as fh:
+            fh.writelines(header)
+            fh.writelines(data[i] for i in inv)
+
+
+def _sampler_cache(args) -> SamplerCache | None:
+    if getattr(args, "no_cache", False):
+        return None
+    root = Path(getattr(args, "cache_dir", None) or default_cache_dir()) / "sampler"
+    budget = getattr(args, "cache_max_bytes", None) or os.environ.get("PYFR_PLOT_CACHE_MAX", "20G")
+    return SamplerCache(root, parse_bytes(budget))
+
+
+def _key_stamp(csv_out: Path) -> Path:
+    return csv_out.with_name(csv_out.name + ".key")
+
+
+def ensure_sampled(csv_out: Path, *, mesh: Path, src: Path, pts: Path,
+                   skip: int, args) -> Path:
+    """
+    Make *csv_out* hold the sampler output for (mesh, src, pts, skip).
+
+    * `--reuse` keeps an existing CSV untouched (the old behaviour).
+    * Otherwise the inputs are hashed; a CSV whose `.key` stamp matches is
+      reused, a cache hit is copied into place, and only a miss runs PyFR.
+    * `--no-cache` falls back to "sample only if the CSV is missing".
+    """
+    if getattr(args, "reuse", None) is not None and csv_out.exists():
+        print(f"[pyfr_plot] Re-using sampled CSV → {csv_out}")
+        return csv_out
+
+    cache = _sampler_cache(args)
+    if cache is None:
+        if csv_out.exists():
+            print(f"[pyfr_plot] Re-using sampled CSV → {csv_out}")
+        else:
+            run_sampler(csv_out, mesh=mesh, src=src, pts=pts, skip=skip,
+                        workers=args.sampler_workers, executor=make_executor(args))
+        return csv_out
+
+    key, desc = sampler_key(mesh=mesh, soln=src, pts=pts, skip=skip)
+    stamp = _key_stamp(csv_out)
+    if csv_out.exists() and stamp.exists() and stamp.read_text().strip() == key:
+        cache.lookup(key)
+        print(f"[pyfr_plot] Re-using sampled CSV → {csv_out}  (key {key[:12]})")
+        return csv_out
+
+    if cache.lookup(key) is not None:
+        print(f"[pyfr_plot] Sampler cache hit {key[:12]} → {csv_out}")
+    else:
+        tmp = cache.temp_path(key)
+        run_sampler(tmp, mesh=mesh, src=src, pts=pts, skip=skip,
+                    workers=args.sampler_workers, executor=make_executor(args))
+        cache.store(key, tmp, desc)
+        print(f"[pyfr_plot] Sampler cache store {key[:12]}")
+    cache.materialize(key, csv_out)
+    stamp.write_text(key + "\n")
+    return csv_out
+
+
+# ---------- multi-snapshot statistics: sample each snapshot, fold into running moments 
+def _parse_pairs(txt: str) -> list[tuple[str, str]]:
+    """`u:v, u:w` → [("u", "v"), ("u", "w")]"""
+    return [tuple(t.split(":", 1)) for t in _split_tokens(txt) if ":" in t]
+
+
+def ensure_snapshot_stats(csv_out: Path, *, mesh: Path, snaps: list[Path], pts: Path,
+                          skip: int, pairs: list[tuple[str, str]], checkpoint: Path,
+                          every: int = 10, workers: int = 1,
+                          executor: LocalExecutor | None = None) -> Path:
+    """
+    Sample every snapshot in *snaps* that the checkpoint has not seen yet and
+    fold it into running mean / variance / covariance.  *csv_out* receives
+    `x,y,z,avg-<c>,std-<c>,cov-<a><b>` so the usual expressions apply.
+    """
+    meta = {"pts": content_digest(pts), "mesh": file_identity(mesh), "skip": int(skip)}
+    stats = RunningStats.load(checkpoint, pairs, meta)
+
+    todo = [sn for sn in snaps if stats is None or str(sn.resolve()) not in stats.snaps]
+    new = len(todo)
+
+    # sample up to `slots` snapshots at once (job steps under Slurm), fold in order
+    executor = executor or LocalExecutor(1)
+    step = executor.slots if workers <= 1 else 1
+    for lo in range(0, len(todo), step):
+        batch = todo[lo:lo + step]
+        tmps = [csv_out.with_name(f".{csv_out.name}.snap{k}.csv") for k in range(len(batch))]
+        if len(batch) == 1:
+            run_sampler(tmps[0], mesh=mesh, src=batch[0], pts=pts, skip=skip,
+                        workers=workers, executor=executor)
+        else:
+            executor.run_all([(_sampler_cmd(mesh=mesh, src=sn, pts=pts, skip=skip), t)
+                              for sn, t in zip(batch, tmps)], label="snapshot")
+
+        for snap, tmp in zip(batch, tmps):
+            df = read_csv_any(tmp)
+            cols = [c for c in df.columns if c not in COORD_COLS]
+            if stats is None:
+                stats = RunningStats(cols, pairs, meta)
+            elif stats.cols != cols:
+                sys.exit(f"[pyfr_plot] (stats) {snap}: columns {cols} != {stats.cols}")
+            coords = (df[[c for c in COORD_COLS if c in df.columns]].to_numpy().T
+                      if stats.n == 0 else None)
+            stats.update({c: df[c].to_numpy() for c in cols}, coords, str(snap.resolve()))
+            del df
+            tmp.unlink(missing_ok=True)
+            print(f"[pyfr_plot] (stats) folded {snap.name}  n={stats.n}", flush=True)
+
+            if stats.n % every == 0:
+                stats.save(checkpoint)
+
+    if stats is None:
+        sys.exit("[pyfr_plot] (stats) src-glob matched no snapshots")
+    if not new and csv_out.exists():
+        print(f"[pyfr_plot] (stats) no new snapshots (n={stats.n}) → {csv_out}")
+        return csv_out
+
+    stats.save(checkpoint)
+    stats.write_csv(csv_out)
+    print(f"[pyfr_plot] (stats) n={stats.n} snapshots → {csv_out}")
+    return csv_out
+
+
+# ---------- where a section samples (shared by the section and batch drivers) 
+def _sample_paths(sect, base, args) -> tuple[Path, Path]:
+    """Resolve *(pts_path, sampled_csv)* exactly as the sampler stage uses them."""
+    pts_path = Path(sect.get("pts-file", base.get("pts-file", f"{sect.get('src-file','sample')}_pts.csv")))
+
+    reuse = getattr(args, "reuse", None)
+    csv_out = Path((reuse or "") or
+                   sect.get("sampled-file", base.get("sampled-file", "")) or
+                   f"{pts_path.stem.replace('_pts','')}_sampled.csv")
+    return pts_path, csv_out
+
+
+def _is_adaptive(sect, base) -> bool:
+    return _as_bool(sect.get("adaptive", base.get("adaptive", "")))
+
+
+def _ensure_points(sect, base, pts_path: Path, env0) -> bool:
+    """Build *pts_path* from lims + spacings if missing; False if it cannot."""
+    if pts_path.exists():
+        return True
+    # grab whatever each block provides
+    lims     = sect.get("lims",     base.get("lims",     ""))
+    spacings = sect.get("spacings", base.get("spacings", ""))
+
+    # build only if we actually have both keys
+    if not (lims and spacings):
+        return False
+    print(f"[pyfr_plot] Building points file {pts_path.name} …")
+    make_points_csv(pts_path, lims, spacings, env0,
+                    binary=_as_bool(sect.get("pts-binary", base.get("pts-binary", ""))))
+    return True
+
+
+def _src_path(sect, base) -> Path:
+    for key in ("src-file", "src"):
+        if key in sect:
+            return Path(sect[key])
+        if key in base:
+            return Path(base[key])
+    raise SystemExit("[pyfr_plot] No src-file (PyFR solution) given")
+
+
+def _mesh_path(cfg, sect) -> Path:
+    return Path(first_key(sect, "mesh",
+                          default=cfg.get("postprocess-mesh", "mesh-native", fallback="")))
+
+
+def _skip_value(sect, args) -> int:
+    return args.skip if args.skip is not None else int(sect.get("skip", 1))
@@ -0,0 +1,419 @@
+# ───────────────────────── sectionio.py ─────────────────────────
+"""
+Section config access, CSV / reference reading and expression evaluation
+shared by every section family – imported by the main script.
+
+pandas and matplotlib load on first use (`_pd()`, `_plt()`), so sampling
+and `--no-plot` runs never import them.
+"""
+
+from __future__ import annotations
+import configparser
+import glob as _glob
+import os
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict
+
+import numpy as np
+
+from exprengine import ExprProgram
+from refcatalog import catalog as reference_catalog, default_root as default_reference_root
+from util import decimate_curve
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+RC_PARAMS = {
+    "figure.dpi": 200,
+    "savefig.dpi": 300,
+    "axes.titlesize": 25,   # ↑
+    "axes.labelsize": 25,   # ↑ xlabel/ylabel
+    "xtick.labelsize": 20,  # ↑ xticks
+    "ytick.labelsize": 20,  # ↑ yticks
+    "legend.fontsize": 13,  # (optional) match scale
+}
+
+
+# ---------- pandas / matplotlib, imported on first use -----------------------
+_IMPORT_TIMES: dict[str, tuple[float, str]] = {}   # module → (seconds, first caller)
+
+
+def _timed_import(name: str, load):
+    t0 = time.perf_counter()
+    mod = load()
+    caller = sys._getframe(2).f_code.co_name
+    _IMPORT_TIMES[name] = (time.perf_counter() - t0, caller)
+    return mod
+
+
+_PD = None
+def _pd():
+    """pandas, imported the first time a stage needs it."""
+    global _PD
+    if _PD is None:
+        _PD = _timed_import("pandas", lambda: __import__("pandas"))
+    return _PD
+
+
+_PLT = None
+def _plt():
+    """matplotlib.pyplot with the house rcParams, imported on first plot."""
+    global _PLT
+    if _PLT is None:
+        def load():
+            import matplotlib.pyplot as plt
+            plt.rcParams.update(RC_PARAMS)
+            return plt
+        _PLT = _timed_import("matplotlib", load)
+    return _PLT
+
+
+# ---------- pretty printer ---------------------------------------------------
+def _cyan(s):   return f"\033[96m{s}\033[0m"
+def _green(s):  return f"\033[92m{s}\033[0m"
+def _yellow(s): return f"\033[93m{s}\033[0m"
+def _bold(s):   return f"\033[1m{s}\033[0m"
+
+
+# ---------- section keys -----------------------------------------------------
+def first_key(sect: configparser.SectionProxy, *names: str, default: str | None = None):
+    """Return the first existing key among *names* (case‑insensitive)."""
+    for k in names:
+        if k in sect:
+            return sect[k]
+    if default is not None:
+        return default
+    raise KeyError(f"None of the keys {', '.join(names)} found in section [{sect.name}]")
+
+
+def get_label(cfg, sect, base, key: str, fallback: str = "") -> str:
+    # 1) section
+    if key in sect:
+        return sect[key]
+    # 2) family base (may be dict or SectionProxy)
+    if base and key in base:
+        return base[key]
+    # 3) global defaults
+    if "plot-defaults" in cfg and key in cfg["plot-defaults"]:
+        return cfg["plot-defaults"][key]
+    # 4) fallback
+    return fallback
+
+
+def _get_any(sect, base, *keys, default=None):
+    for k in keys:
+        if k in sect:
+            return sect.get(k)
+        if isinstance(base, dict):
+            if k in base:
+                return base.get(k)
+        else:
+            if k in base:
+                return base.get(k)
+    return default
+
+
+def _as_bool(v) -> bool:
+    if v is None:
+        return False
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def _split_tokens(s: str) -> list[str]:
+    return shlex.split(s.replace(",", " ")) if s else []
+
+
+def _clean_ascii(expr: str) -> str:
+    # normal minus signs
+    for bad in ('\u2010', '\u2011', '\u2012', '\u2013', '\u2212'):
+        expr = expr.replace(bad, '-')
+    # remove strange line separators / zero-width spaces
+    expr = expr.replace('\u2028', '').replace('\u2029', '').replace('\u200b', '')
+    return expr.strip()
+
+
+# ---------- CSV reading ------------------------------------------------------
+def _whitespace_parse(df) -> bool:
+    """A comma parse of a whitespace-separated file: one column, blanks in its name."""
+    return df.shape[1] == 1 and len(str(df.columns[0]).split()) > 1
+
+
+def read_csv_any(path: Path) -> pd.DataFrame:
+    """Read CSV with either comma or whitespace separators."""
+    try:
+        df = _pd().read_csv(path, comment="#", skip_blank_lines=True)
+        if not _whitespace_parse(df):
+            return df
+    except (_pd().errors.ParserError, UnicodeDecodeError):
+        pass
+    return _pd().read_csv(path, sep=r"\s+", comment="#", skip_blank_lines=True)
+
+
+def read_csv_chunks(path: Path, rows: int):
+    """`read_csv_any` as DataFrame blocks of at most *rows* rows."""
+    pd = _pd()
+    kw = dict(comment="#", skip_blank_lines=True, chunksize=rows)
+    reader = pd.read_csv(path, **kw)
+    try:
+        first = next(reader)
+        if _whitespace_parse(first):
+            raise pd.errors.ParserError("whitespace-separated")
+    except StopIteration:
+        return
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        reader.close()
+        reader = pd.read_csv(path, sep=r"\s+", **kw)
+        first = next(reader, None)
+        if first is None:
+            return
+    yield first
+    yield from reader
+
+
+# ---------- reference CSVs ---------------------------------------------------
+def _parse_reference_csv(path: Path, *, forced_label: str | None = None) -> pd.DataFrame:
+    """Read a reference CSV and capture the first top comment (starting with '#')."""
+    note = ""
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            if s.startswith("#"):
+                note = s.lstrip("#").strip()
+                break
+            break  # header reached
+
+    df = read_csv_any(path)
+    # label priority: forced from spec > existing > filename stem
+    df.attrs["label"] = forced_label or df.attrs.get("label") or path.stem
+    if note:
+        df.attrs["refnote"] = note
+
+    return df
+
+
+def _catalog_frame(cat, rel: str, *, forced_label: str | None = None) -> pd.DataFrame:
+    """Reference DataFrame from the pre-parsed catalog (same shape/attrs as a parse)."""
+    e = cat.entry(rel)
+    cols, arr = cat.table(rel)
+    df = _pd().DataFrame(arr, columns=cols)
+    df.attrs["label"] = forced_label or e["label"]
+    if e["note"]:
+        df.attrs["refnote"] = e["note"]
+    return df
+
+
+def _in_reference_tree(path_txt: str) -> bool:
+    try:
+        Path(os.path.realpath(path_txt)).relative_to(default_reference_root().resolve())
+        return True
+    except ValueError:
+        return False
+
+
+def load_reference_query(spec: str) -> list[pd.DataFrame]:
+    """
+    `reference-query = case=c3900 plane=plane_x1p54 quantity=u` – look references
+    up in the catalog by metadata (globs allowed, `;` separates alternatives).
+    """
+    if not spec or not spec.strip():
+        return []
+    cat = reference_catalog(read_csv_any)
+    if cat is None:
+        sys.exit("[pyfr_plot] reference-query needs the reference catalog "
+                 f"({default_reference_root()})")
+    rels = cat.query(spec)
+    if not rels:
+        print(f"[pyfr_plot] (warn) reference-query matched nothing: {spec}")
+    return [_catalog_frame(cat, r) for r in rels if not cat.entry(r)["label"].startswith("_")]
+
+
+def load_reference_csvs_with_notes(spec: str) -> list[pd.DataFrame]:
+    """
+    Accepts ANY of:
+      - whitespace and/or comma separated items
+      - quoted paths with spaces
+      - glob patterns (*.csv)
+      - optional labels as  label=path  or  label:path  (DOIs are left intact)
+    """
+    if not spec or not spec.strip():
+        return []
+
+    # turn commas into whitespace and let shlex respect quotes
+    tokens = shlex.split(spec.replace(",", " "))
+
+    refs: list[pd.DataFrame] = []
+    for tok in tokens:
+        label = None
+        path_txt = tok
+
+        # Support label=path or label:path (but don't split DOIs or URLs)
+        if ("=" in tok) or (":" in tok and not tok.startswith(("http://", "https://"))):
+            # prefer '='; otherwise first ':' only
+            if "=" in tok:
+                label, path_txt = tok.split("=", 1)
+            else:
+                label, path_txt = tok.split(":", 1)
+            label = label.strip()
+            path_txt = path_txt.strip()
+
+        # Inside the references tree: match against the catalog, no parsing
+        cat = reference_catalog(read_csv_any) if _in_reference_tree(path_txt) else None
+        rels = cat.glob(path_txt) if cat is not None else []
+        for rel in rels:
+            if (label and label.startswith('_')) or Path(rel).stem.startswith('_'):
+                print(f"[pyfr_plot] (note) skipping reference starting with '_': {Path(rel).name}")
+                continue
+            refs.append(_catalog_frame(cat, rel, forced_label=label))
+        if rels:
+            continue
+
+        # Expand globs; if none match, fall back to literal
+        matches = sorted(_glob.glob(path_txt)) or [path_txt]
+        for m in matches:
+            p = Path(m)
+            if not p.exists():
+                print(f"[pyfr_plot] (warn) reference not found: {m}")
+                continue
+
+            # Skip if label like "_Hmode" or filename like "_Hmode.csv"
+            if (label and label.startswith('_')) or p.stem.startswith('_'):
+                print(f"[pyfr_plot] (note) skipping reference starting with '_': {p.name}")
+                continue
+
+            refs.append(_parse_reference_csv(p, forced_label=label))
+
+    return refs
+
+
+# ---------- expressions and their constants ----------------------------------
+def eval_expr(expr: str, env: Dict[str, np.ndarray | float]):
+    """Evaluate *expr* in a restricted, NumPy‑friendly namespace."""
+    return ExprProgram({"_": expr}, env).evaluate(env)["_"]
+
+
+def eval_exprs(exprs: Dict[str, str], env: Dict[str, np.ndarray | float]):
+    """
+    Evaluate several expressions as one compiled program, so shared terms
+    (e.g. `avg_u**2` in yexpr and stdexpr) are computed once.  Empty
+    expressions map to None.
+    """
+    vals = ExprProgram(exprs, env).evaluate(env)
+    return {k: (np.asarray(vals[k], dtype=float) if k in vals else None) for k in exprs}
+
+
+def geometry_env(cfg: configparser.ConfigParser) -> Dict[str, float]:
+    env: Dict[str, float] = {}
+    if "postprocess-geometry" in cfg:
+        g = cfg["postprocess-geometry"]
+
+        def parse_tuple(txt: str):
+            txt = txt.strip().lstrip("([{}").rstrip(")] {}")
+            return tuple(map(float, txt.split(',')))
+
+        sx, sy, sz = parse_tuple(g.get("start", "0,0,0"))
+        env.update({"START_X": sx, "START_Y": sy, "START_Z": sz})
+
+        stream_len = float(g.get("streamwiselength", g.get("length-streamwise", 0)))
+        span_len = float(g.get("spanwiselength", g.get("length-spanwise", 0)))
+        env.update({"STREAM_LEN": stream_len, "SPAN_LEN": span_len, "D": span_len})
+        env["STERN_X"] = sx + stream_len
+
+
+        env["streamwiselength"] = stream_len
+        env["spanwiselength"]   = span_len
+    return env
+
+
+def constants_env(cfg: configparser.ConfigParser) -> Dict[str, float]:
+    """Evaluate `[constants]` in order, so later entries may use earlier ones."""
+    const_env: Dict[str, float] = {}
+    if "constants" in cfg:
+        for k, v in cfg["constants"].items():
+            v_clean = v.split(';', 1)[0].split('#', 1)[0].strip()
+            if not v_clean:
+                continue
+            val = float(eval(v_clean, {"__builtins__": {}}, const_env))
+            const_env[k] = val
+            const_env[k.replace('-', '_')] = val
+    return const_env
+
+
+_ENV0_CACHE: Dict[int, Dict[str, float]] = {}
+
+
+def base_env(cfg: configparser.ConfigParser) -> Dict[str, float]:
+    """Constants + geometry symbols, evaluated once per parsed INI."""
+    key = id(cfg)
+    if key not in _ENV0_CACHE:
+        _ENV0_CACHE[key] = {**constants_env(cfg), **geometry_env(cfg)}
+    return dict(_ENV0_CACHE[key])
+
+
+def _family_base(cfg: configparser.ConfigParser, sec_name: str):
+    """Return *(family, base)* where *base* is `postprocess-<family>-base` or {}."""
+    family = sec_name.split('-', 2)[1]              # "sampleline", "sampleplane", …
+    base_key = f"postprocess-{family}-base"
+    return family, (cfg[base_key] if base_key in cfg else {})
+
+
+# ---------- plot-aligned CSV curves ------------------------------------------
+def _sort_dedupe_1d(x, y, s=None):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if s is not None:
+        s = np.asarray(s, dtype=float)
+
+    # sort by x
+    idx = np.argsort(x, kind="mergesort")
+    x, y = x[idx], y[idx]
+    if s is not None:
+        s = s[idx]
+
+    # de-duplicate x (keep first or average; average is safer)
+    ux, inv, counts = np.unique(x, return_inverse=True, return_counts=True)
+    if len(ux) != len(x):
+        y_acc = np.zeros_like(ux, dtype=float)
+        if s is not None:
+            s_acc = np.zeros_like(ux, dtype=float)
+
+        np.add.at(y_acc, inv, y)
+        if s is not None:
+            np.add.at(s_acc, inv, s)
+
+        y = y_acc / counts
+        if s is not None:
+            s = s_acc / counts
+        x = ux
+
+    return x, y, s
+
+
+def _decimate_csv_curve(x, y, s, *, tol: str, rtol: str, max_points: str):
+    """
+    Thin the plot-aligned CSV for pgfplots: keep the points needed to stay
+    within *tol* of y and y ± σ under linear interpolation (else *rtol* ×
+    the band's range) and at most *max_points* points.
+    """
+    given = lambda v: str(v or "").strip()
+    if given(tol):
+        tol = float(tol)
+    elif given(rtol):
+        band = y if s is None else np.r_[y - s, y + s]
+        span = float(np.nanmax(band) - np.nanmin(band)) if np.isfinite(band).any() else 0.0
+        tol = float(rtol) * span
+    else:
+        tol = None
+    cap = int(float(max_points)) if given(max_points) else None
+    keep = decimate_curve(x, y, s, tol=tol, max_points=cap)
+    if len(keep) < len(x):
+        print(f"[pyfr_plot] CSV decimated: {len(x)} → {len(keep)} points"
+              + (f" (tol {tol:.3g})" if tol is not None else ""))
+    return x[keep], y[keep], (None if s is None else s[keep])
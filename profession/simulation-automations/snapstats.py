@@ -0,0 +1,110 @@
+# ───────────────────────── snapstats.py ─────────────────────────
+"""Running (Welford) statistics over sampled snapshots – imported by the main script."""
+
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+COORD_COLS = ("x", "y", "z")
+
+
+class RunningStats:
+    """
+    Point-wise running mean, variance and selected covariances over a
+    sequence of sampled snapshots.  Memory is O(points x columns), constant
+    in the number of snapshots; `save`/`load` checkpoint the accumulators so
+    a sequence can be extended later.
+    """
+
+    def __init__(self, cols: list[str], pairs: list[tuple[str, str]], meta: dict):
+        self.cols = list(cols)
+        self.pairs = [tuple(p) for p in pairs]
+        self.meta = dict(meta)                 # identity of points / mesh / skip
+        self.snaps: list[str] = []
+        self.n = 0
+        self.coords: np.ndarray | None = None
+        self.mean: np.ndarray | None = None    # (ncols, npts)
+        self.m2: np.ndarray | None = None      # Σ (x - mean)²
+        self.c2: np.ndarray | None = None      # Σ (a - mean_a)(b - mean_b), (npairs, npts)
+
+    def _init(self, npts: int):
+        self.mean = np.zeros((len(self.cols), npts))
+        self.m2 = np.zeros_like(self.mean)
+        self.c2 = np.zeros((len(self.pairs), npts))
+
+    def update(self, data: dict[str, np.ndarray], coords: np.ndarray | None, name: str):
+        """Fold one snapshot (column name → values) into the accumulators."""
+        x = np.stack([np.asarray(data[c], dtype=float) for c in self.cols])
+        if self.mean is None:
+            self._init(x.shape[1])
+            self.coords = coords
+        elif x.shape[1] != self.mean.shape[1]:
+            raise ValueError(f"{name}: {x.shape[1]} points, expected {self.mean.shape[1]}")
+
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        delta2 = x - self.mean
+        if self.pairs:
+            ia = [self.cols.index(a) for a, _ in self.pairs]
+            ib = [self.cols.index(b) for _, b in self.pairs]
+            self.c2 += delta[ia] * delta2[ib]
+        self.m2 += delta * delta2
+        self.snaps.append(name)
+
+    # ---------- results ----------------------------------------------------
+    def columns(self) -> dict[str, np.ndarray]:
+        """`avg-<c>`, `std-<c>` and `cov-<a><b>` (population statistics)."""
+        out: dict[str, np.ndarray] = {}
+        if self.coords is not None:
+            for i, c in enumerate(COORD_COLS[:self.coords.shape[0]]):
+                out[c] = self.coords[i]
+        n = max(self.n, 1)
+        for i, c in enumerate(self.cols):
+            out[f"avg-{c}"] = self.mean[i]
+        for i, c in enumerate(self.cols):
+            out[f"std-{c}"] = np.sqrt(np.maximum(self.m2[i] / n, 0.0))
+        for k, (a, b) in enumerate(self.pairs):
+            out[f"cov-{a}{b}"] = self.c2[k] / n
+        return out
+
+    def write_csv(self, path: Path):
+        cols = self.columns()
+        names = list(cols)
+        block = np.column_stack([cols[k] for k in names])
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w") as fh:
+            fh.write(",".join(names) + "\n")
+            np.savetxt(fh, block, delimiter=",", fmt="%.10g")
+        os.replace(tmp, path)
+
+    # ---------- checkpoint -------------------------------------------------
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.part.npz")
+        header = dict(cols=self.cols, pairs=self.pairs, meta=self.meta,
+                      snaps=self.snaps, n=self.n)
+        arrays = {k: v for k, v in dict(mean=self.mean, m2=self.m2, c2=self.c2,
+                                        coords=self.coords).items() if v is not None}
+        np.savez(tmp, header=np.array(json.dumps(header)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, pairs, meta) -> "RunningStats | None":
+        """Resume from *path*; None if missing or built from different inputs."""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as z:
+            h = json.loads(str(z["header"]))
+            st = cls(h["cols"], pairs, meta)
+            if [tuple(p) for p in h["pairs"]] != st.pairs or h["meta"] != st.meta:
+                print(f"[stats] checkpoint {path} does not match inputs; restarting")
+                return None
+            st.n, st.snaps = int(h["n"]), list(h["snaps"])
+            st.mean, st.m2, st.c2 = z["mean"], z["m2"], z["c2"]
+            st.coords = z["coords"] if "coords" in z else None
+        return st
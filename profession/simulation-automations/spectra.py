@@ -0,0 +1,325 @@
+# ───────────────────────── spectra.py ─────────────────────────
+"""
+Time-resolved probe arrays and batched spectral estimates – imported by the main script.
+
+PyFR's sampler plugin writes long-format CSV: one row per (time, point),
+header `t,x,y,z,<fields>`, every output step listing the points in the same
+order.  `load_probes()` converts it once into `<csv>.probes/`:
+
+* `schema.json` – source stamp, points × steps, field names
+* `times.f8`, `coords.f8` – step times and (points, 3) coordinates
+* `<tag>-NNN.bin` – one raw float64 (points × time) array per field
+
+so a probe's whole history is one contiguous row.  Steps written twice
+(restarts overlap the previous run) keep the later copy; a trailing
+incomplete step is dropped.  `Welch` then turns blocks of probe rows into
+PSDs / cross spectra with one batched `rfft` per block.
+"""
+
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+
+SCHEMA = "schema.json"
+VERSION = 1
+CHUNK_ROWS = 1 << 20            # CSV rows parsed per block while building
+TRANSPOSE_BYTES = 64 << 20      # one (steps × probes) block while transposing
+TIME_COLS = ("t", "time")
+COORD_COLS = ("x", "y", "z")
+
+
+def sidecar_dir(csv_path: Path) -> Path:
+    """`probes.csv` → `probes.csv.probes/`."""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + ".probes")
+
+
+def _source_stamp(path: Path) -> dict:
+    st = Path(path).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino}
+
+
+class ProbeTable:
+    """Field name (`-` spelled `_`) → memory-mapped (points, steps) array."""
+
+    def __init__(self, root: Path, schema: dict):
+        self.root = Path(root)
+        self.npts, self.nt = int(schema["npts"]), int(schema["nt"])
+        self.t = np.fromfile(self.root / "times.f8", dtype="<f8")
+        self.coords = np.fromfile(self.root / "coords.f8", dtype="<f8").reshape(self.npts, -1)
+        self._files = {f["name"].replace("-", "_"): f["file"] for f in schema["fields"]}
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self._files)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._files
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return np.memmap(self.root / self._files[name], dtype="<f8", mode="r",
+                         shape=(self.npts, self.nt))
+
+
+def _read_schema(root: Path) -> dict | None:
+    try:
+        return json.loads((root / SCHEMA).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _kept_steps(t: np.ndarray) -> np.ndarray:
+    """Indices of a strictly increasing time series, later writes winning."""
+    if len(t) < 2:
+        return np.arange(len(t))
+    later_min = np.minimum.accumulate(t[::-1])[::-1]
+    return np.flatnonzero(np.r_[t[:-1] < later_min[1:], True])
+
+
+def _build(csv_path: Path, root: Path, stamp: dict, frames: Iterable) -> dict:
+    """Convert the CSV into *root*; a failed build leaves no `.part` files behind."""
+    root.mkdir(parents=True, exist_ok=True)
+    try:
+        return _convert(csv_path, root, stamp, frames)
+    except BaseException:
+        for p in root.glob(f".*.{os.getpid()}.part"):
+            p.unlink(missing_ok=True)
+        raise
+
+
+def _convert(csv_path: Path, root: Path, stamp: dict, frames: Iterable) -> dict:
+    tag, pid = f"{stamp['mtime_ns']:x}", os.getpid()
+    names: list[str] = []
+    parts: list[Path] = []
+    handles: list = []
+    it, ic, ifld = 0, [], []
+    pending: list[np.ndarray] = []
+    npts, coords0, nrows, times = 0, None, 0, []
+
+    def append(arr: np.ndarray):
+        nonlocal nrows
+        row = nrows + np.arange(len(arr))
+        pidx, step = row % npts, row // npts
+        if not np.allclose(arr[:, ic], coords0[pidx], rtol=1e-9, atol=1e-12):
+            raise ValueError(f"{csv_path.name}: the points change between output steps")
+        same = step[1:] == step[:-1]
+        if np.any(arr[1:, it][same] != arr[:-1, it][same]):
+            raise ValueError(f"{csv_path.name}: time varies within an output step")
+        times.append(arr[pidx == 0, it])
+        for fh, j in zip(handles, ifld):
+            fh.write(np.ascontiguousarray(arr[:, j], dtype="<f8").tobytes())
+        nrows += len(arr)
+
+    try:
+        for df in frames:
+            if not handles:
+                cols = [str(c) for c in df.columns]
+                tcol = next((c for c in cols if c.lower() in TIME_COLS), None)
+                if tcol is None or not all(c in cols for c in COORD_COLS):
+                    raise ValueError(f"{csv_path.name}: expected columns t,x,y,z,<fields>, "
+                                     f"got {','.join(cols)}")
+                it, ic = cols.index(tcol), [cols.index(c) for c in COORD_COLS]
+                ifld = [j for j, c in enumerate(cols) if j != it and j not in ic]
+                names = [cols[j] for j in ifld]
+                parts = [root / f".{tag}-{i:03d}.tm.{pid}.part" for i in range(len(names))]
+                handles = [p.open("wb") for p in parts]
+            arr = df.to_numpy(dtype=float)
+            if coords0 is None:                  # points per step: rows before t changes
+                pending.append(arr)
+                buf = np.concatenate(pending)
+                change = np.flatnonzero(buf[:, it] != buf[0, it])
+                if not len(change):
+                    continue
+                npts, arr, pending = int(change[0]), buf, []
+                coords0 = arr[:npts, ic]
+            append(arr)
+        if coords0 is None and pending:          # a single output step
+            buf = np.concatenate(pending)
+            npts, coords0 = len(buf), buf[:, ic]
+            append(buf)
+    finally:
+        for fh in handles:
+            fh.close()
+
+    if not npts:
+        raise ValueError(f"{csv_path.name}: no probe rows")
+
+    nt = nrows // npts
+    t_all = np.concatenate(times)[:nt]
+    keep = _kept_steps(t_all)
+    dropped = (nt - len(keep), nrows - nt * npts)
+    if any(dropped):
+        print(f"[spectra] {csv_path.name}: dropped {dropped[0]} overlapping step(s), "
+              f"{dropped[1]} row(s) of an incomplete final step")
+
+    # time-major parts → (points × steps), a block of probes at a time
+    fields = []
+    step = max(1, TRANSPOSE_BYTES // max(8 * len(keep), 1))
+    for i, (name, part) in enumerate(zip(names, parts)):
+        src = np.memmap(part, dtype="<f8", mode="r", shape=(nt, npts))
+        fname = f"{tag}-{i:03d}.bin"
+        tmp = root / f".{fname}.{pid}.part"
+        dst = np.memmap(tmp, dtype="<f8", mode="w+", shape=(npts, len(keep)))
+        for p0 in range(0, npts, step):
+            dst[p0:p0 + step] = src[:, p0:p0 + step][keep].T
+        dst.flush()
+        del src, dst
+        part.unlink()
+        os.replace(tmp, root / fname)
+        fields.append({"name": name, "file": fname})
+
+    t_all[keep].astype("<f8").tofile(root / "times.f8")
+    np.ascontiguousarray(coords0, dtype="<f8").tofile(root / "coords.f8")
+    schema = {"version": VERSION, "source": str(csv_path), **stamp,
+              "npts": npts, "nt": int(len(keep)), "fields": fields}
+    tmp = root / f".{SCHEMA}.{pid}.part"
+    tmp.write_text(json.dumps(schema, indent=1))
+    os.replace(tmp, root / SCHEMA)              # schema last: readers see whole sets
+
+    keep_files = {f["file"] for f in fields}
+    for p in root.glob("*.bin"):
+        if p.name not in keep_files:
+            p.unlink(missing_ok=True)
+    return schema
+
+
+def load_probes(csv_path: Path, chunks: Callable[[Path, int], Iterable], *,
+                chunk_rows: int = CHUNK_ROWS) -> ProbeTable:
+    """
+    Probe table for the sampler-plugin CSV *csv_path*, converting it with
+    *chunks* (path, rows → DataFrame blocks) only when the sidecar is
+    missing or the CSV's size/mtime/inode changed.
+    """
+    csv_path = Path(csv_path)
+    root = sidecar_dir(csv_path)
+    stamp = _source_stamp(csv_path)
+    schema = _read_schema(root)
+    fresh = (schema is not None and schema.get("version") == VERSION
+             and all(schema.get(k) == v for k, v in stamp.items()))
+    if not fresh:
+        schema = _build(csv_path, root, stamp, chunks(csv_path, chunk_rows))
+        print(f"[spectra] indexed {csv_path.name}: {schema['npts']} probes × "
+              f"{schema['nt']} steps × {len(schema['fields'])} fields → {root.name}/")
+    return ProbeTable(root, schema)
+
+
+def parse_selection(spec: str, n: int) -> np.ndarray:
+    """`all` (or empty) | `0, 4, 10-20` (ranges inclusive) → sorted probe indices."""
+    spec = str(spec or "").strip()
+    if spec.lower() in ("", "all"):
+        return np.arange(n)
+    out: set[int] = set()
+    for tok in spec.replace(",", " ").split():
+        lo, sep, hi = tok.partition("-")
+        out.update(range(int(lo), int(hi) + 1) if sep else [int(lo)])
+    idx = np.array(sorted(out), dtype=np.intp)
+    if len(idx) and (idx[0] < 0 or idx[-1] >= n):
+        raise ValueError(f"probe selection '{spec}' outside 0…{n - 1}")
+    return idx
+
+
+# ---------- spectral estimates ---------------------------------------------
+WINDOWS: dict[str, Callable[[int], np.ndarray]] = {      # periodic, as for spectra
+    "hann":     lambda n: 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n),
+    "hamming":  lambda n: 0.54 - 0.46 * np.cos(2 * np.pi * np.arange(n) / n),
+    "blackman": lambda n: (0.42 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)
+                           + 0.08 * np.cos(4 * np.pi * np.arange(n) / n)),
+    "boxcar":   np.ones,
+}
+
+
+def uniform_times(t: np.ndarray, rtol: float = 1e-6) -> np.ndarray | None:
+    """None when *t* is uniformly spaced, else a uniform grid at the median step."""
+    dt = np.diff(t)
+    med = float(np.median(dt))
+    if np.all(np.abs(dt - med) <= rtol * med):
+        return None
+    return t[0] + med * np.arange(int(np.floor((t[-1] - t[0]) / med)) + 1)
+
+
+def resample(block: np.ndarray, t: np.ndarray, tu: np.ndarray) -> np.ndarray:
+    """Linear interpolation of every row of *block* from *t* onto *tu*."""
+    j = np.clip(np.searchsorted(t, tu, side="right") - 1, 0, len(t) - 2)
+    w = (tu - t[j]) / (t[j + 1] - t[j])
+    return block[:, j] * (1.0 - w) + block[:, j + 1] * w
+
+
+class Welch:
+    """
+    Welch estimates for rows of length *n* sampled at *fs*: segments of
+    *nperseg* with fractional *overlap*, mean removed, windowed, one-sided
+    density scaling (units² / Hz).
+    """
+
+    def __init__(self, n: int, fs: float, *, nperseg: int, overlap: float = 0.5,
+                 window: str = "hann"):
+        if window not in WINDOWS:
+            raise ValueError(f"window '{window}' (use {', '.join(WINDOWS)})")
+        self.nperseg = int(min(nperseg, n))
+        if self.nperseg < 2:
+            raise ValueError(f"only {n} samples in the time window")
+        hop = max(1, self.nperseg - int(round(overlap * self.nperseg)))
+        self.starts = np.arange(0, n - self.nperseg + 1, hop)
+        self.win = WINDOWS[window](self.nperseg)
+        self.f = np.fft.rfftfreq(self.nperseg, 1.0 / fs)
+        one_sided = np.full(len(self.f), 2.0)
+        one_sided[0] = 1.0
+        if self.nperseg % 2 == 0:
+            one_sided[-1] = 1.0
+        self.scale = one_sided / (fs * np.sum(self.win ** 2))
+
+    @property
+    def nseg(self) -> int:
+        return len(self.starts)
+
+    def bytes_per_row(self) -> int:
+        """Peak temporaries per probe: segments (f8) + their spectra (c16), ×2."""
+        return 2 * self.nseg * (8 * self.nperseg + 16 * len(self.f))
+
+    def fft(self, rows: np.ndarray) -> np.ndarray:
+        """(P, n) → (P, segments, frequencies) windowed spectra."""
+        segs = np.lib.stride_tricks.sliding_window_view(rows, self.nperseg, axis=-1)[:, self.starts]
+        segs = segs - segs.mean(axis=-1, keepdims=True)
+        return np.fft.rfft(segs * self.win, axis=-1)
+
+    def psd(self, X: np.ndarray) -> np.ndarray:
+        return (X.real ** 2 + X.imag ** 2).mean(axis=1) * self.scale
+
+    def csd(self, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+        """Cross spectrum of every row of *X* with the (1, …) reference *Y*."""
+        return (np.conj(Y) * X).mean(axis=1) * self.scale
+
+
+def coherence(Pxy: np.ndarray, Pxx: np.ndarray, Pyy: np.ndarray) -> np.ndarray:
+    """Magnitude-squared coherence |Pxy|² / (Pxx Pyy)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.abs(Pxy) ** 2 / (Pxx * Pyy)
+
+
+def spectral_peaks(f: np.ndarray, P: np.ndarray, lo: float, hi: float
+                   ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row peak of *P* over lo ≤ f ≤ hi, refined by a parabola through the
+    log-PSD at the peak bin and its neighbours (sub-bin frequency).
+    """
+    band = np.flatnonzero((f >= lo) & (f <= hi) & (f > 0))
+    if not len(band):
+        raise ValueError(f"no frequency bins in [{lo:g}, {hi:g}]")
+    rows = np.arange(P.shape[0])
+    k = band[np.argmax(P[:, band], axis=1)]
+    fpk, ppk = f[k].astype(float), P[rows, k].astype(float)
+    inner = (k > 0) & (k < len(f) - 1)
+    if inner.any():
+        r, kk = rows[inner], k[inner]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a, b, c = (np.log(P[r, kk - 1]), np.log(P[r, kk]), np.log(P[r, kk + 1]))
+            den = a - 2 * b + c
+            d = np.where(den < 0, 0.5 * (a - c) / den, 0.0)
+        d = np.clip(np.nan_to_num(d), -0.5, 0.5)
+        fpk[inner] = f[kk] + d * (f[1] - f[0])
+        ppk[inner] = np.exp(b - 0.25 * (a - c) * d)
+    return fpk, ppk
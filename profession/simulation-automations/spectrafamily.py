@@ -0,0 +1,213 @@
+# ───────────────────────── spectrafamily.py ─────────────────────────
+"""
+spectra family: Welch PSD / coherence / Strouhal peaks of sampler-plugin
+probes – imported by the main script.
+"""
+
+from __future__ import annotations
+import sys
+from collections import ChainMap
+from pathlib import Path
+
+import numpy as np
+
+from exprengine import ExprProgram
+from plotting import plot_line, render
+from sectionio import (_as_bool, _clean_ascii, _decimate_csv_curve, _get_any, _pd,
+                       _sort_dedupe_1d, _split_tokens, eval_expr, get_label,
+                       load_reference_csvs_with_notes, load_reference_query, read_csv_chunks)
+from spectra import (Welch, coherence as coherence_of, load_probes, parse_selection,
+                     resample, spectral_peaks, uniform_times)
+from stagetrace import stage
+
+
+SPECTRA_BLOCK_BYTES = 256 << 20     # FFT temporaries per probe block (no --max-memory)
+
+
+def _spectra_paths(sect, base, sec_name) -> dict[str, Path | None]:
+    """Files a spectra section reads and writes (shared with the batch driver)."""
+    fig = Path(_get_any(sect, base, "file", "output", default=f"{sec_name}.png"))
+    probe = _get_any(sect, base, "probe-file", "src-file", default="")
+    paths = {
+        "probe": Path(probe) if probe else None,
+        "file":  fig,
+        "csv":   Path(_get_any(sect, base, "csv-file", default=fig.with_suffix(".csv"))),
+        "peaks": Path(_get_any(sect, base, "peaks-file",
+                               default=fig.with_name(f"{fig.stem}_peaks.csv"))),
+        "coh-file": None, "coh-csv": None,
+    }
+    if str(_get_any(sect, base, "coherence", default="")).strip():
+        paths["coh-file"] = fig.with_name(f"{fig.stem}_coherence{fig.suffix}")
+        paths["coh-csv"] = fig.with_name(f"{fig.stem}_coherence.csv")
+    return paths
+
+
+def _run_spectra_family(cfg, sec_name, sect, base, env0, args, *, subcall: bool):
+    """
+    Welch PSD of `quantity` at every selected probe of a sampler-plugin CSV;
+    the probe mean (± spread with `shade-std`) is plotted against references
+    on log axes.  Optional: coherence with probe `coherence`, Strouhal
+    scaling (`strouhal-length` / `strouhal-velocity`), per-probe peaks.
+    """
+    opt = lambda key, default="": _get_any(sect, base, key, default=default)
+    paths = _spectra_paths(sect, base, sec_name)
+    if paths["probe"] is None:
+        sys.exit("[pyfr_plot] spectra family requires probe-file (sampler-plugin CSV).")
+
+    with stage("probes", sec_name):
+        try:
+            table = load_probes(paths["probe"], read_csv_chunks)
+        except (OSError, ValueError) as e:
+            sys.exit(f"[pyfr_plot] spectra: {e}")
+
+    qexpr = _clean_ascii(opt("quantity", table.fields[0] if table.fields else ""))
+    try:
+        sel = parse_selection(opt("probes", "all"), table.npts)
+        prog = ExprProgram({"q": qexpr}, [*table.fields, *env0])
+        when = lambda key, default: (float(eval_expr(_clean_ascii(opt(key)), env0))
+                                     if str(opt(key)).strip() else default)
+        t0, t1 = when("t-start", table.t[0]), when("t-end", table.t[-1])
+        length, velocity = when("strouhal-length", None), when("strouhal-velocity", None)
+    except Exception as e:
+        sys.exit(f"[pyfr_plot] spectra: {e}")
+    if not any(k in table for k in prog.names):
+        sys.exit(f"[pyfr_plot] spectra: quantity '{qexpr}' uses no probe field "
+                 f"({', '.join(table.fields)})")
+    st_scale = length / velocity if length is not None and velocity is not None else None
+
+    i0, i1 = np.searchsorted(table.t, t0), np.searchsorted(table.t, t1, side="right")
+    t = table.t[i0:i1]
+    if len(t) < 2:
+        sys.exit(f"[pyfr_plot] spectra: fewer than two steps in [{t0:g}, {t1:g}]")
+    tu = uniform_times(t)
+    n, dt = (len(t), t[1] - t[0]) if tu is None else (len(tu), tu[1] - tu[0])
+    if tu is not None:
+        print(f"[pyfr_plot] (spectra) non-uniform output times; resampled to dt = {dt:.4g}")
+    try:
+        welch = Welch(n, 1.0 / dt, window=str(opt("window", "hann")).strip().lower(),
+                      nperseg=int(opt("nperseg", 1 << max(3, int(np.log2(max(n // 8, 8)))))),
+                      overlap=float(opt("overlap", 0.5)))
+    except ValueError as e:
+        sys.exit(f"[pyfr_plot] spectra: {e}")
+
+    ref = int(opt("coherence")) if str(opt("coherence")).strip() else None
+    if ref is not None and not 0 <= ref < table.npts:
+        sys.exit(f"[pyfr_plot] spectra: coherence probe {ref} outside 0…{table.npts - 1}")
+
+    def series(idx: np.ndarray) -> np.ndarray:
+        """(probes, samples) of the quantity, on the uniform time grid."""
+        blk = ChainMap({k: np.ascontiguousarray(table[k][idx, i0:i1]).ravel()
+                        for k in prog.names if k in table}, env0)
+        q = np.asarray(prog.evaluate_block(blk)["q"], dtype=float).reshape(len(idx), -1)
+        return q if tu is None else resample(q, t, tu)
+
+    # --- batched Welch over blocks of probes ------------------------------
+    step = max(1, (args.max_memory or SPECTRA_BLOCK_BYTES) // welch.bytes_per_row())
+    psd = np.empty((len(sel), len(welch.f)))
+    coh = None if ref is None else np.empty_like(psd)
+    with stage("welch", sec_name):
+        if ref is not None:
+            Xr = welch.fft(series(np.array([ref])))
+            Pr = welch.psd(Xr)
+        for b0 in range(0, len(sel), step):
+            X = welch.fft(series(sel[b0:b0 + step]))
+            blk = slice(b0, b0 + X.shape[0])
+            psd[blk] = welch.psd(X)
+            if coh is not None:
+                coh[blk] = coherence_of(welch.csd(X, Xr), psd[blk], Pr)
+            del X
+    print(f"[pyfr_plot] (spectra) {len(sel)} probe(s) × {n} samples: {welch.nseg} segment(s) "
+          f"of {welch.nperseg}, df = {welch.f[1]:.4g}, {-(-len(sel) // step)} block(s)")
+
+    # --- per-probe peaks ---------------------------------------------------
+    f = welch.f
+    xunit = st_scale or 1.0
+    band = [float(v) for v in _split_tokens(opt("peak-range"))] or [f[1] * xunit, f[-1] * xunit]
+    with stage("peaks", sec_name):
+        try:
+            fpk, ppk = spectral_peaks(f, psd, band[0] / xunit, band[1] / xunit)
+        except ValueError as e:
+            sys.exit(f"[pyfr_plot] spectra: {e}")
+        peaks = {"probe": sel, **{c: table.coords[sel, i] for i, c in enumerate("xyz")},
+                 "f_peak": fpk}
+        if st_scale:
+            peaks["St_peak"] = fpk * st_scale
+        peaks["psd_peak"] = ppk
+        if coh is not None:
+            peaks["coherence_peak"] = [np.interp(fp, f, c) for fp, c in zip(fpk, coh)]
+        paths["peaks"].parent.mkdir(parents=True, exist_ok=True)
+        _pd().DataFrame(peaks).to_csv(paths["peaks"], index=False)
+    med = float(np.median(fpk))
+    print(f"[pyfr_plot] (spectra) median peak f = {med:.4g}"
+          + (f", St = {med * st_scale:.4g}" if st_scale else "") + f" → {paths['peaks']}")
+
+    if opt("psd-file"):
+        np.savez(opt("psd-file"), f=f, psd=psd, probes=sel, coords=table.coords[sel],
+                 **({} if coh is None else {"coherence": coh}))
+
+    # --- probe-mean curves: x(f, St), y(f, St, psd) without the DC bin -----
+    xexpr = _clean_ascii(opt("xexpr", "St" if st_scale else "f"))
+    yexpr = _clean_ascii(opt("yexpr", "psd"))
+    fe = f[1:]
+    env_f = {**env0, "f": fe, **({"St": fe * st_scale} if st_scale else {})}
+
+    def curve(per_probe: np.ndarray, expr: str, name: str):
+        env = {**env0, **{k: np.broadcast_to(v, per_probe.shape).ravel()
+                          for k, v in env_f.items() if k not in env0},
+               name: per_probe.ravel()}
+        y2 = np.asarray(eval_expr(expr, env), dtype=float).reshape(per_probe.shape)
+        return y2.mean(axis=0), y2.std(axis=0)
+
+    try:
+        with stage("eval", sec_name):
+            x = np.asarray(eval_expr(xexpr, env_f), dtype=float)
+            y, ys = curve(psd[:, 1:], yexpr, "psd")
+            if coh is not None:
+                others = sel != ref
+                cy, cs = curve(coh[others if others.any() else slice(None), 1:], "coh", "coh")
+    except Exception as e:
+        sys.exit(f"[pyfr_plot] Expression error → {e}")
+
+    shade = _as_bool(opt("shade-std"))
+    no_plot = getattr(args, "no_plot", False)
+
+    def write_csv(path: Path, x, y, s):
+        x1, y1, s1 = _sort_dedupe_1d(x, y, s)
+        if _as_bool(opt("csv-decimate")):
+            with stage("decimate", sec_name):
+                x1, y1, s1 = _decimate_csv_curve(x1, y1, s1, tol=opt("csv-tol"),
+                                                 rtol=opt("csv-rtol", "1e-3"),
+                                                 max_points=opt("csv-max-points"))
+        with stage("write_csv", sec_name):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _pd().DataFrame({"x": x1, "y": y1, **({"std": s1} if s1 is not None else {})}
+                            ).to_csv(path, index=False)
+        print(f"[pyfr_plot] Wrote plot-aligned CSV → {path}")
+
+    write_csv(paths["csv"], x, y, ys if shade else None)
+    if coh is not None:
+        write_csv(paths["coh-csv"], x, cy, cs if shade else None)
+    if no_plot:
+        return
+
+    with stage("refs", sec_name):
+        refs = (load_reference_csvs_with_notes(opt("reference"))
+                + load_reference_query(opt("reference-query")))
+    xlabel = get_label(cfg, sect, base, "xlabel", fallback=r"$St$" if st_scale else r"$f$")
+    title = get_label(cfg, sect, base, "title", fallback=sec_name)
+    xscale = str(opt("xscale", "log")).strip()
+    label = "PyFR" if len(sel) == 1 else f"PyFR, mean of {len(sel)} probes"
+    render(args, sec_name, plot_line,
+           x, y, ys if shade else None, refs, paths["file"],
+           xlabel=xlabel, ylabel=get_label(cfg, sect, base, "ylabel", fallback=yexpr),
+           title=title, show_legend=not args.no_legend,
+           show_ref_notes=not args.no_ref_notes, pyfr_label=label,
+           xscale=xscale, yscale=str(opt("yscale", "log")).strip())
+    if coh is not None:
+        with stage("refs", sec_name):
+            crefs = load_reference_csvs_with_notes(opt("coherence-reference"))
+        render(args, sec_name, plot_line,
+               x, cy, cs if shade else None, crefs, paths["coh-file"],
+               xlabel=xlabel, ylabel=rf"$\gamma^2$ (probe {ref})", title=title,
+               show_legend=not args.no_legend, show_ref_notes=not args.no_ref_notes,
+               pyfr_label=label, xscale=xscale, yscale="linear")
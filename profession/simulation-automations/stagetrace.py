@@ -0,0 +1,163 @@
+# ───────────────────────── stagetrace.py ─────────────────────────
+"""
+Per-stage wall / CPU / peak-RSS trace in Chrome trace format – imported by the main script.
+
+    with stage("eval", section):
+        ...
+
+records one complete ("ph": "X") event per block.  Timestamps are wall-clock
+microseconds, so events gathered from pool workers and the render process
+line up on one timeline in chrome://tracing or https://ui.perfetto.dev.
+
+Each stage's peak RSS is its own: the kernel's high-water mark (`VmHWM`) is
+reset when a stage starts (`5` → `/proc/self/clear_refs`) and read when it
+ends, and every reset first folds the mark into the stages still open, so
+nested stages keep correct peaks.  Child processes cannot be reset; a
+stage reports `child_peak_mib` only when the children's lifetime maximum
+rose during it.  Without `/proc` (non-Linux) the process figure falls back
+to the lifetime `ru_maxrss` and the event says `"rss": "lifetime"`.
+"""
+
+from __future__ import annotations
+import contextlib
+import json
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+
+def _rss_mib(who=resource.RUSAGE_SELF) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024.0      # Linux: KiB
+
+
+def _hwm_mib() -> float | None:
+    """Peak RSS since the last reset (`VmHWM`), None without /proc."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _child_cpu() -> float:
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.events: list[dict] = []
+        self.role = "main"
+        self._open: list[list[float]] = []        # running peak of every open stage
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def enable(self, role: str = "main"):
+        self.enabled = True
+        self.role = role
+        if self._pid != os.getpid():              # forked: the parent's stages are not open here
+            self._open, self._pid = [], os.getpid()
+            self._lock = threading.Lock()
+
+    def _fold_peak(self) -> bool:
+        """Fold VmHWM into every open stage, then reset it; False without /proc."""
+        hwm = _hwm_mib()
+        if hwm is None:
+            return False
+        for peak in self._open:
+            peak[0] = max(peak[0], hwm)
+        return _reset_hwm()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, section: str = "", **info):
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            per_stage = self._fold_peak()
+            peak = [_hwm_mib() or 0.0]
+            self._open.append(peak)
+        kmax0 = _rss_mib(resource.RUSAGE_CHILDREN)
+        t0, c0, k0 = time.time_ns(), time.process_time(), _child_cpu()
+        try:
+            yield
+        finally:
+            t1, c1, k1 = time.time_ns(), time.process_time(), _child_cpu()
+            with self._lock:
+                per_stage = self._fold_peak() and per_stage
+                del self._open[next(i for i, p in enumerate(self._open) if p is peak)]
+            kmax1 = _rss_mib(resource.RUSAGE_CHILDREN)
+            rss = ({"peak_mib": peak[0]} if per_stage else
+                   {"peak_mib": _rss_mib(), "rss": "lifetime"})
+            self.events.append({
+                "name": name, "cat": section or "run", "ph": "X",
+                "ts": t0 / 1e3, "dur": (t1 - t0) / 1e3,
+                "pid": os.getpid(), "tid": threading.get_ident() % 100000,
+                "args": {"section": section, "cpu_ms": (c1 - c0) * 1e3,
+                         "child_cpu_ms": (k1 - k0) * 1e3,
+                         **rss, "child_peak_mib": kmax1 if kmax1 > kmax0 else None,
+                         **info},
+            })
+
+    def take(self) -> list[dict]:
+        """Hand recorded events to the parent (pool / render workers)."""
+        # a forked worker starts with a copy of the parent's list: keep our own
+        ev = [e for e in self.events if e.get("pid") == os.getpid()]
+        self.events = []
+        if ev:
+            ev.append({"name": "process_name", "ph": "M", "pid": os.getpid(),
+                       "args": {"name": f"{self.role} {os.getpid()}"}})
+        return ev
+
+    def extend(self, events: list[dict]):
+        if self.enabled and events:
+            self.events.extend(events)
+
+    # ---------- output -----------------------------------------------------
+    def write(self, path: Path):
+        main = [{"name": "process_name", "ph": "M", "pid": os.getpid(),
+                 "args": {"name": f"{self.role} {os.getpid()}"}}]
+        doc = {"traceEvents": main + self.events, "displayTimeUnit": "ms"}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+        tmp.write_text(json.dumps(doc))
+        os.replace(tmp, path)
+
+    def summary(self) -> list[str]:
+        """One line per stage: count, wall, CPU (+ children), peak RSS (own or children's)."""
+        agg = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+        for e in self.events:
+            if e.get("ph") != "X":
+                continue
+            a = agg[e["name"]]
+            a[0] += 1
+            a[1] += e["dur"] / 1e3
+            a[2] += e["args"]["cpu_ms"]
+            a[3] += e["args"]["child_cpu_ms"]
+            a[4] = max(a[4], e["args"]["peak_mib"], e["args"]["child_peak_mib"] or 0.0)
+        rows = sorted(agg.items(), key=lambda kv: -kv[1][1])
+        out = [f"{'stage':<16}{'n':>5}{'wall ms':>11}{'cpu ms':>11}{'child cpu':>11}{'peak MiB':>10}"]
+        out += [f"{k:<16}{n:>5}{w:>11.1f}{c:>11.1f}{k2:>11.1f}{r:>10.1f}"
+                for k, (n, w, c, k2, r) in rows]
+        return out
+
+
+TRACE = Tracer()
+stage = TRACE.stage
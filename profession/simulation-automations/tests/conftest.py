@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the helper modules are imported by the main script from its own directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
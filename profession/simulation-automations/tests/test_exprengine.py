@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from exprengine import CHUNK_ROWS, ExprError, ExprProgram
+
+
+def old_eval(expr, env):
+    """The eval-based `eval_expr` the compiled programs replaced."""
+    allowed = {**env, "np": np, "sqrt": np.sqrt, "sin": np.sin, "cos": np.cos,
+               "tan": np.tan, "log": np.log, "exp": np.exp, "pi": np.pi}
+    return eval(expr, {"__builtins__": {}}, allowed)
+
+
+def compiled(expr, env, **kw):
+    return ExprProgram({"_": expr}, env).evaluate(env, **kw)["_"]
+
+
+@pytest.fixture
+def env():
+    rng = np.random.default_rng(1)
+    n = 2 * CHUNK_ROWS + 123                      # not a multiple of the block size
+    u = rng.normal(size=n)
+    u[::97] = np.nan
+    return {"u": u, "y": rng.uniform(-2, 2, n), "avg_upup": rng.uniform(1, 2, n),
+            "Uin": 1.5, "D": 2.0}
+
+
+ELEMENTWISE = [
+    "u/Uin", "y/D", "sqrt(avg_upup - u**2)", "u*y + y*u", "np.pi*y - pi*y + np.e",
+    "np.where(y > 0, u, 0)", "np.clip(u, 0, None)", "np.nan_to_num(u, nan=0)",
+    "np.abs(u) >= 1", "(y > 0) & (u < 0) | ~(y > 1)", "-u**2 % 3", "y // 0.5",
+    "np.hypot(u, y)", "exp(-y**2) * cos(pi*y)",
+]
+WHOLE_COLUMN = ["u - np.nanmean(u)", "y / y.max()", "np.cumsum(y)", "y - np.mean(y*2)"]
+
+
+@pytest.mark.parametrize("expr", ELEMENTWISE)
+def test_elementwise_matches_eval_and_is_blocked(env, expr):
+    prog = ExprProgram({"_": expr}, env)
+    assert prog.chunkable
+    with np.errstate(invalid="ignore"):
+        ref = np.asarray(old_eval(expr, env), dtype=float)
+        for chunk in (CHUNK_ROWS, 1000, 7):
+            np.testing.assert_array_equal(prog.evaluate(env, chunk=chunk)["_"], ref)
+
+
+@pytest.mark.parametrize("expr", WHOLE_COLUMN)
+def test_whole_column_calls_are_not_blocked(env, expr):
+    prog = ExprProgram({"_": expr}, env)
+    assert not prog.chunkable
+    np.testing.assert_allclose(prog.evaluate(env, chunk=1000)["_"], old_eval(expr, env),
+                               rtol=1e-15, equal_nan=True)
+
+
+def test_chained_comparison(env):
+    expr = "-1 < y <= 1"
+    got = compiled(expr, env)
+    np.testing.assert_array_equal(got, old_eval("(-1 < y) & (y <= 1)", env))
+    for y in (-2.0, 0.0, 1.0, 1.5):               # eval handles the chain on scalars
+        assert compiled(expr, {"y": y}) == float(old_eval(expr, {"y": y}))
+
+
+@pytest.mark.parametrize("expr", ["u[1:-1]", "u[::2] + 1", "u[y > 0]", "u[1:-1] - u[:-2]"])
+def test_subscripts_keep_their_length(env, expr):
+    prog = ExprProgram({"_": expr}, env)
+    assert not prog.chunkable
+    np.testing.assert_array_equal(prog.evaluate(env)["_"], old_eval(expr, env))
+
+
+def test_scalar_subscript_broadcasts(env):
+    np.testing.assert_array_equal(compiled("u[0] + y", env), old_eval("u[0] + y", env))
+    np.testing.assert_array_equal(compiled("u[-1]", env), np.full(len(env["u"]), env["u"][-1]))
+
+
+def test_scalar_only_outputs(env):
+    scalars = {k: v for k, v in env.items() if np.ndim(v) == 0}
+    out = ExprProgram({"a": "Uin/D", "b": "sqrt(Uin)*pi", "c": "1 == 1.0"}, scalars).evaluate(scalars)
+    assert out == {"a": 0.75, "b": np.sqrt(1.5) * np.pi, "c": 1.0}
+    assert all(isinstance(v, float) for v in out.values())
+
+
+def test_shared_subexpressions_and_commutative_operands(env):
+    prog = ExprProgram({"x": "u*y + 1", "y": "y*u - 1", "s": "sqrt(y*u + 1)"}, env)
+    assert sum(1 for kind, *_ in prog.ops if kind == "bin") == 3   # y*u, +1, -1
+    with np.errstate(invalid="ignore"):
+        out = prog.evaluate(env, chunk=1000)
+        for k in ("x", "y", "s"):
+            np.testing.assert_array_equal(out[k], old_eval(prog.sources[k], env))
+
+
+def test_constants_keep_their_type():
+    out = ExprProgram({"a": "True + 1", "b": "1.0 + 1", "c": "7 // 2"}, []).evaluate({})
+    assert out == {"a": 2.0, "b": 2.0, "c": 3.0}
+
+
+def test_unknown_names_and_syntax():
+    with pytest.raises(ExprError, match="unknown name"):
+        ExprProgram({"_": "u + w"}, ["u"])
+    with pytest.raises(ExprError, match="unsupported syntax"):
+        ExprProgram({"_": "[u for u in u]"}, ["u"])
+    with pytest.raises(ExprError, match="not a NumPy function"):
+        ExprProgram({"_": "np.pi(u)"}, ["u"])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from podsvd import SnapshotMatrix, randomized_svd
+
+
+def _snapshots(m=40, n=300, seed=4):
+    """m snapshots of n values with a quickly decaying spectrum, plus a mean."""
+    rng = np.random.default_rng(seed)
+    u = np.linalg.qr(rng.normal(size=(n, 12)))[0]
+    v = np.linalg.qr(rng.normal(size=(m, 12)))[0]
+    s = 10.0 * 0.5 ** np.arange(12)
+    return (v * s) @ u.T + rng.normal(size=n)
+
+
+@pytest.mark.parametrize("block", [1, 7, 64])
+@pytest.mark.parametrize("center", [True, False])
+def test_matches_dense_svd(block, center):
+    X = _snapshots()
+    sel = np.arange(len(X))
+    pod = randomized_svd(X, sel, 5, block=block, center=center)
+    Xc = X - X.mean(axis=0) if center else X
+    U, s, Vt = np.linalg.svd(Xc.T, full_matrices=False)
+
+    np.testing.assert_allclose(pod["sigma"], s[:5], rtol=1e-8)
+    np.testing.assert_allclose(pod["energy"], np.sum(Xc * Xc), rtol=1e-12)
+    np.testing.assert_allclose(pod["mean"], X.mean(axis=0) if center else 0.0, atol=1e-12)
+    np.testing.assert_allclose(np.abs(pod["modes"].T @ U[:, :5]), np.eye(5), atol=1e-6)
+    # modes · coeffs reproduce the rank-5 truncation of the snapshots
+    np.testing.assert_allclose(pod["modes"] @ pod["coeffs"], (U[:, :5] * s[:5]) @ Vt[:5],
+                               atol=1e-6)
+
+
+def test_selection_and_rank_limit():
+    X = _snapshots(m=30)
+    sel = np.arange(0, 30, 3)                     # 10 snapshots
+    pod = randomized_svd(X, sel, 25)
+    assert len(pod["sigma"]) == 10 and pod["coeffs"].shape == (10, 10)
+    Xc = X[sel] - X[sel].mean(axis=0)
+    np.testing.assert_allclose(pod["sigma"][:9], np.linalg.svd(Xc, compute_uv=False)[:9],
+                               rtol=1e-8)
+
+
+def test_signs_are_deterministic():
+    X = _snapshots()
+    a = randomized_svd(X, np.arange(len(X)), 3, seed=0)
+    b = randomized_svd(X, np.arange(len(X)), 3, seed=1)
+    np.testing.assert_allclose(a["modes"], b["modes"], atol=1e-6)
+    idx = np.abs(a["modes"]).argmax(axis=0)
+    assert np.all(a["modes"][idx, np.arange(3)] > 0)
+
+
+def test_snapshot_matrix_round_trip(tmp_path):
+    meta = {"pts": "abc", "quantity": ["u"]}
+    mat = SnapshotMatrix.open(tmp_path, meta)
+    rows = np.arange(12.0).reshape(3, 4)
+    for i, r in enumerate(rows):
+        mat.append(f"s{i}", r)
+    mat.save()
+    mat.append("unsaved", rows[0])                # not in the index → dropped on reopen
+
+    again = SnapshotMatrix.open(tmp_path, meta)
+    assert again.names == ["s0", "s1", "s2"]
+    np.testing.assert_array_equal(again.rows(), rows)
+    np.testing.assert_array_equal(again.select(["s2", "s0"]), [2, 0])
+    with pytest.raises(ValueError):
+        again.append("bad", np.ones(5))
+    assert SnapshotMatrix.open(tmp_path, {**meta, "pts": "other"}).names == []
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from spectra import Welch, coherence, resample, spectral_peaks, uniform_times
+
+FS = 200.0
+
+
+def _tone(f0, n=4096, fs=FS, amp=1.0, phase=0.0, noise=0.0, seed=0, t=None):
+    t = np.arange(n) / fs if t is None else t
+    rng = np.random.default_rng(seed)
+    return amp * np.sin(2 * np.pi * f0 * t + phase) + noise * rng.standard_normal(len(t))
+
+
+def _welch_loop(x, fs, nperseg, noverlap):
+    """scipy.signal.welch(x, fs, 'hann', nperseg, noverlap) written out segment by segment."""
+    win = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+    acc = []
+    for s in range(0, len(x) - nperseg + 1, nperseg - noverlap):
+        seg = x[s:s + nperseg]
+        acc.append(np.abs(np.fft.rfft((seg - seg.mean()) * win)) ** 2)
+    p = np.mean(acc, axis=0) / (fs * np.sum(win ** 2))
+    p[1:-1 if nperseg % 2 == 0 else None] *= 2
+    return p
+
+
+@pytest.mark.parametrize("nperseg,overlap", [(256, 0.5), (255, 0.25), (512, 0.0)])
+def test_psd_matches_segment_loop(nperseg, overlap):
+    x = _tone(23.0, noise=0.5)
+    w = Welch(len(x), FS, nperseg=nperseg, overlap=overlap)
+    ref = _welch_loop(x, FS, nperseg, int(round(overlap * nperseg)))
+    np.testing.assert_allclose(w.psd(w.fft(x[None]))[0], ref, rtol=1e-10)
+
+
+def test_psd_matches_scipy():
+    signal = pytest.importorskip("scipy.signal")
+    x = _tone(23.0, noise=0.5)
+    w = Welch(len(x), FS, nperseg=256, overlap=0.5)
+    f, ref = signal.welch(x, FS, window="hann", nperseg=256, noverlap=128)
+    np.testing.assert_allclose(w.f, f)
+    np.testing.assert_allclose(w.psd(w.fft(x[None]))[0], ref, rtol=1e-10)
+    y = np.roll(x, 3) + _tone(40.0, noise=0.5, seed=1)
+    _, cref = signal.coherence(x, y, FS, window="hann", nperseg=256, noverlap=128)
+    X, Y = w.fft(x[None]), w.fft(y[None])
+    np.testing.assert_allclose(coherence(w.csd(X, Y), w.psd(X), w.psd(Y))[0], cref, rtol=1e-8)
+
+
+def test_power_is_conserved():
+    # one-sided density integrates to the variance: A²/2 for a tone, σ² for noise
+    x = _tone(31.0, amp=2.0)
+    w = Welch(len(x), FS, nperseg=512)
+    assert np.sum(w.psd(w.fft(x[None]))) * w.f[1] == pytest.approx(2.0, rel=0.02)
+    noise = np.random.default_rng(5).normal(0, 0.7, 1 << 15)
+    w = Welch(len(noise), FS, nperseg=256)
+    assert np.sum(w.psd(w.fft(noise[None]))) * w.f[1] == pytest.approx(0.49, rel=0.03)
+
+
+def test_batches_of_probes_match_single_rows():
+    rows = np.stack([_tone(f0, noise=0.3, seed=i) for i, f0 in enumerate((11.0, 17.5, 42.0, 60.3, 77.7))])
+    w = Welch(rows.shape[1], FS, nperseg=256)
+    whole = w.psd(w.fft(rows))
+    for step in (1, 2, 3):
+        parts = np.concatenate([w.psd(w.fft(rows[b:b + step])) for b in range(0, len(rows), step)])
+        np.testing.assert_allclose(parts, whole, rtol=1e-12)
+
+
+@pytest.mark.parametrize("f0", [12.0, 23.37, 41.9, 66.61])
+def test_peak_of_a_tone_between_bins(f0):
+    x = _tone(f0, n=8192, noise=0.05)
+    w = Welch(len(x), FS, nperseg=512)
+    fpk, ppk = spectral_peaks(w.f, w.psd(w.fft(x[None])), 1.0, 90.0)
+    df = w.f[1]
+    assert abs(fpk[0] - f0) < 0.15 * df
+    assert ppk[0] > 0
+
+
+def test_peaks_per_row_and_band_limits():
+    rows = np.stack([_tone(10.0) + 3 * _tone(50.0), _tone(30.0)])
+    w = Welch(rows.shape[1], FS, nperseg=512)
+    P = w.psd(w.fft(rows))
+    fpk, _ = spectral_peaks(w.f, P, 1.0, 90.0)
+    np.testing.assert_allclose(fpk, [50.0, 30.0], atol=0.1 * w.f[1])
+    fpk, _ = spectral_peaks(w.f, P, 1.0, 20.0)     # the band hides the stronger tone
+    assert abs(fpk[0] - 10.0) < 0.1 * w.f[1]
+    with pytest.raises(ValueError):
+        spectral_peaks(w.f, P, 1000.0, 2000.0)
+
+
+def test_coherence_of_shared_tone():
+    n = 1 << 14
+    x = _tone(25.0, n=n, noise=1.0, seed=1)
+    y = _tone(25.0, n=n, phase=1.0) + _tone(25.0, n=n, amp=0.0, noise=1.0, seed=2)
+    w = Welch(n, FS, nperseg=256)
+    X, Y = w.fft(x[None]), w.fft(y[None])
+    coh = coherence(w.csd(X, Y), w.psd(X), w.psd(Y))[0]
+    k = np.argmin(np.abs(w.f - 25.0))
+    assert coh[k] > 0.9
+    assert np.median(coh) < 0.05
+    np.testing.assert_allclose(coherence(w.csd(X, X), w.psd(X), w.psd(X))[0][1:], 1.0, rtol=1e-10)
+
+
+def test_uniform_times():
+    t = 0.1 + np.arange(100) * 0.02
+    assert uniform_times(t) is None
+    rng = np.random.default_rng(6)
+    tj = np.sort(np.r_[0.0, np.cumsum(rng.uniform(0.8, 1.2, 999))]) * 0.01
+    tu = uniform_times(tj)
+    dt = np.median(np.diff(tj))
+    np.testing.assert_allclose(np.diff(tu), dt, rtol=1e-9)
+    assert tu[0] == tj[0] and tj[-1] - dt < tu[-1] <= tj[-1]
+
+
+def test_resample_is_exact_for_linear_rows():
+    t = np.array([0.0, 0.5, 1.5, 1.7, 3.0])
+    tu = np.linspace(0.0, 3.0, 13)
+    block = np.stack([2 * t + 1, -t])
+    np.testing.assert_allclose(resample(block, t, tu), np.stack([2 * tu + 1, -tu]))
+
+
+def test_peak_survives_non_uniform_steps():
+    rng = np.random.default_rng(7)
+    f0, dt = 17.3, 1.0 / FS
+    t = np.r_[0.0, np.cumsum(rng.uniform(0.7, 1.3, 8191) * dt)]
+    x = _tone(f0, t=t)
+    tu = uniform_times(t)
+    assert tu is not None
+    xu = resample(x[None], t, tu)
+    w = Welch(len(tu), 1.0 / (tu[1] - tu[0]), nperseg=512)
+    fpk, _ = spectral_peaks(w.f, w.psd(w.fft(xu)), 1.0, 80.0)
+    assert abs(fpk[0] - f0) < 0.2 * w.f[1]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import stagetrace
+from stagetrace import Tracer
+
+
+def _touch(mib):
+    a = np.ones(int(mib * 2**20) // 8)
+    a += 1.0
+    return float(a[-1])
+
+
+@pytest.mark.skipif(stagetrace._hwm_mib() is None or not stagetrace._reset_hwm(),
+                    reason="needs /proc/self/status and clear_refs")
+def test_peaks_are_per_stage_and_nest():
+    tr = Tracer()
+    tr.enable()
+    with tr.stage("outer"):
+        with tr.stage("big"):
+            _touch(200)
+        with tr.stage("small"):
+            _touch(1)
+    with tr.stage("after"):
+        pass
+    peak = {e["name"]: e["args"]["peak_mib"] for e in tr.events}
+    assert "rss" not in tr.events[0]["args"]
+    assert peak["big"] - peak["small"] > 150
+    assert peak["outer"] >= peak["big"]
+    assert peak["after"] < peak["big"] - 150
+
+
+def test_lifetime_fallback_without_proc(monkeypatch):
+    monkeypatch.setattr(stagetrace, "_hwm_mib", lambda: None)
+    tr = Tracer()
+    tr.enable()
+    with tr.stage("s"):
+        pass
+    (ev,) = tr.events
+    assert ev["args"]["rss"] == "lifetime"
+    assert ev["args"]["peak_mib"] == pytest.approx(stagetrace._rss_mib(), rel=0.05)
+
+
+def test_take_keeps_only_this_process():
+    tr = Tracer()
+    tr.enable("worker")
+    with tr.stage("own"):
+        pass
+    tr.events.append({"name": "inherited", "ph": "X", "pid": -1, "args": {}})
+    names = [e["name"] for e in tr.take()]
+    assert names == ["own", "process_name"]
+    assert tr.events == []
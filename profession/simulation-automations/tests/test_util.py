@@ -0,0 +1,101 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from util import axis_weights, parse_axes, reduce_grid, trapz_weights
+
+SHAPE = (6, 5, 8)
+AXES = [(0,), (1,), (2,), (0, 2), (1, 2), (0, 1, 2)]
+CHUNKS = [1, 7, 40, 10**9]                   # one slab per block … a single block
+CASES = list(itertools.product(AXES, CHUNKS))
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(2)
+    a = rng.normal(1.0, 1.0, SHAPE)
+    s = rng.uniform(0.05, 0.2, SHAPE)
+    coords = np.meshgrid(np.cumsum(rng.uniform(0.5, 1.5, SHAPE[0])),
+                         np.cumsum(rng.uniform(0.5, 1.5, SHAPE[1])),
+                         np.cumsum(rng.uniform(0.5, 1.5, SHAPE[2])), indexing="ij")
+    return a, s, {i: c.ravel() for i, c in enumerate(coords)}
+
+
+def test_trapz_weights_integrate_like_trapezoid():
+    x = np.array([0.0, 0.1, 0.4, 1.0, 1.2])
+    f = np.sin(x)
+    assert np.dot(trapz_weights(x), f) == pytest.approx(np.trapezoid(f, x))
+    np.testing.assert_array_equal(trapz_weights([3.0]), [1.0])
+
+
+def test_parse_axes():
+    assert parse_axes("z") == (2,)
+    assert parse_axes("z, x") == (0, 2)
+    with pytest.raises(ValueError):
+        parse_axes("xw")
+
+
+@pytest.mark.parametrize("axes,chunk", CASES)
+def test_weighted_mean_and_rms_match_np_average(grid, axes, chunk):
+    a, _, coords = grid
+    w = axis_weights(coords, SHAPE, axes)
+    wb = np.broadcast_to(w, SHAPE)
+    got = reduce_grid(a.ravel(), SHAPE, axes, "mean", weights=w, chunk=chunk)
+    np.testing.assert_allclose(got, np.average(a, axis=axes, weights=wb, keepdims=True), rtol=1e-12)
+    got = reduce_grid(a.ravel(), SHAPE, axes, "rms", weights=w, chunk=chunk)
+    ref = np.sqrt(np.average(a * a, axis=axes, weights=wb, keepdims=True))
+    np.testing.assert_allclose(got, ref, rtol=1e-12)
+
+
+@pytest.mark.parametrize("axes,chunk", CASES)
+def test_order_statistics_match_numpy(grid, axes, chunk):
+    a = grid[0]
+    for op, ref in (("min", np.min(a, axis=axes, keepdims=True)),
+                    ("max", np.max(a, axis=axes, keepdims=True)),
+                    ("median", np.median(a, axis=axes, keepdims=True)),
+                    ("p90", np.percentile(a, 90, axis=axes, keepdims=True))):
+        np.testing.assert_allclose(reduce_grid(a.ravel(), SHAPE, axes, op, chunk=chunk), ref,
+                                   rtol=1e-12, err_msg=op)
+
+
+@pytest.mark.parametrize("axes,chunk", CASES)
+def test_mean_sigma_is_propagated(grid, axes, chunk):
+    a, s, coords = grid
+    w = np.broadcast_to(axis_weights(coords, SHAPE, axes), SHAPE)
+    _, sig = reduce_grid(a.ravel(), SHAPE, axes, "mean", weights=w, std=s.ravel(), chunk=chunk)
+    ref = np.sqrt(((w * s) ** 2).sum(axis=axes, keepdims=True)) / w.sum(axis=axes, keepdims=True)
+    np.testing.assert_allclose(sig, ref, rtol=1e-12)
+
+
+@pytest.mark.parametrize("op", ["mean", "rms"])
+def test_sigma_matches_monte_carlo_spread(grid, op):
+    a, s, _ = grid
+    a = np.abs(a) + 1.0                           # keep rms away from 0 (linearization)
+    _, sig = reduce_grid(a.ravel(), SHAPE, (1, 2), op, std=s.ravel(), chunk=40)
+    rng = np.random.default_rng(3)
+    draws = np.stack([reduce_grid((a + s * rng.standard_normal(SHAPE)).ravel(), SHAPE, (1, 2), op)
+                      for _ in range(4000)])
+    np.testing.assert_allclose(sig, draws.std(axis=0), rtol=0.1)
+
+
+def test_one_dimensional_weights_go_on_the_reduced_axis():
+    a = np.arange(24.0).reshape(2, 3, 4)
+    got = reduce_grid(a.ravel(), (2, 3, 4), (1,), weights=np.array([1.0, 0.0, 3.0]), chunk=4)
+    ref = np.average(a, axis=1, weights=[1.0, 0.0, 3.0], keepdims=True)
+    np.testing.assert_allclose(got, ref)
+    with pytest.raises(ValueError, match="no reduced axis"):
+        reduce_grid(a.ravel(), (2, 3, 4), (1,), weights=np.ones(4))
+    with pytest.raises(ValueError, match="more than one"):
+        reduce_grid(np.ones(27), (3, 3, 3), (0, 1), weights=np.ones(3))
+    with pytest.raises(ValueError, match="do not broadcast"):
+        reduce_grid(a.ravel(), (2, 3, 4), (1,), weights=np.ones((2, 2, 1)))
+
+
+@pytest.mark.parametrize("chunk", CHUNKS)
+def test_scalar_and_per_point_weights(grid, chunk):
+    a = grid[0]
+    ref = a.mean(axis=(0, 2), keepdims=True)
+    np.testing.assert_allclose(reduce_grid(a.ravel(), SHAPE, (0, 2), weights=2.5, chunk=chunk), ref)
+    np.testing.assert_allclose(reduce_grid(a.ravel(), SHAPE, (0, 2), weights=np.full(a.size, 0.5),
+                                           chunk=chunk), ref)
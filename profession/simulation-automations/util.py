@@ -4,8 +4,11 @@
 from __future__ import annotations
 from pathlib import Path
 import glob
+from typing import TYPE_CHECKING
 import numpy as np
-import pandas as pd
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ---------- geometry helpers -------------------------------------------------
 def infer_nx_ny_nz(arr_len: int, spacings: str) -> tuple[int, int, int]:
@@ -27,16 +30,239 @@ def spanwise_mean(arr: np.ndarray, nx: int, ny: int, nz: int) -> np.ndarray:
     otherwise over *y*.  Either *(nx==1 xor ny==1)* must hold.
     """
     if (nx == 1) ^ (ny == 1):
-        new_shape = (ny, nz) if nx == 1 else (nx, nz)
-        return arr.reshape(new_shape).mean(axis=1)
+        return reduce_grid(arr, (nx, ny, nz), (2,)).ravel()
     raise ValueError("Cannot collapse z when both nx and ny are > 1")
 
 
+# ---------- axis reduction ---------------------------------------------------
+AXES = "xyz"
+REDUCE_CHUNK = 1 << 22          # grid values touched per block (≈32 MiB of f8)
+
+
+def parse_axes(spec: str) -> tuple[int, ...]:
+    """`z` / `y,z` / `xz` → sorted axis indices into (nx, ny, nz)."""
+    letters = [c for c in str(spec).lower() if not c.isspace() and c != ","]
+    bad = [c for c in letters if c not in AXES]
+    if bad:
+        raise ValueError(f"reduce axes must be among x, y, z (got {spec!r})")
+    return tuple(sorted({AXES.index(c) for c in letters}))
+
+
+def parse_op(op: str) -> tuple[str, float | None]:
+    """`mean` | `rms` | `min` | `max` | `median` | `pNN` → (kind, percentile)."""
+    op = str(op or "mean").strip().lower()
+    if op in ("mean", "rms", "min", "max"):
+        return op, None
+    if op == "median":
+        return "pct", 50.0
+    if op.startswith("p"):
+        try:
+            q = float(op[1:])
+        except ValueError:
+            q = -1.0
+        if 0.0 <= q <= 100.0:
+            return "pct", q
+    raise ValueError(f"unknown reduce-op {op!r} (mean, rms, min, max, median, pNN)")
+
+
+def trapz_weights(coord: np.ndarray) -> np.ndarray:
+    """Trapezoid-rule weights for 1-D sample positions (non-uniform allowed)."""
+    coord = np.asarray(coord, dtype=float)
+    if coord.size < 2:
+        return np.ones_like(coord)
+    d = np.abs(np.diff(coord))
+    w = np.empty_like(coord)
+    w[0], w[-1] = d[0] / 2, d[-1] / 2
+    w[1:-1] = (d[:-1] + d[1:]) / 2
+    return w
+
+
+def axis_weights(coords: dict[int, np.ndarray], shape: tuple[int, int, int],
+                 axes: tuple[int, ...]) -> np.ndarray:
+    """
+    Separable trapezoid weights over *axes*, broadcastable against the grid.
+    *coords* maps axis → the flat coordinate array of that axis (x, y or z).
+    """
+    w = np.ones((1, 1, 1))
+    for a in axes:
+        line = np.asarray(coords[a]).reshape(shape)
+        line = line[tuple(slice(None) if i == a else 0 for i in range(3))]
+        w = w * trapz_weights(line).reshape([-1 if i == a else 1 for i in range(3)])
+    return w
+
+
+def _reduce_block(a, s, w, axes, kind, q):
+    """Reduce one block; returns (value, σ or None) with *axes* kept as size 1."""
+    if kind in ("mean", "rms"):
+        if w is None:
+            w = np.ones((1, 1, 1))
+        w = np.broadcast_to(w, a.shape)
+        W = w.sum(axis=axes, keepdims=True)
+        if kind == "mean":
+            val = (w * a).sum(axis=axes, keepdims=True) / W
+            # independent errors: σ = √Σ(wσ)² / Σw   (uniform: √Σσ² / n)
+            sig = None if s is None else np.sqrt(((w * s) ** 2).sum(axis=axes, keepdims=True)) / W
+        else:
+            val = np.sqrt((w * a * a).sum(axis=axes, keepdims=True) / W)
+            # d rms / d a_i = w_i a_i / (W rms)
+            sig = None if s is None else (
+                np.sqrt(((w * a * s) ** 2).sum(axis=axes, keepdims=True))
+                / np.where(val == 0, np.inf, W * val))
+        return val, sig
+
+    if kind == "min":
+        val = a.min(axis=axes, keepdims=True)
+    elif kind == "max":
+        val = a.max(axis=axes, keepdims=True)
+    else:
+        val = np.percentile(a, q, axis=axes, keepdims=True)
+    if s is None:
+        return val, None
+    # order statistics: carry σ of the sample closest to the result
+    kept = [i for i in range(3) if i not in axes]
+    flat = np.moveaxis(a - val, kept, range(len(kept))).reshape(*(a.shape[i] for i in kept), -1)
+    sflat = np.moveaxis(np.broadcast_to(s, a.shape), kept, range(len(kept))).reshape(flat.shape)
+    pick = np.abs(flat).argmin(axis=-1)[..., None]
+    return val, np.take_along_axis(sflat, pick, axis=-1).reshape(val.shape)
+
+
+def _grid_weights(weights, shape: tuple[int, int, int], axes: tuple[int, ...]) -> np.ndarray:
+    """*weights* as a 3-D array broadcastable to *shape* (see `reduce_grid`)."""
+    w = np.asarray(weights, dtype=float)
+    if w.ndim == 0:
+        return w.reshape(1, 1, 1)
+    if w.size == int(np.prod(shape)):
+        return w.reshape(shape)
+    if w.ndim == 1:
+        along = [a for a in axes if shape[a] == len(w)]
+        if len(along) != 1:
+            raise ValueError(f"{len(w)} weights match {'no' if not along else 'more than one'} "
+                             f"reduced axis of the {shape} grid; give 3-D weights")
+        return w.reshape([-1 if i == along[0] else 1 for i in range(3)])
+    if w.ndim != 3:
+        raise ValueError(f"weights of shape {w.shape}: give a scalar, one per point, "
+                         f"1-D along a reduced axis or 3-D")
+    try:
+        np.broadcast_shapes(w.shape, shape)
+    except ValueError:
+        raise ValueError(f"weights of shape {w.shape} do not broadcast to the {shape} grid") from None
+    return w
+
+
+def reduce_grid(arr, shape: tuple[int, int, int], axes: tuple[int, ...],
+                op: str = "mean", *, weights=None, std=None,
+                chunk: int = REDUCE_CHUNK):
+    """
+    Reduce a flat grid array (x-outer / z-inner, as the points file is
+    written) over *axes* of *shape* = (nx, ny, nz).  Reduced axes stay as
+    size 1 in the (nx', ny', nz') result.
+
+    *op*      – mean | rms | min | max | median | pNN (percentile)
+    *weights* – None, a scalar, one weight per point, a 1-D array along
+                the one reduced axis of that length, or a 3-D array
+                broadcastable to *shape* (e.g. from `axis_weights`); used
+                by mean / rms, ignored by the order statistics
+    *std*     – optional per-point σ; when given, returns (value, σ) with σ
+                propagated through the reduction
+
+    Work is split into blocks along the first kept axis so no temporary is
+    larger than about *chunk* grid values, whatever the sample size.
+    """
+    kind, q = parse_op(op)
+    a3 = np.asarray(arr).reshape(shape)
+    s3 = None if std is None else np.asarray(std).reshape(shape)
+    w3 = None if weights is None else _grid_weights(weights, shape, axes)
+
+    kept = [i for i in range(3) if i not in axes]
+    out_shape = tuple(1 if i in axes else n for i, n in enumerate(shape))
+    if not axes:
+        return (a3, s3) if std is not None else a3
+
+    lead = kept[0] if kept else None
+    per_slice = int(np.prod(shape)) // (shape[lead] if lead is not None else 1)
+    step = max(1, chunk // max(per_slice, 1))
+    if lead is None or step >= shape[lead]:
+        val, sig = _reduce_block(a3, s3, w3, axes, kind, q)
+        return (val, sig) if std is not None else val
+
+    val = np.empty(out_shape, dtype=np.result_type(a3.dtype, float))
+    sig = None if s3 is None else np.empty(out_shape, dtype=float)
+    for i0 in range(0, shape[lead], step):
+        sl = tuple(slice(i0, i0 + step) if i == lead else slice(None) for i in range(3))
+        wb = None if w3 is None else (w3[sl] if w3.shape[lead] > 1 else w3)
+        v, sg = _reduce_block(a3[sl], None if s3 is None else s3[sl], wb, axes, kind, q)
+        val[sl] = v
+        if sig is not None:
+            sig[sl] = sg
+    return (val, sig) if std is not None else val
+
+
+# ---------- curve decimation -------------------------------------------------
+def _chord_error(x: np.ndarray, bands: np.ndarray, i: int, j: int) -> tuple[float, int]:
+    """Largest vertical distance of bands[:, i+1:j] from the chords i → j, and where."""
+    if j - i < 2:
+        return 0.0, i
+    t = (x[i + 1:j] - x[i]) / (x[j] - x[i])
+    chord = bands[:, i:i + 1] + t * (bands[:, j:j + 1] - bands[:, i:i + 1])
+    err = np.abs(bands[:, i + 1:j] - chord).max(axis=0)
+    k = int(np.argmax(err))
+    return float(err[k]), i + 1 + k
+
+
+def decimate_curve(x, y, std=None, *, tol: float | None = None,
+                   max_points: int | None = None) -> np.ndarray:
+    """
+    Indices of a subset of the x-sorted curve whose piecewise-linear
+    interpolation stays within *tol* of y – and of y ± std when given – at
+    every dropped point.
+
+    Segments are split at their worst point, worst segment first
+    (Ramer–Douglas–Peucker ordered by error rather than depth), so a
+    *max_points* budget goes where the curve bends most.  Stops when the
+    error is ≤ *tol* or the budget is spent, whichever comes first.
+    Non-finite points are always kept and split the curve into runs.
+    """
+    import heapq
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 3 or (tol is None and max_points is None):
+        return np.arange(n)
+    bands = (y[None, :] if std is None else
+             np.stack([y, y - np.asarray(std, dtype=float), y + np.asarray(std, dtype=float)]))
+
+    finite = np.isfinite(x) & np.isfinite(bands).all(axis=0)
+    keep = ~finite
+    edges = np.flatnonzero(np.diff(np.r_[False, finite, False].astype(np.int8)))
+    heap = []
+    for a, b in zip(edges[::2], edges[1::2] - 1):    # finite runs [a, b]
+        keep[[a, b]] = True
+        err, k = _chord_error(x, bands, a, b)
+        if err > 0:
+            heap.append((-err, a, b, k))
+    heapq.heapify(heap)
+
+    count = int(keep.sum())
+    while heap and (max_points is None or count < max_points):
+        err, i, j, k = heapq.heappop(heap)
+        if tol is not None and -err <= tol:
+            break
+        keep[k] = True
+        count += 1
+        for a, b in ((i, k), (k, j)):
+            e, m = _chord_error(x, bands, a, b)
+            if e > 0:
+                heapq.heappush(heap, (-e, a, b, m))
+    return np.flatnonzero(keep)
+
+
 # ---------- references helper -----------------------------------------------
 def load_reference_csvs(patterns: str) -> list[pd.DataFrame]:
     """
     Expand wild-cards, read CSVs, attach `stem` as label, and return a list.
     """
+    import pandas as pd                       # only reference loading needs it
     refs: list[pd.DataFrame] = []
     for pat in patterns.split(','):
         for p in map(Path, glob.glob(pat.strip()) or [pat.strip()]):